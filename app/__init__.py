@@ -4,74 +4,96 @@
 """
 
 import os
+import time
+
+# زمن استيراد الحزمة (الإضافات والنماذج) - الجزء الأكبر من البدء البارد
+_import_started = time.perf_counter()
+
 from flask import Flask
 from app.extensions import db, migrate, login_manager, csrf, limiter
-from app.config import Config
+from app.config import Config, config
+from app.services.db_pool import prepare_engine_options, instrument_engine, engine_name
+from app.services.db_routing import init_replica_routing
+from app.services.message_queue import init_message_queue
+from app.services.rate_limit_storage import check_strategy
+from app.services.hash_executor import init_hash_executor
+from app.services.session_store import init_session_store
+from app.services.startup_profile import StartupProfile
+from app.services.metrics import init_metrics, instrument_queries
+from app.services.query_profiler import init_query_profiler
+from app.services.profiler import init_profiler
+from app.services.structured_logging import init_logging
 
 
 def create_app(config_class=Config):
-    """إنشاء وتكوين تطبيق Flask"""
-    print('[create_app] start')
-    app = Flask(__name__)
-    print('[create_app] Flask created')
-    app.config.from_object(config_class)
-    print('[create_app] config loaded')
+    """إنشاء وتكوين تطبيق Flask
 
-    # تهيئة الإضافات
-    db.init_app(app)
-    print('[create_app] db.init_app')
-    migrate.init_app(app, db)
-    print('[create_app] migrate.init_app')
-    login_manager.init_app(app)
-    print('[create_app] login_manager.init_app')
-    csrf.init_app(app)
-    print('[create_app] csrf.init_app')
-    limiter.init_app(app)
-    print('[create_app] limiter.init_app')
-
-    # تكوين Flask-Login
-    login_manager.login_view = 'auth.login'
-    login_manager.login_message = 'يرجى تسجيل الدخول للوصول إلى هذه الصفحة.'
-    login_manager.login_message_category = 'info'
-    print('[create_app] login configured')
+    لا يتصل بقاعدة البيانات: تنظيف الحسابات غير المؤكدة في cleanup_users.py
+    """
+    profile = StartupProfile(imports_ms=_import_ms)
 
-    # تسجيل Blueprints
-    from app.auth.routes import bp as auth_bp
-    app.register_blueprint(auth_bp, url_prefix='/auth')
-    print('[create_app] auth blueprint')
+    with profile.phase('config'):
+        app = Flask(__name__)
+        # يقبل اسم الإعدادات كنص ('production') كما في wsgi.py
+        if isinstance(config_class, str):
+            config_class = config.get(config_class, config['default'])
+        app.config.from_object(config_class)
+        init_logging(app)
 
-    from app.student.routes import bp as student_bp
-    app.register_blueprint(student_bp, url_prefix='/student')
-    print('[create_app] student blueprint')
+    # تهيئة الإضافات
+    with profile.phase('extensions'):
+        prepare_engine_options(app)
+        db.init_app(app)
+        with app.app_context():
+            for bind_key, engine in db.engines.items():
+                instrument_engine(engine, engine_name(bind_key))
+                instrument_queries(engine)
+        init_replica_routing(app)
+        init_message_queue(app)
+        init_hash_executor(app)
+        init_session_store(app, db)
+        init_metrics(app)
+        init_query_profiler(app)
+        init_profiler(app)
+        migrate.init_app(app, db)
+        login_manager.init_app(app)
+        csrf.init_app(app)
+        check_strategy(app)
+        limiter.init_app(app)
+
+        # تكوين Flask-Login
+        login_manager.login_view = 'auth.login'
+        login_manager.login_message = 'يرجى تسجيل الدخول للوصول إلى هذه الصفحة.'
+        login_manager.login_message_category = 'info'
 
+    # تسجيل Blueprints
+    with profile.phase('blueprints'):
+        from app.auth.routes import bp as auth_bp
+        app.register_blueprint(auth_bp, url_prefix='/auth')
 
+        from app.student.routes import bp as student_bp
+        app.register_blueprint(student_bp, url_prefix='/student')
 
-    # الصفحة الرئيسية
-    from app.main import bp as main_bp
-    app.register_blueprint(main_bp)
-    print('[create_app] main blueprint')
+        # الصفحة الرئيسية
+        from app.main import bp as main_bp
+        app.register_blueprint(main_bp)
 
-    # لا توجد مجدولة في نظام تسجيل البيانات - البيانات محفوظة دائماً
-    print('[create_app] نظام تسجيل بيانات بدون مجدولة')
+    # خدمة فحص الصور تحمل عند أول رفع إلا إذا طلب تحميلها مسبقاً
+    if app.config.get('IMAGE_VALIDATION_PRELOAD'):
+        with profile.phase('validation_backend'):
+            from app.services.files import load_validation_backend
+            load_validation_backend()
 
     # إنشاء مجلدات الرفع
-    upload_folder = app.config.get('UPLOAD_FOLDER', 'uploads')
-    os.makedirs(os.path.join(upload_folder, 'applications'), exist_ok=True)
-    print('[create_app] upload folders ready')
-
-    # تنظيف دوري للحسابات غير المؤكدة (عند بدء التطبيق)
-    with app.app_context():
-        try:
-            from app.models import User
-            deleted_count = User.delete_unverified_users()
-            if deleted_count > 0:
-                print(f'🧹 تم حذف {deleted_count} حساب غير مؤكد منتهي الصلاحية عند بدء التطبيق')
-        except Exception as e:
-            print(f'❌ خطأ في تنظيف الحسابات عند بدء التطبيق: {str(e)}')
-
-    print('[create_app] done')
+    with profile.phase('upload_folders'):
+        upload_folder = app.config.get('UPLOAD_FOLDER', 'uploads')
+        os.makedirs(os.path.join(upload_folder, 'applications'), exist_ok=True)
+
+    profile.log(app)
     return app
 
 
 # استيراد النماذج لضمان إنشاء الجداول
-from app import models
+from app import models  # noqa: E402,F401
+
+_import_ms = (time.perf_counter() - _import_started) * 1000
@@ -4,14 +4,15 @@
 """
 
 from datetime import datetime, timedelta
-from flask import render_template, redirect, url_for, flash, request, current_app, session
+from flask import render_template, redirect, url_for, flash, request, current_app, session, jsonify
 from flask_login import login_user, logout_user, current_user, login_required
 from flask_limiter import Limiter
+from sqlalchemy.exc import IntegrityError
 from app.auth import bp
 from app.extensions import db, limiter
 from app.forms.auth import LoginForm, RegistrationForm, VerificationForm, ChangePasswordForm
-from app.services.sms import send_verification_sms
-from app.models import User, Application
+from app.services.message_queue import queue_verification_sms
+from app.models import User, Application, OutboundMessage
 
 
 @bp.route('/login', methods=['GET', 'POST'])
@@ -42,13 +43,17 @@ def login():
                 verification_code = user.generate_verification_code()
                 db.session.commit()
 
-                if send_verification_sms(user.phone, verification_code):
-                    session['verification_phone'] = user.phone
+                message = queue_verification_sms(user.phone, verification_code)
+                if message:
+                    _start_verification(user.id, user.phone, message)
                     return redirect(url_for('auth.verify_phone'))
                 else:
                     flash('خطأ في إرسال رمز التحقق. يرجى المحاولة لاحقاً.', 'error')
                     return redirect(url_for('auth.login'))
 
+            if user.rehash_password_if_needed(form.password.data):
+                db.session.commit()
+
             login_user(user, remember=form.remember_me.data)
             next_page = request.args.get('next')
 
@@ -72,6 +77,79 @@ def logout():
     return redirect(url_for('main.index'))
 
 
+def _start_verification(user_id, phone, message):
+    """حفظ بيانات التحقق في الجلسة"""
+    session['verification_user_id'] = user_id
+    session['verification_phone'] = phone
+    session['verification_message_id'] = message.id
+
+
+def _end_verification():
+    """إزالة بيانات التحقق من الجلسة"""
+    for key in ('verification_user_id', 'verification_phone', 'verification_message_id'):
+        session.pop(key, None)
+
+
+def _get_verification_user():
+    """مستخدم جلسة التحقق الحالية بالمفتاح الأساسي (استعلام واحد)"""
+    phone = session.get('verification_phone')
+    user_id = session.get('verification_user_id')
+    if user_id:
+        user = db.session.get(User, user_id)
+    else:
+        # جلسات بدأت قبل حفظ المعرف
+        user = User.query.filter_by(phone=phone).first()
+    if not user or user.phone != phone:
+        return None
+    return user
+
+
+def _delete_unverified_user(user):
+    """حذف حساب غير مؤكد مع طلباته"""
+    Application.query.filter_by(user_id=user.id).delete()
+    db.session.delete(user)
+
+
+def _insert_user(user):
+    """إدراج مستخدم جديد بالاعتماد على القيد الفريد لرقم الهاتف
+
+    لا يوجد فحص مسبق للرقم: الإدراج نفسه هو الفحص، فلا يمكن لتسجيلين
+    متزامنين بنفس الرقم أن ينجحا معاً. عند التعارض فقط يتم البحث عن الحساب
+    الموجود، وإذا كان غير مؤكد ومنتهي الصلاحية يحذف ويعاد الإدراج.
+
+    Returns:
+        int: معرف المستخدم الجديد، أو None إذا كان الرقم مسجلاً بالفعل
+    """
+    phone = user.phone
+    try:
+        db.session.add(user)
+        db.session.flush()
+        # قراءة المعرف قبل commit حتى لا يعاد تحميل الصف بعده
+        user_id = user.id
+        db.session.commit()
+        return user_id
+    except IntegrityError:
+        db.session.rollback()
+
+    existing = User.query.filter_by(phone=phone).first()
+    if not existing or existing.is_phone_verified or not existing.is_verification_expired():
+        return None
+
+    try:
+        _delete_unverified_user(existing)
+        # الحذف يجب أن ينفذ قبل الإدراج (وحدة العمل تنفذ INSERT أولاً)
+        db.session.flush()
+        db.session.add(user)
+        db.session.flush()
+        user_id = user.id
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return None
+    current_app.logger.info('تم استبدال الحساب غير المؤكد منتهي الصلاحية: %s', phone)
+    return user_id
+
+
 @bp.route('/register', methods=['GET', 'POST'])
 @limiter.limit("3 per minute")
 def register():
@@ -79,39 +157,11 @@ def register():
     if current_user.is_authenticated:
         return redirect(url_for('main.index'))
 
-    # تنظيف الحسابات غير المؤكدة منتهية الصلاحية
-    try:
-        deleted_count = User.delete_unverified_users()
-        if deleted_count > 0:
-            current_app.logger.info(f'تم حذف {deleted_count} حساب غير مؤكد منتهي الصلاحية')
-    except Exception as e:
-        current_app.logger.error(f'خطأ في تنظيف الحسابات غير المؤكدة: {str(e)}')
-
     form = RegistrationForm()
-    
-    # إضافة تسجيل للتشخيص
+
     if request.method == 'POST':
-        current_app.logger.info(f'محاولة تسجيل بالرقم: {form.phone.data}')
-        
-        # التحقق من وجود الرقم مسبقاً قبل التحقق من النموذج
-        if form.phone.data:
-            # تنظيف الرقم
-            clean_phone = form.phone.data.strip().replace(' ', '').replace('-', '')
-            if clean_phone.startswith('+967'):
-                clean_phone = clean_phone[4:]
-            elif clean_phone.startswith('967'):
-                clean_phone = clean_phone[3:]
-            elif clean_phone.startswith('00967'):
-                clean_phone = clean_phone[5:]
-            
-            if clean_phone.startswith('7') and len(clean_phone) == 9 and clean_phone.isdigit():
-                full_phone = '+967' + clean_phone
-                existing_user = User.query.filter_by(phone=full_phone).first()
-                if existing_user:
-                    flash('يوجد حساب مسجل بهذا الرقم بالفعل. يرجى تسجيل الدخول أو استخدام رقم آخر.', 'error')
-                    return render_template('auth/register.html', title='إنشاء حساب جديد', form=form, 
-                                         show_login_link=True, existing_phone=full_phone)
-    
+        current_app.logger.info('محاولة تسجيل بالرقم: %s', form.phone.data)
+
     if form.validate_on_submit():
         try:
             # إنشاء مستخدم جديد
@@ -126,12 +176,17 @@ def register():
             # إنشاء رمز التحقق
             verification_code = user.generate_verification_code()
 
-            db.session.add(user)
-            db.session.commit()
+            phone = form.phone.data
+            user_id = _insert_user(user)
+            if user_id is None:
+                flash('يوجد حساب مسجل بهذا الرقم بالفعل. يرجى تسجيل الدخول أو استخدام رقم آخر.', 'error')
+                return render_template('auth/register.html', title='إنشاء حساب جديد', form=form,
+                                     show_login_link=True, existing_phone=phone)
 
             # إرسال رمز التحقق
-            if send_verification_sms(user.phone, verification_code):
-                session['verification_phone'] = user.phone
+            message = queue_verification_sms(phone, verification_code)
+            if message:
+                _start_verification(user_id, phone, message)
                 flash('تم إنشاء الحساب بنجاح. تم إرسال رمز التحقق إلى هاتفك.', 'success')
                 return redirect(url_for('auth.verify_phone'))
             else:
@@ -140,7 +195,7 @@ def register():
 
         except Exception as e:
             db.session.rollback()
-            current_app.logger.error(f'خطأ في إنشاء الحساب: {str(e)}')
+            current_app.logger.error('خطأ في إنشاء الحساب: %s', e)
             flash('حدث خطأ أثناء إنشاء الحساب. يرجى المحاولة مرة أخرى.', 'error')
 
     return render_template('auth/register.html', title='إنشاء حساب جديد', form=form)
@@ -155,7 +210,7 @@ def verify_phone():
         flash('جلسة التحقق منتهية. يرجى تسجيل الدخول مرة أخرى.', 'error')
         return redirect(url_for('auth.login'))
 
-    user = User.query.filter_by(phone=phone).first()
+    user = _get_verification_user()
     if not user:
         flash('المستخدم غير موجود.', 'error')
         return redirect(url_for('auth.login'))
@@ -164,18 +219,17 @@ def verify_phone():
     if user.is_verification_expired():
         try:
             # حذف الحساب إذا انتهت صلاحية رمز التحقق
-            Application.query.filter_by(user_id=user.id).delete()
-            db.session.delete(user)
+            _delete_unverified_user(user)
             db.session.commit()
-            session.pop('verification_phone', None)
+            _end_verification()
             
-            current_app.logger.info(f'تم حذف الحساب غير المؤكد منتهي الصلاحية: {phone}')
+            current_app.logger.info('تم حذف الحساب غير المؤكد منتهي الصلاحية: %s', phone)
             flash('انتهت صلاحية رمز التحقق وتم حذف الحساب. يرجى إنشاء حساب جديد.', 'warning')
             return redirect(url_for('auth.register'))
             
         except Exception as e:
             db.session.rollback()
-            current_app.logger.error(f'خطأ في حذف الحساب منتهي الصلاحية {phone}: {str(e)}')
+            current_app.logger.error('خطأ في حذف الحساب منتهي الصلاحية %s: %s', phone, e)
             flash('انتهت صلاحية رمز التحقق. يرجى إنشاء حساب جديد.', 'error')
             return redirect(url_for('auth.register'))
 
@@ -183,7 +237,7 @@ def verify_phone():
     if form.validate_on_submit():
         if user.verify_code(form.verification_code.data):
             db.session.commit()
-            session.pop('verification_phone', None)
+            _end_verification()
 
             # تسجيل دخول تلقائي بعد التحقق
             login_user(user)
@@ -193,22 +247,53 @@ def verify_phone():
             # التحقق مرة أخرى من انتهاء الصلاحية بعد فشل التحقق
             if user.is_verification_expired():
                 try:
-                    Application.query.filter_by(user_id=user.id).delete()
-                    db.session.delete(user)
+                    _delete_unverified_user(user)
                     db.session.commit()
-                    session.pop('verification_phone', None)
+                    _end_verification()
                     
-                    current_app.logger.info(f'تم حذف الحساب غير المؤكد بعد فشل التحقق: {phone}')
+                    current_app.logger.info('تم حذف الحساب غير المؤكد بعد فشل التحقق: %s', phone)
                     flash('انتهت صلاحية رمز التحقق وتم حذف الحساب. يرجى إنشاء حساب جديد.', 'warning')
                     return redirect(url_for('auth.register'))
                     
                 except Exception as e:
                     db.session.rollback()
-                    current_app.logger.error(f'خطأ في حذف الحساب بعد فشل التحقق {phone}: {str(e)}')
-            
-            flash('رمز التحقق غير صحيح أو منتهي الصلاحية.', 'error')
+                    current_app.logger.error('خطأ في حذف الحساب بعد فشل التحقق %s: %s', phone, e)
 
-    return render_template('auth/verify_phone.html', title='تأكيد رقم الهاتف', form=form, phone=phone)
+            # حفظ عدد المحاولات الفاشلة (في جدول رموز التحقق فقط)
+            db.session.commit()
+            if user.is_verification_locked():
+                flash('تم تجاوز عدد المحاولات المسموح بها. يرجى طلب رمز جديد.', 'error')
+            else:
+                flash('رمز التحقق غير صحيح أو منتهي الصلاحية.', 'error')
+
+    delivery = _get_verification_delivery()
+    return render_template('auth/verify_phone.html', title='تأكيد رقم الهاتف', form=form, phone=phone,
+                           delivery=delivery)
+
+
+def _get_verification_delivery():
+    """رسالة التحقق الأخيرة لهذه الجلسة"""
+    message_id = session.get('verification_message_id')
+    if not message_id:
+        return None
+    message = db.session.get(OutboundMessage, message_id)
+    if not message or message.phone != session.get('verification_phone'):
+        return None
+    return message
+
+
+@bp.route('/verify-phone/delivery')
+@limiter.exempt
+def verification_delivery():
+    """حالة إرسال رمز التحقق (للتحديث التلقائي في صفحة التحقق)"""
+    message = _get_verification_delivery()
+    if not message:
+        return jsonify({'status': None})
+    return jsonify({
+        'status': message.status,
+        'status_display': message.status_display,
+        'attempts': message.attempts
+    })
 
 
 @bp.route('/resend-code')
@@ -220,7 +305,7 @@ def resend_code():
         flash('جلسة التحقق منتهية.', 'error')
         return redirect(url_for('auth.login'))
 
-    user = User.query.filter_by(phone=phone).first()
+    user = _get_verification_user()
     if not user:
         flash('المستخدم غير موجود.', 'error')
         return redirect(url_for('auth.login'))
@@ -229,7 +314,9 @@ def resend_code():
     verification_code = user.generate_verification_code()
     db.session.commit()
 
-    if send_verification_sms(user.phone, verification_code):
+    message = queue_verification_sms(phone, verification_code)
+    if message:
+        session['verification_message_id'] = message.id
         flash('تم إرسال رمز التحقق الجديد.', 'success')
     else:
         flash('خطأ في إرسال رمز التحقق. يرجى المحاولة لاحقاً.', 'error')
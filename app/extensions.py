@@ -9,16 +9,18 @@ from flask_login import LoginManager
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_wtf.csrf import CSRFProtect
+from app.services.db_routing import RoutingSession
+from app.services import rate_limit_storage  # noqa: F401 - تسجيل sqldb://
 # تم إزالة المجدولة - البيانات محفوظة دائماً
 
 # إنشاء كائنات الإضافات
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 migrate = Migrate()
 login_manager = LoginManager()
 csrf = CSRFProtect()
 limiter = Limiter(
     key_func=get_remote_address,
-    default_limits=["2000 per day", "500 per hour"],  # زيادة الحدود لتحميل الصور
-    storage_uri="memory://"  # تخزين صريح في الذاكرة للتطوير لتفادي التحذير
+    default_limits=["2000 per day", "500 per hour"]  # زيادة الحدود لتحميل الصور
+    # التخزين من RATELIMIT_STORAGE_URI في الإعدادات (memory:// افتراضياً)
 )
 # لا توجد مجدولة في نظام تسجيل البيانات
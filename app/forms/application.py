@@ -10,6 +10,7 @@ from flask_wtf.file import FileField, FileRequired, FileAllowed
 from wtforms import StringField, SelectField, DateField, TextAreaField, SubmitField, IntegerField, BooleanField
 from wtforms.validators import DataRequired, Email, Length, ValidationError, NumberRange, Optional
 from app.models import User, Application
+from app.services.phone import normalize_phone_or_none
 
 
 class ApplicationForm(FlaskForm):
@@ -134,44 +135,18 @@ class ApplicationForm(FlaskForm):
     def validate_phone(self, phone):
         """التحقق من صحة رقم الجوال اليمني وإضافة رمز الدولة"""
         if phone.data:
-            # تنظيف الرقم
-            clean_phone = phone.data.strip().replace(' ', '').replace('-', '')
-            
-            # إزالة رمز الدولة إذا كان موجوداً
-            if clean_phone.startswith('+967'):
-                clean_phone = clean_phone[4:]
-            elif clean_phone.startswith('967'):
-                clean_phone = clean_phone[3:]
-            elif clean_phone.startswith('00967'):
-                clean_phone = clean_phone[5:]
-            
-            # التحقق من صحة الرقم اليمني (يبدأ بـ 7 ويكون 9 أرقام)
-            if not (clean_phone.startswith('7') and len(clean_phone) == 9 and clean_phone.isdigit()):
+            full_phone = normalize_phone_or_none(phone.data)
+            if not full_phone:
                 raise ValidationError('رقم الجوال يجب أن يبدأ بـ 7 ويكون 9 أرقام (مثال: 712345678)')
-            
-            # إضافة رمز اليمن
-            phone.data = '+967' + clean_phone
+            phone.data = full_phone
 
     def validate_guardian_phone(self, guardian_phone):
         """التحقق من صحة رقم جوال ولي الأمر اليمني وإضافة رمز الدولة"""
         if guardian_phone.data:
-            # تنظيف الرقم
-            clean_phone = guardian_phone.data.strip().replace(' ', '').replace('-', '')
-            
-            # إزالة رمز الدولة إذا كان موجوداً
-            if clean_phone.startswith('+967'):
-                clean_phone = clean_phone[4:]
-            elif clean_phone.startswith('967'):
-                clean_phone = clean_phone[3:]
-            elif clean_phone.startswith('00967'):
-                clean_phone = clean_phone[5:]
-            
-            # التحقق من صحة الرقم اليمني (يبدأ بـ 7 ويكون 9 أرقام)
-            if not (clean_phone.startswith('7') and len(clean_phone) == 9 and clean_phone.isdigit()):
+            full_phone = normalize_phone_or_none(guardian_phone.data)
+            if not full_phone:
                 raise ValidationError('رقم جوال ولي الأمر يجب أن يبدأ بـ 7 ويكون 9 أرقام (مثال: 712345678)')
-            
-            # إضافة رمز اليمن
-            guardian_phone.data = '+967' + clean_phone
+            guardian_phone.data = full_phone
 
 
 # حذف نموذج التحديث لأنه لم يعد مطلوباً
@@ -6,7 +6,7 @@
 from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField, SubmitField, BooleanField
 from wtforms.validators import DataRequired, Length, EqualTo, ValidationError, Regexp
-from app.models import User
+from app.services.phone import normalize_phone, PhoneNumberError
 
 
 class LoginForm(FlaskForm):
@@ -23,30 +23,10 @@ class LoginForm(FlaskForm):
     def validate_phone(self, phone):
         """تحويل رقم الهاتف إلى الصيغة الكاملة مع رمز اليمن"""
         if phone.data:
-            # تنظيف الرقم من المسافات والرموز
-            clean_phone = phone.data.strip().replace(' ', '').replace('-', '')
-            
-            # إزالة رمز الدولة إذا كان موجوداً للتحقق من الصيغة
-            if clean_phone.startswith('+967'):
-                clean_phone = clean_phone[4:]
-            elif clean_phone.startswith('967'):
-                clean_phone = clean_phone[3:]
-            elif clean_phone.startswith('00967'):
-                clean_phone = clean_phone[5:]
-            
-            # التحقق من أن الرقم يبدأ بـ 7 ويتكون من 9 أرقام
-            if not clean_phone.startswith('7'):
-                raise ValidationError('رقم الجوال يجب أن يبدأ بـ 7 (مثال: 712345678)')
-            
-            if len(clean_phone) != 9:
-                raise ValidationError(f'رقم الجوال يجب أن يكون 9 أرقام، لكن الرقم المدخل {len(clean_phone)} أرقام')
-            
-            # التحقق من أن جميع الأحرف أرقام
-            if not clean_phone.isdigit():
-                raise ValidationError('رقم الجوال يجب أن يحتوي على أرقام فقط')
-            
-            # إضافة رمز اليمن تلقائياً
-            phone.data = '+967' + clean_phone
+            try:
+                phone.data = normalize_phone(phone.data)
+            except PhoneNumberError as e:
+                raise ValidationError(str(e))
 
 
 class RegistrationForm(FlaskForm):
@@ -65,45 +45,15 @@ class RegistrationForm(FlaskForm):
     submit = SubmitField('إرسال رمز التحقق')
 
     def validate_phone(self, phone):
-        """تحويل رقم الهاتف وفحص عدم التكرار"""
-        if phone.data:
-            # تنظيف الرقم من المسافات والرموز
-            clean_phone = phone.data.strip().replace(' ', '').replace('-', '')
-            
-            # إزالة رمز الدولة إذا كان موجوداً للتحقق من الصيغة
-            if clean_phone.startswith('+967'):
-                clean_phone = clean_phone[4:]
-            elif clean_phone.startswith('967'):
-                clean_phone = clean_phone[3:]
-            elif clean_phone.startswith('00967'):
-                clean_phone = clean_phone[5:]
-            
-            # التحقق من أن الرقم يبدأ بـ 7 ويتكون من 9 أرقام
-            if not clean_phone.startswith('7'):
-                raise ValidationError('رقم الجوال يجب أن يبدأ بـ 7 (مثال: 712345678)')
-            
-            if len(clean_phone) != 9:
-                raise ValidationError(f'رقم الجوال يجب أن يكون 9 أرقام، لكن الرقم المدخل {len(clean_phone)} أرقام')
-            
-            # التحقق من أن جميع الأحرف أرقام
-            if not clean_phone.isdigit():
-                raise ValidationError('رقم الجوال يجب أن يحتوي على أرقام فقط')
-            
-            # إنشاء الرقم الكامل
-            full_phone = '+967' + clean_phone
+        """تحويل رقم الهاتف إلى الصيغة الكاملة
 
-            # فحص عدم تكرار الرقم
+        عدم التكرار يفرضه القيد الفريد عند إنشاء الحساب وليس استعلاماً هنا.
+        """
+        if phone.data:
             try:
-                user = User.query.filter_by(phone=full_phone).first()
-                if user:
-                    raise ValidationError('يوجد حساب مسجل بهذا الرقم بالفعل. يرجى تسجيل الدخول أو استخدام رقم آخر.')
-            except Exception as e:
-                # في حالة مشكلة في قاعدة البيانات، نظهر رسالة عامة
-                if 'ValidationError' not in str(type(e)):
-                    raise ValidationError('خطأ في التحقق من الرقم. يرجى المحاولة لاحقاً.')
-
-            # تحديث البيانات بالرقم الكامل
-            phone.data = full_phone
+                phone.data = normalize_phone(phone.data)
+            except PhoneNumberError as e:
+                raise ValidationError(str(e))
 
 
 class VerificationForm(FlaskForm):
@@ -3,11 +3,16 @@
 المسارات الرئيسية
 """
 
-import os
-from flask import render_template, redirect, url_for, abort, current_app, send_from_directory
+import time
+from flask import render_template, redirect, url_for, abort, current_app, request, send_file
 from flask_login import current_user, login_required
 from app.main import bp
-from app.services.files import serve_file, get_validation_system_status
+from app.services.files import (serve_file, get_validation_system_status, invalidate_file_location,
+                                resolve_file_location, send_file_location)
+from app.services.image_derivatives import (derivative_path, derivative_widths, resolve_upload_path,
+                                           verify_image_signature)
+from app.services.telemetry import collect_telemetry
+from app.services.db_routing import replica_reads
 from app.extensions import limiter
 
 
@@ -24,6 +29,7 @@ def index():
 
 @bp.route('/files/<path:file_path>')
 @limiter.exempt  # استثناء من rate limiting للملفات
+@replica_reads
 @login_required
 def serve_uploaded_file(file_path):
     """تقديم الملفات المرفوعة مع التحقق من الصلاحيات"""
@@ -40,57 +46,50 @@ def serve_uploaded_file(file_path):
     return serve_file(file_path, user_id, check_permissions=True)
 
 
+@bp.route('/media/<path:file_path>')
+@limiter.exempt  # استثناء من rate limiting للملفات
+def signed_image(file_path):
+    """تقديم صورة مرفوعة أو نسختها المصغرة برابط موقع (بدون جلسة أو استعلام)"""
+    width = request.args.get('w', 0, type=int)
+    expires = request.args.get('exp', 0, type=int)
+    if width and width not in derivative_widths():
+        abort(404)
+    if not verify_image_signature(file_path, width, expires, request.args.get('sig')):
+        abort(403)
+    source = resolve_upload_path(file_path)
+    if source is None:
+        abort(404)
+
+    try:
+        path = derivative_path(source, file_path, width) if width else source
+        response = send_file(path, conditional=True, max_age=max(expires - int(time.time()), 0))
+    except FileNotFoundError:
+        invalidate_file_location(file_path)
+        abort(404)
+    # صور شخصية: ذاكرة المتصفح فقط وليس الوسطاء المشتركين
+    response.cache_control.public = False
+    response.cache_control.private = True
+    return response
+
+
 @bp.route('/files_or_static/<path:file_path>')
 @limiter.exempt  # استثناء من rate limiting للملفات
+@replica_reads
 @login_required
 def serve_any_file(file_path):
     """Serve file from UPLOAD_FOLDER if present, otherwise fall back to app static folder.
 
     This helps when older uploads were placed under `static/` or when paths vary.
     """
-    # try uploads folder
-    upload_folder = current_app.config.get('UPLOAD_FOLDER', 'uploads')
-    # تطبيع المسار لتجنب مشاكل الخلط بين الشرطات المائلة على ويندوز
-    normalized_file_path = file_path.replace('/', os.sep).replace('\\', os.sep)
-
-    # التأكد من أن المسار مطلق
-    if os.path.isabs(upload_folder):
-        upload_full = os.path.join(upload_folder, normalized_file_path)
-    else:
-        # إذا كان المسار نسبي، نجعله نسبة إلى جذر المشروع (مجلد أعلى من app)
-        app_dir = os.path.dirname(os.path.abspath(__file__))  # app/main
-        project_root = os.path.dirname(os.path.dirname(app_dir))  # جذر المشروع
-        upload_full = os.path.join(project_root, upload_folder, normalized_file_path)
-
-    # تطبيع المسار النهائي
-    upload_full = os.path.normpath(upload_full)
-
-    current_app.logger.debug(f'البحث عن الملف في: {upload_full}')
-
-    if os.path.exists(upload_full):
-        # extract user_id for permission check if possible
-        path_parts = file_path.split('/')
-        user_id = None
-        if len(path_parts) >= 2:
-            try:
-                user_id = int(path_parts[1])
-            except ValueError:
-                user_id = None
-        # للمشرفين، لا نحتاج للتحقق من الصلاحيات
-        if current_user.role == 'admin':
-            return serve_file(file_path, user_id, check_permissions=False)
-        else:
-            return serve_file(file_path, user_id, check_permissions=True)
-
-    # fallback to static folder
-    normalized_static_path = file_path.replace('/', os.sep)
-    static_full = os.path.join(current_app.static_folder or 'static', normalized_static_path)
-    if os.path.exists(static_full):
-        # send from the static folder (no extra permission checks)
-        return send_from_directory(current_app.static_folder or 'static', file_path)
+    location = resolve_file_location(file_path)
+    if location is None:
+        current_app.logger.error('الملف غير موجود في مجلد الرفع ولا في static: %s', file_path)
+        abort(404)
 
-    current_app.logger.error(f'الملف غير موجود في كلا المجلدين: {upload_full} و {static_full}')
-    abort(404)
+    # ملفات static بدون تحقق إضافي، وللمشرفين لا نحتاج للتحقق من الصلاحيات
+    if location.owner_id and current_user.role != 'admin' and current_user.id != location.owner_id:
+        abort(403)
+    return send_file_location(file_path, location)
 
 
 @bp.route('/system-status')
@@ -102,4 +101,6 @@ def system_status():
         abort(403)
     
     status = get_validation_system_status()
-    return render_template('main/system_status.html', status=status)
\ No newline at end of file
+    telemetry = collect_telemetry()
+    return render_template('main/system_status.html', status=status, telemetry=telemetry,
+                           pool_status=telemetry['pool'], hash_status=telemetry['hash'])
\ No newline at end of file
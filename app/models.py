@@ -3,11 +3,27 @@
 نماذج قاعدة البيانات المبسطة - نظام تسجيل البيانات فقط
 """
 
+import hashlib
+import hmac
+import logging
+import secrets
 from datetime import datetime, timedelta
+from flask import current_app
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import and_, or_
 from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import deferred, undefer_group, selectinload
 from app.extensions import db, login_manager
+from app.services.passwords import needs_rehash
+from app.services.hash_executor import hash_password, verify_password
+
+logger = logging.getLogger(__name__)
+
+# حجم الصفحة الافتراضي لقوائم الطلبات
+APPLICATION_PAGE_SIZE = 20
+
+# الحد الأقصى لطلبات التسجيل لكل مستخدم
+MAX_APPLICATIONS_PER_USER = 5
 
 
 @login_manager.user_loader
@@ -26,8 +42,6 @@ class User(UserMixin, db.Model):
     role = db.Column(db.Enum('student', name='user_roles'), nullable=False, default='student')
     is_active = db.Column(db.Boolean, nullable=False, default=True)
     is_phone_verified = db.Column(db.Boolean, nullable=False, default=False)
-    verification_code = db.Column(db.String(10), nullable=True)
-    verification_expires = db.Column(db.DateTime, nullable=True)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -35,43 +49,58 @@ class User(UserMixin, db.Model):
     applications = db.relationship('Application',
                                   foreign_keys='Application.user_id',
                                   backref='user', lazy='dynamic', cascade='all, delete-orphan')
+    # رمز التحقق في جدول منفصل حتى لا يكتب كل إرسال على صف المستخدم
+    verification = db.relationship('VerificationCode', uselist=False, lazy='select',
+                                   cascade='all, delete-orphan')
     
     def set_password(self, password):
         """تشفير كلمة المرور"""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
     
     def check_password(self, password):
         """التحقق من كلمة المرور"""
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
+
+    def rehash_password_if_needed(self, password):
+        """إعادة تشفير كلمة المرور إذا كانت مخزنة بإعدادات قديمة
+
+        تستدعى بعد نجاح check_password فقط، لأنها الوحيدة التي تملك كلمة المرور الأصلية.
+
+        Returns:
+            bool: True إذا تم تحديث التشفير (يحتاج حفظ)
+        """
+        if not needs_rehash(self.password_hash):
+            return False
+        self.password_hash = hash_password(password)
+        return True
     
     def generate_verification_code(self):
         """إنشاء رمز التحقق"""
-        import random
-        self.verification_code = str(random.randint(100000, 999999))
-        self.verification_expires = datetime.utcnow() + timedelta(minutes=10)
-        return self.verification_code
+        code, self.verification = VerificationCode.issue(self.verification)
+        return code
 
     def verify_code(self, code):
         """التحقق من رمز التحقق"""
-        if not self.verification_code or not self.verification_expires:
+        entry = self.verification
+        if not entry or not entry.check(code):
             return False
 
-        if datetime.utcnow() > self.verification_expires:
-            return False
-
-        if self.verification_code == code:
-            self.is_phone_verified = True
-            self.verification_code = None
-            self.verification_expires = None
-            return True
+        self.is_phone_verified = True
+        self.verification = None
+        return True
 
-        return False
+    def is_verification_locked(self):
+        """هل تم استنفاد محاولات إدخال الرمز الحالي؟"""
+        return bool(self.verification and self.verification.is_locked())
 
     def is_verification_expired(self):
         """التحقق من انتهاء صلاحية رمز التحقق"""
-        if not self.verification_expires:
-            return False
-        return datetime.utcnow() > self.verification_expires
+        return bool(self.verification and self.verification.is_expired())
+
+    @property
+    def verification_expires(self):
+        """وقت انتهاء صلاحية رمز التحقق الحالي"""
+        return self.verification.expires_at if self.verification else None
 
     @staticmethod
     def delete_unverified_users():
@@ -79,10 +108,9 @@ class User(UserMixin, db.Model):
         from app.extensions import db
         
         # البحث عن المستخدمين غير المؤكدين والذين انتهت صلاحية رمز التحقق
-        expired_users = User.query.filter(
+        expired_users = User.query.join(VerificationCode).filter(
             User.is_phone_verified == False,
-            User.verification_expires.isnot(None),
-            User.verification_expires < datetime.utcnow()
+            VerificationCode.expires_at < datetime.utcnow()
         ).all()
         
         deleted_count = 0
@@ -95,22 +123,22 @@ class User(UserMixin, db.Model):
                 db.session.delete(user)
                 deleted_count += 1
                 
-                print(f"🗑️ تم حذف المستخدم غير المؤكد: {user.phone}")
+                logger.info("🗑️ تم حذف المستخدم غير المؤكد: %s", user.phone)
                 
             except Exception as e:
-                print(f"❌ خطأ في حذف المستخدم {user.phone}: {str(e)}")
+                logger.error("❌ خطأ في حذف المستخدم %s: %s", user.phone, e)
                 db.session.rollback()
                 continue
         
         if deleted_count > 0:
             try:
                 db.session.commit()
-                print(f"✅ تم حذف {deleted_count} مستخدم غير مؤكد من قاعدة البيانات")
+                logger.info("✅ تم حذف %s مستخدم غير مؤكد من قاعدة البيانات", deleted_count)
             except Exception as e:
-                print(f"❌ خطأ في حفظ التغييرات: {str(e)}")
+                logger.error("❌ خطأ في حفظ التغييرات: %s", e)
                 db.session.rollback()
         else:
-            print("ℹ️ لا توجد حسابات غير مؤكدة منتهية الصلاحية للحذف")
+            logger.info("ℹ️ لا توجد حسابات غير مؤكدة منتهية الصلاحية للحذف")
         
         return deleted_count
 
@@ -137,22 +165,22 @@ class User(UserMixin, db.Model):
                 db.session.delete(user)
                 deleted_count += 1
                 
-                print(f"🗑️ تم حذف المستخدم القديم غير المؤكد: {user.phone} (تم إنشاؤه في {user.created_at})")
+                logger.info("🗑️ تم حذف المستخدم القديم غير المؤكد: %s (تم إنشاؤه في %s)", user.phone, user.created_at)
                 
             except Exception as e:
-                print(f"❌ خطأ في حذف المستخدم {user.phone}: {str(e)}")
+                logger.error("❌ خطأ في حذف المستخدم %s: %s", user.phone, e)
                 db.session.rollback()
                 continue
         
         if deleted_count > 0:
             try:
                 db.session.commit()
-                print(f"✅ تم حذف {deleted_count} مستخدم قديم غير مؤكد من قاعدة البيانات")
+                logger.info("✅ تم حذف %s مستخدم قديم غير مؤكد من قاعدة البيانات", deleted_count)
             except Exception as e:
-                print(f"❌ خطأ في حفظ التغييرات: {str(e)}")
+                logger.error("❌ خطأ في حفظ التغييرات: %s", e)
                 db.session.rollback()
         else:
-            print(f"ℹ️ لا توجد حسابات غير مؤكدة أقدم من {hours} ساعة للحذف")
+            logger.info("ℹ️ لا توجد حسابات غير مؤكدة أقدم من %s ساعة للحذف", hours)
         
         return deleted_count
 
@@ -183,21 +211,19 @@ class Application(db.Model):
     term_name = db.Column(db.String(100), nullable=False)
     school_name = db.Column(db.String(200), nullable=False)
     
-    # الصور الشخصية (5 صور)
-    image1_path = db.Column(db.String(500))
-    image2_path = db.Column(db.String(500))
-    image3_path = db.Column(db.String(500))
-    image4_path = db.Column(db.String(500))
-    image5_path = db.Column(db.String(500))
-    
-    # بيانات ولي الأمر
-    guardian_name = db.Column(db.String(200), nullable=False)
-    guardian_phone = db.Column(db.String(20), nullable=False)
+    # بيانات ولي الأمر - مؤجلة التحميل حتى الحاجة إليها
+    guardian_name = deferred(db.Column(db.String(200), nullable=False), group='guardian')
+    guardian_phone = deferred(db.Column(db.String(20), nullable=False), group='guardian')
     
     # معلومات التسجيل
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
     application_number = db.Column(db.Integer, nullable=False, default=1)  # رقم الطلب للمستخدم
+
+    # الصور الشخصية (حتى 5 صور) في جدول مستقل
+    images = db.relationship('ApplicationImage', backref='application', lazy='select',
+                             order_by='ApplicationImage.position',
+                             cascade='all, delete-orphan')
     
     # فهارس لتحسين الأداء
     __table_args__ = (
@@ -205,6 +231,7 @@ class Application(db.Model):
         db.Index('idx_app_email', 'email'),
         db.Index('idx_app_phone', 'phone'),
         db.Index('idx_app_created_at', 'created_at'),
+        db.Index('idx_app_user_created', 'user_id', 'created_at', 'id'),
     )
     
     def calculate_and_save_age(self):
@@ -232,6 +259,69 @@ class Application(db.Model):
             return f"{age_value} سنة"
         return "غير محدد"
 
+    @staticmethod
+    def listing_query(user_id=None, include_images=False, include_guardian=False):
+        """استعلام قوائم الطلبات بأعمدة العرض فقط مرتبةً حسب (created_at, id) تنازلياً
+
+        الصور وبيانات ولي الأمر لا تحمل افتراضياً، ويمكن تحميلها دفعة واحدة
+        عند الحاجة لتجنب استعلام إضافي لكل طلب.
+        """
+        query = Application.query
+        if user_id is not None:
+            query = query.filter(Application.user_id == user_id)
+
+        if include_images:
+            query = query.options(selectinload(Application.images))
+        if include_guardian:
+            query = query.options(undefer_group('guardian'))
+
+        return query.order_by(Application.created_at.desc(), Application.id.desc())
+
+    @staticmethod
+    def encode_cursor(application):
+        """ترميز مؤشر الصفحة التالية من آخر طلب معروض"""
+        return f"{application.created_at.isoformat()}_{application.id}"
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """فك ترميز مؤشر الصفحة - يعيد None إذا كان المؤشر غير صالح"""
+        if not cursor:
+            return None
+        try:
+            created_at, app_id = cursor.rsplit('_', 1)
+            return datetime.fromisoformat(created_at), int(app_id)
+        except (ValueError, TypeError):
+            return None
+
+    @staticmethod
+    def paginate_listing(query, after=None, limit=APPLICATION_PAGE_SIZE):
+        """تقسيم القائمة إلى صفحات بطريقة keyset على (created_at, id)
+
+        Args:
+            query: استعلام صادر من listing_query
+            after (str): مؤشر آخر عنصر في الصفحة السابقة
+            limit (int): عدد العناصر في الصفحة
+
+        Returns:
+            tuple: (قائمة الطلبات، مؤشر الصفحة التالية أو None)
+        """
+        position = Application.decode_cursor(after)
+        if position:
+            created_at, app_id = position
+            query = query.filter(or_(
+                Application.created_at < created_at,
+                and_(Application.created_at == created_at, Application.id < app_id)
+            ))
+
+        # جلب عنصر إضافي لمعرفة وجود صفحة تالية دون استعلام COUNT
+        items = query.limit(limit + 1).all()
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            next_cursor = Application.encode_cursor(items[-1])
+
+        return items, next_cursor
+
     @staticmethod
     def get_user_application_count(user_id):
         """حساب عدد طلبات المستخدم"""
@@ -239,8 +329,190 @@ class Application(db.Model):
 
     @staticmethod
     def can_user_submit_new_application(user_id):
-        """التحقق من إمكانية تقديم طلب جديد (أقل من 5 طلبات)"""
-        return Application.get_user_application_count(user_id) < 5
+        """التحقق من إمكانية تقديم طلب جديد (أقل من MAX_APPLICATIONS_PER_USER)"""
+        return Application.get_user_application_count(user_id) < MAX_APPLICATIONS_PER_USER
     
     def __repr__(self):
         return f'<Application {self.full_name}>'
+
+
+class ApplicationImage(db.Model):
+    """نموذج الصور الشخصية المرفقة بطلب التسجيل"""
+    __tablename__ = 'application_images'
+
+    id = db.Column(db.Integer, primary_key=True)
+    application_id = db.Column(db.Integer, db.ForeignKey('applications.id', ondelete='CASCADE'), nullable=False)
+    position = db.Column(db.SmallInteger, nullable=False)  # ترتيب الصورة في الطلب (1-5)
+    file_path = db.Column(db.String(500), nullable=False)
+
+    # بيانات وصفية للصورة
+    file_hash = db.Column(db.String(64), nullable=True)  # SHA-256
+    width = db.Column(db.Integer, nullable=True)
+    height = db.Column(db.Integer, nullable=True)
+    file_size = db.Column(db.Integer, nullable=True)
+    face_encoding_id = db.Column(db.String(64), nullable=True)
+    thumbnail_path = db.Column(db.String(500), nullable=True)
+
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('application_id', 'position', name='uq_app_image_position'),
+        db.Index('idx_app_image_hash', 'file_hash'),
+    )
+
+    def __repr__(self):
+        return f'<ApplicationImage {self.application_id}#{self.position}>'
+
+
+class VerificationCode(db.Model):
+    """نموذج رموز التحقق - رمز واحد نشط لكل مستخدم
+
+    يخزن بصمة HMAC للرمز وليس الرمز نفسه، والمقارنة بزمن ثابت.
+    """
+    __tablename__ = 'verification_codes'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'),
+                        nullable=False, unique=True)
+    code_hash = db.Column(db.String(64), nullable=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    @staticmethod
+    def _digest(code):
+        key = current_app.config['SECRET_KEY'].encode('utf-8')
+        return hmac.new(key, str(code).encode('utf-8'), hashlib.sha256).hexdigest()
+
+    @staticmethod
+    def issue(entry=None):
+        """إنشاء رمز جديد وتحديث السجل الحالي إن وجد
+
+        Returns:
+            tuple: (الرمز، السجل)
+        """
+        code = f'{secrets.randbelow(10 ** 6):06d}'
+        if entry is None:
+            entry = VerificationCode()
+        entry.code_hash = VerificationCode._digest(code)
+        entry.attempts = 0
+        entry.expires_at = datetime.utcnow() + timedelta(
+            minutes=current_app.config.get('OTP_CODE_TTL_MINUTES', 10))
+        entry.created_at = datetime.utcnow()
+        return code, entry
+
+    def is_expired(self):
+        return datetime.utcnow() > self.expires_at
+
+    def is_locked(self):
+        return self.attempts >= current_app.config.get('OTP_VERIFY_MAX_ATTEMPTS', 5)
+
+    def check(self, code):
+        """مقارنة الرمز وتسجيل المحاولة الفاشلة
+
+        Returns:
+            bool: True إذا كان الرمز صحيحاً وصالحاً
+        """
+        if self.is_expired() or self.is_locked():
+            return False
+        if hmac.compare_digest(self.code_hash, self._digest(code or '')):
+            return True
+        self.attempts += 1
+        return False
+
+    def __repr__(self):
+        return f'<VerificationCode user={self.user_id}>'
+
+
+class SessionRecord(db.Model):
+    """نموذج الجلسات المخزنة في الخادم (SESSION_BACKEND=sql)"""
+    __tablename__ = 'sessions'
+
+    id = db.Column(db.String(32), primary_key=True)
+    data = db.Column(db.Text, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f'<SessionRecord {self.expires_at}>'
+
+
+class OutboundMessage(db.Model):
+    """نموذج رسائل التحقق الصادرة (طابور الإرسال)"""
+    __tablename__ = 'outbound_messages'
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(30), nullable=False, default='verification')
+    phone = db.Column(db.String(20), nullable=False)
+    payload = db.Column(db.String(100), nullable=True)  # يمسح بعد انتهاء الإرسال
+    status = db.Column(db.Enum('pending', 'sending', 'sent', 'dead', name='message_status'),
+                       nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('idx_outbound_status_next', 'status', 'next_attempt_at'),
+    )
+
+    @property
+    def status_display(self):
+        """عرض حالة الإرسال"""
+        return {
+            'pending': 'قيد الإرسال',
+            'sending': 'قيد الإرسال',
+            'sent': 'تم الإرسال',
+            'dead': 'فشل الإرسال',
+        }.get(self.status, 'غير محدد')
+
+    def __repr__(self):
+        return f'<OutboundMessage {self.id} {self.status}>'
+
+
+class NotificationJob(db.Model):
+    """نموذج مهام الإشعارات الجماعية"""
+    __tablename__ = 'notification_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200), nullable=False)
+    template = db.Column(db.Text, nullable=False)
+    filters = db.Column(db.Text, nullable=True)  # JSON لشروط اختيار الطلبات
+    status = db.Column(db.Enum('pending', 'running', 'completed', 'failed', name='notification_job_status'),
+                       nullable=False, default='pending')
+    last_application_id = db.Column(db.Integer, nullable=False, default=0)  # نقطة الاستئناف
+    sent_count = db.Column(db.Integer, nullable=False, default=0)
+    failed_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    deliveries = db.relationship('NotificationDelivery', backref='job', lazy='dynamic',
+                                 cascade='all, delete-orphan')
+
+    def __repr__(self):
+        return f'<NotificationJob {self.id} {self.name}>'
+
+
+class NotificationDelivery(db.Model):
+    """نموذج إرسال إشعار لرقم واحد ضمن مهمة جماعية"""
+    __tablename__ = 'notification_deliveries'
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, db.ForeignKey('notification_jobs.id', ondelete='CASCADE'), nullable=False)
+    application_id = db.Column(db.Integer, nullable=False)
+    phone = db.Column(db.String(20), nullable=False)
+    # sending تسجل قبل الإرسال، فتبقى sending إذا توقفت المهمة أثناء الإرسال
+    status = db.Column(db.Enum('sending', 'sent', 'failed', name='notification_delivery_status'),
+                       nullable=False, default='sending')
+    error = db.Column(db.String(255), nullable=True)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    # رقم واحد لكل مهمة - يمنع الإرسال المزدوج عند الاستئناف
+    __table_args__ = (
+        db.UniqueConstraint('job_id', 'phone', name='uq_notification_job_phone'),
+        db.Index('idx_notification_job_status', 'job_id', 'status'),
+    )
+
+    def __repr__(self):
+        return f'<NotificationDelivery {self.job_id}:{self.phone} {self.status}>'
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+خدمة الإشعارات الجماعية عبر WhatsApp
+
+ترسل رسالة مبنية على قالب لكل رقم جوال في مجموعة من الطلبات، بعدد محدود
+من الخيوط المتزامنة ومعدل إرسال لا يتجاوز حد المزود. كل دفعة تسجل في
+notification_deliveries قبل الإرسال، لذلك استئناف المهمة بعد توقفها لا
+يعيد الإرسال لأي رقم سبق تسجيله.
+"""
+
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from flask import current_app
+from sqlalchemy.orm import load_only
+from app.extensions import db
+from app.models import Application, NotificationJob, NotificationDelivery
+
+logger = logging.getLogger(__name__)
+
+# الحقول المسموح بالتصفية عليها
+FILTER_FIELDS = ('term_name', 'school_name', 'gender', 'nationality')
+
+# الحقول المتاحة في قالب الرسالة
+TEMPLATE_FIELDS = ('full_name', 'application_number', 'term_name', 'school_name', 'phone')
+
+
+class RateLimiter:
+    """محدد معدل (token bucket) آمن بين الخيوط"""
+
+    def __init__(self, rate_per_second):
+        self.interval = 1.0 / rate_per_second if rate_per_second else 0
+        self._lock = threading.Lock()
+        self._next_slot = time.monotonic()
+
+    def acquire(self):
+        """الانتظار حتى يحين دور الرسالة التالية"""
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class _TemplateFields(dict):
+    """قاموس يترك المتغيرات غير المعروفة كما هي في النص"""
+
+    def __missing__(self, key):
+        return '{' + key + '}'
+
+
+def render_message(template, application):
+    """بناء نص الرسالة لطلب معين"""
+    fields = _TemplateFields({name: getattr(application, name) for name in TEMPLATE_FIELDS})
+    return template.format_map(fields)
+
+
+def build_recipient_query(filters):
+    """استعلام الطلبات المستهدفة بالأعمدة اللازمة للقالب فقط"""
+    query = Application.query.options(
+        load_only(Application.id, *[getattr(Application, name) for name in TEMPLATE_FIELDS])
+    )
+    for name, value in (filters or {}).items():
+        if name not in FILTER_FIELDS:
+            raise ValueError(f'لا يمكن التصفية على الحقل: {name}')
+        query = query.filter(getattr(Application, name) == value)
+    return query
+
+
+def create_job(name, template, filters=None):
+    """إنشاء مهمة إشعارات جديدة"""
+    build_recipient_query(filters)  # التحقق من الشروط قبل الحفظ
+    job = NotificationJob(name=name, template=template,
+                          filters=json.dumps(filters or {}, ensure_ascii=False))
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def preview_messages(template, filters=None, chunk_size=200):
+    """نصوص الرسائل التي سترسلها مهمة جديدة بنفس الشروط، بدون أي كتابة في قاعدة البيانات
+
+    Yields:
+        tuple: (رقم الجوال، نص الرسالة) مرة واحدة لكل رقم كما في run_job
+    """
+    seen = set()
+    last_id = 0
+    while True:
+        chunk = build_recipient_query(filters).filter(
+            Application.id > last_id
+        ).order_by(Application.id).limit(chunk_size).all()
+        if not chunk:
+            return
+        for application in chunk:
+            if application.phone not in seen:
+                seen.add(application.phone)
+                yield application.phone, render_message(template, application)
+        last_id = chunk[-1].id
+
+
+def _send_whatsapp(phone_number, text):
+    from app.services.whatsapp import WhatsAppService
+    return WhatsAppService.send_text_message(phone_number, text)
+
+
+def _make_deliver(send, rate_per_second):
+    """دالة إرسال لخيوط التنفيذ مع محدد المعدل وسياق التطبيق"""
+    app = current_app._get_current_object()
+    send = send or _send_whatsapp
+    limiter = RateLimiter(rate_per_second)
+
+    def deliver(item):
+        phone, text = item
+        limiter.acquire()
+        with app.app_context():
+            try:
+                return send(phone, text)
+            except Exception as e:
+                return False, str(e)
+
+    return deliver
+
+
+def run_job(job_id, concurrency=4, rate_per_second=20, chunk_size=200, send=None):
+    """تنفيذ مهمة إشعارات أو استئنافها من آخر نقطة حفظ
+
+    Args:
+        job_id (int): معرف المهمة
+        concurrency (int): أقصى عدد من الرسائل قيد الإرسال في نفس الوقت
+        rate_per_second (float): أقصى معدل إرسال (0 بدون حد)
+        chunk_size (int): عدد الطلبات في كل دفعة
+        send (callable): دالة الإرسال (phone, text) -> (bool, error)
+
+    Returns:
+        NotificationJob: المهمة بعد التنفيذ
+    """
+    deliver = _make_deliver(send, rate_per_second)
+
+    job = db.session.get(NotificationJob, job_id)
+    if job is None:
+        raise ValueError(f'المهمة غير موجودة: {job_id}')
+    filters = json.loads(job.filters or '{}')
+    job.status = 'running'
+    db.session.commit()
+
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            while True:
+                chunk = build_recipient_query(filters).filter(
+                    Application.id > job.last_application_id
+                ).order_by(Application.id).limit(chunk_size).all()
+                if not chunk:
+                    break
+
+                # الأرقام المسجلة مسبقاً في هذه المهمة لا يعاد الإرسال لها
+                phones = {application.phone for application in chunk}
+                seen = {phone for (phone,) in db.session.query(NotificationDelivery.phone).filter(
+                    NotificationDelivery.job_id == job.id,
+                    NotificationDelivery.phone.in_(phones)
+                )}
+
+                batch = []
+                for application in chunk:
+                    if application.phone in seen:
+                        continue
+                    seen.add(application.phone)
+                    delivery = NotificationDelivery(job_id=job.id, application_id=application.id,
+                                                    phone=application.phone, status='sending')
+                    batch.append((delivery, render_message(job.template, application)))
+
+                # نقطة الحفظ: تسجيل الدفعة قبل الإرسال
+                db.session.add_all([delivery for delivery, _ in batch])
+                job.last_application_id = chunk[-1].id
+                db.session.commit()
+
+                results = executor.map(deliver, [(delivery.phone, text) for delivery, text in batch])
+                for (delivery, _), (sent, error) in zip(batch, results):
+                    if sent:
+                        delivery.status = 'sent'
+                        delivery.sent_at = datetime.utcnow()
+                        job.sent_count += 1
+                    else:
+                        delivery.status = 'failed'
+                        delivery.error = (error or '')[:255]
+                        job.failed_count += 1
+                db.session.commit()
+                logger.info("📨 المهمة %s: تم إرسال %s وفشل %s", job.id, job.sent_count, job.failed_count)
+
+        job.status = 'completed'
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        job.status = 'failed'
+        db.session.commit()
+        raise
+
+    return job
+
+
+def retry_failed(job_id, concurrency=4, rate_per_second=20, send=None):
+    """إعادة الإرسال للأرقام التي فشل الإرسال لها في مهمة سابقة"""
+    deliver = _make_deliver(send, rate_per_second)
+    job = db.session.get(NotificationJob, job_id)
+    if job is None:
+        raise ValueError(f'المهمة غير موجودة: {job_id}')
+
+    failed = job.deliveries.filter_by(status='failed').all()
+    if not failed:
+        return 0
+
+    applications = {application.id: application for application in build_recipient_query(None).filter(
+        Application.id.in_([delivery.application_id for delivery in failed])
+    )}
+
+    batch = []
+    for delivery in failed:
+        application = applications.get(delivery.application_id)
+        if application is None:
+            continue
+        delivery.status = 'sending'
+        batch.append((delivery, render_message(job.template, application)))
+    db.session.commit()
+
+    recovered = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = executor.map(deliver, [(delivery.phone, text) for delivery, text in batch])
+        for (delivery, _), (sent, error) in zip(batch, results):
+            if sent:
+                delivery.status = 'sent'
+                delivery.sent_at = datetime.utcnow()
+                delivery.error = None
+                job.sent_count += 1
+                job.failed_count -= 1
+                recovered += 1
+            else:
+                delivery.status = 'failed'
+                delivery.error = (error or '')[:255]
+    db.session.commit()
+    return recovered
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+قياس أداء تجمع اتصالات قاعدة البيانات
+
+لكل محرك (الرئيسي ونسخة القراءة) إحصائيات مستقلة تعرض باسمه في صفحة حالة
+النظام وفي /metrics بالوسم engine.
+"""
+
+import threading
+import time
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+from app.services.metrics import metrics
+
+
+class PoolStats:
+    """إحصائيات تجمع اتصالات محرك واحد في العملية الحالية (worker)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """تصفير جميع العدادات"""
+        with self._lock:
+            self.checkouts = 0
+            self.checkins = 0
+            self.connects = 0
+            self.invalidations = 0
+            self.timeouts = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+
+    def record_wait(self, seconds):
+        """تسجيل زمن انتظار الحصول على اتصال من التجمع"""
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += seconds
+            if seconds > self.max_wait:
+                self.max_wait = seconds
+
+    def increment(self, name):
+        """زيادة عداد حدث معين"""
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self):
+        """نسخة من العدادات الحالية"""
+        with self._lock:
+            avg_wait = self.total_wait / self.checkouts if self.checkouts else 0.0
+            return {
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'connects': self.connects,
+                'invalidations': self.invalidations,
+                'timeouts': self.timeouts,
+                'avg_wait_ms': round(avg_wait * 1000, 3),
+                'max_wait_ms': round(self.max_wait * 1000, 3),
+            }
+
+
+# اسم المحرك الافتراضي (بلا bind) في telemetry و /metrics
+PRIMARY_ENGINE = 'primary'
+
+
+def engine_name(bind_key):
+    """اسم المحرك: primary للافتراضي وإلا مفتاح الـ bind (مثل replica)"""
+    return bind_key or PRIMARY_ENGINE
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool يقيس زمن انتظار الحصول على الاتصال في إحصائيات محركه"""
+
+    # PoolStats الخاصة بالمحرك، يعينها instrument_engine
+    stats = None
+
+    def _do_get(self):
+        stats = self.stats
+        if stats is None:
+            return super()._do_get()
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            stats.increment('timeouts')
+            raise
+        finally:
+            stats.record_wait(time.perf_counter() - start)
+
+    def recreate(self):
+        # engine.dispose() ينشئ تجمعاً جديداً، فتنتقل إليه نفس الإحصائيات
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+def _instrumented_options(uri, options):
+    """خيارات المحرك مع التجمع المقاس، ما عدا SQLite الذي يستخدم تجمعاً خاصاً به"""
+    if str(uri or '').startswith('sqlite'):
+        return options
+    options = dict(options or {})
+    options.setdefault('poolclass', InstrumentedQueuePool)
+    return options
+
+
+def prepare_engine_options(app):
+    """استخدام التجمع المقاس لقواعد البيانات الخادمية (MySQL وغيرها)
+
+    يجب استدعاؤها قبل db.init_app لأن المحركات تنشأ عند التهيئة.
+    تشمل SQLALCHEMY_BINDS (مثل نسخة القراءة) لأن SQLALCHEMY_ENGINE_OPTIONS
+    لا تطبق إلا على المحرك الافتراضي.
+    """
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = _instrumented_options(
+        app.config.get('SQLALCHEMY_DATABASE_URI'), app.config.get('SQLALCHEMY_ENGINE_OPTIONS'))
+
+    binds = {}
+    for key, bind in (app.config.get('SQLALCHEMY_BINDS') or {}).items():
+        if not isinstance(bind, dict):
+            bind = {'url': bind}
+        binds[key] = _instrumented_options(bind.get('url'), bind)
+    app.config['SQLALCHEMY_BINDS'] = binds
+
+
+def instrument_engine(engine, name=PRIMARY_ENGINE):
+    """إحصائيات تجمع مستقلة للمحرك وتسجيل مستمعي أحداثه"""
+    if getattr(engine, '_pool_instrumented', False):
+        return
+
+    stats = engine.pool_stats = PoolStats()
+    engine.pool_name = name
+    if isinstance(engine.pool, InstrumentedQueuePool):
+        engine.pool.stats = stats
+
+    @event.listens_for(engine, 'connect')
+    def _on_connect(dbapi_connection, connection_record):
+        stats.increment('connects')
+
+    @event.listens_for(engine, 'checkin')
+    def _on_checkin(dbapi_connection, connection_record):
+        stats.increment('checkins')
+
+    @event.listens_for(engine, 'invalidate')
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        stats.increment('invalidations')
+
+    metrics.register_pool(name, lambda: get_pool_status(engine))
+    engine._pool_instrumented = True
+
+
+def get_pool_status(engine):
+    """الحالة الحالية لتجمع المحرك مع إحصائياته المجمعة"""
+    pool = engine.pool
+    stats = getattr(engine, 'pool_stats', None)
+    status = stats.snapshot() if stats else PoolStats().snapshot()
+    status['engine'] = getattr(engine, 'pool_name', PRIMARY_ENGINE)
+    status['pool_class'] = type(pool).__name__
+
+    # هذه القيم متاحة فقط في QueuePool وما يشتق منه
+    if isinstance(pool, QueuePool):
+        status.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': max(pool.overflow(), 0),
+            'max_overflow': pool._max_overflow,
+        })
+    return status
+
+
+def get_pools_status(engines):
+    """حالة تجمع كل محرك مفهرسة باسمه
+
+    Args:
+        engines (dict): db.engines (مفتاح الـ bind أو None للمحرك الافتراضي)
+    """
+    return {engine_name(key): get_pool_status(engine) for key, engine in engines.items()}
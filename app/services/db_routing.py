@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+توجيه استعلامات القراءة إلى نسخة القراءة (read replica)
+
+يتم التوجيه فقط في المسارات المعلمة بـ replica_reads، وتعود جميع الاستعلامات
+إلى القاعدة الرئيسية بعد أي كتابة في الطلب الحالي، ولمدة قصيرة بعد الكتابة
+لنفس المستخدم (قراءة ما كتبه) لتجنب تأخر النسخ.
+"""
+
+import time
+from functools import wraps
+from flask import g, session, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql import Select
+
+REPLICA_BIND_KEY = 'replica'
+STICKY_SESSION_KEY = '_db_primary_until'
+
+
+class RoutingSession(Session):
+    """جلسة ترسل استعلامات SELECT إلى نسخة القراءة عند السماح بذلك"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and isinstance(clause, Select) and _replica_allowed(clause):
+            replica = self._db.engines.get(REPLICA_BIND_KEY)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_write(session_, flush_context):
+    """أي كتابة تعيد بقية الطلب إلى القاعدة الرئيسية"""
+    if has_request_context():
+        g.db_wrote = True
+
+
+def _replica_allowed(clause):
+    """هل يمكن تنفيذ هذا الاستعلام على نسخة القراءة؟"""
+    if not has_request_context():
+        return False
+    if not g.get('db_replica_reads') or g.get('db_wrote') or g.get('db_force_primary'):
+        return False
+    # SELECT ... FOR UPDATE يجب أن ينفذ على القاعدة الرئيسية
+    return clause._for_update_arg is None
+
+
+def replica_reads(f):
+    """ديكوريتر للسماح بتوجيه قراءات المسار إلى نسخة القراءة
+
+    للمسارات التي تقرأ فقط: قراءة قبل أول كتابة في نفس الطلب (مثل التحقق من
+    كلمة المرور ثم تحديث رمز التحقق) قد ترى بيانات متأخرة من النسخة.
+    يوضع قبل login_required حتى يشمل تحميل المستخدم.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        g.db_replica_reads = True
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def init_replica_routing(app):
+    """تسجيل خطافات الالتصاق بالقاعدة الرئيسية بعد الكتابة"""
+    if REPLICA_BIND_KEY not in (app.config.get('SQLALCHEMY_BINDS') or {}):
+        return
+
+    sticky_seconds = app.config.get('REPLICA_STICKY_SECONDS', 5)
+
+    @app.before_request
+    def _check_primary_stickiness():
+        until = session.get(STICKY_SESSION_KEY)
+        if until and until > time.time():
+            g.db_force_primary = True
+
+    @app.after_request
+    def _set_primary_stickiness(response):
+        if g.get('db_wrote'):
+            session[STICKY_SESSION_KEY] = time.time() + sticky_seconds
+        return response
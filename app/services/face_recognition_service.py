@@ -75,7 +75,7 @@ class FaceRecognitionService:
             return True, f"تم العثور على {len(face_encodings)} وجه في الصورة.", face_encodings
             
         except Exception as e:
-            current_app.logger.error(f"خطأ في اكتشاف الوجوه: {str(e)}")
+            current_app.logger.error("خطأ في اكتشاف الوجوه: %s", e)
             image_file.seek(0)
             return False, "خطأ في تحليل الصورة. يرجى المحاولة مرة أخرى.", []
     
@@ -124,7 +124,7 @@ class FaceRecognitionService:
             return True, "جودة الصورة مقبولة."
             
         except Exception as e:
-            current_app.logger.error(f"خطأ في فحص جودة الصورة: {str(e)}")
+            current_app.logger.error("خطأ في فحص جودة الصورة: %s", e)
             image_file.seek(0)
             return False, "خطأ في فحص جودة الصورة."
     
@@ -152,7 +152,7 @@ class FaceRecognitionService:
             return False
             
         except Exception as e:
-            current_app.logger.error(f"خطأ في مقارنة الوجوه: {str(e)}")
+            current_app.logger.error("خطأ في مقارنة الوجوه: %s", e)
             return False
     
     def get_image_hash(self, image_file) -> str:
@@ -208,7 +208,7 @@ class FaceRecognitionService:
                 json.dump(user_data, f, ensure_ascii=False, indent=2)
                 
         except Exception as e:
-            current_app.logger.error(f"خطأ في حفظ ترميزات الوجوه: {str(e)}")
+            current_app.logger.error("خطأ في حفظ ترميزات الوجوه: %s", e)
     
     def load_user_face_encodings(self, user_id: int) -> Dict[str, List[np.ndarray]]:
         """
@@ -238,7 +238,7 @@ class FaceRecognitionService:
             return result
             
         except Exception as e:
-            current_app.logger.error(f"خطأ في تحميل ترميزات الوجوه: {str(e)}")
+            current_app.logger.error("خطأ في تحميل ترميزات الوجوه: %s", e)
             return {}
     
     def check_duplicate_face(self, user_id: int, new_face_encodings: List[np.ndarray]) -> Tuple[bool, str]:
@@ -262,7 +262,7 @@ class FaceRecognitionService:
             return False, ""
             
         except Exception as e:
-            current_app.logger.error(f"خطأ في فحص تكرار الوجه: {str(e)}")
+            current_app.logger.error("خطأ في فحص تكرار الوجه: %s", e)
             return False, ""
     
     def validate_person_image(self, image_file, user_id: int, image_name: str) -> Tuple[bool, str]:
@@ -299,7 +299,7 @@ class FaceRecognitionService:
             return True, f"تم قبول الصورة. {faces_msg}"
             
         except Exception as e:
-            current_app.logger.error(f"خطأ في التحقق من صورة الشخص: {str(e)}")
+            current_app.logger.error("خطأ في التحقق من صورة الشخص: %s", e)
             return False, "خطأ في معالجة الصورة. يرجى المحاولة مرة أخرى."
 
 
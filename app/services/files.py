@@ -7,37 +7,112 @@ import os
 import uuid
 import shutil
 import io
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
 from PIL import Image, ImageDraw, ImageFont
 
 # لا نستخدم python-magic على ويندوز لتجنب مشاكل الاستقرار
 MAGIC_AVAILABLE = False
 from flask import current_app, abort, send_file, request
+from werkzeug.security import safe_join
 from werkzeug.utils import secure_filename
 from werkzeug.exceptions import RequestEntityTooLarge
-
-# استيراد خدمات التعرف على الوجوه
-try:
-    from .face_recognition_service import face_recognition_service
-    FACE_RECOGNITION_AVAILABLE = True
-    VALIDATION_SERVICE = face_recognition_service
-    VALIDATION_METHOD = "متقدم (التعرف على الوجوه)"
-except ImportError:
-    FACE_RECOGNITION_AVAILABLE = False
-    try:
-        from .simple_image_validator import simple_image_validator
-        VALIDATION_SERVICE = simple_image_validator
-        VALIDATION_METHOD = "أساسي (فحص الجودة والتكرار)"
-    except ImportError:
-        VALIDATION_SERVICE = None
-        VALIDATION_METHOD = "معطل"
+from app.services.metrics import metrics, span, timed
+
+UPLOAD_VALIDATIONS = metrics.counter(
+    'upload_validations_total', 'Person image validations by result', ('result',))
+UPLOAD_BYTES = metrics.counter('upload_bytes_total', 'Bytes written to the upload folder')
+
+# مكان ملف على القرص: storage هو 'upload' أو 'static'، و owner_id من المسار uploads/<user_id>/...
+FileLocation = namedtuple('FileLocation', ('path', 'storage', 'owner_id'))
+CacheInfo = namedtuple('CacheInfo', ('hits', 'misses', 'maxsize', 'currsize'))
+
+
+class FileLocationCache:
+    """ذاكرة LRU محدودة لأماكن الملفات مع إمكانية حذف مسار بعينه
+
+    functools.lru_cache لا يسمح بحذف مفتاح واحد، وهو مطلوب عند حذف الملف أو نقله.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.maxsize = 0
+
+    def get(self, key):
+        with self._lock:
+            location = self._entries.get(key)
+            if location is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return location
+
+    def put(self, key, location, maxsize):
+        with self._lock:
+            self.maxsize = maxsize
+            self._entries[key] = location
+            self._entries.move_to_end(key)
+            while len(self._entries) > maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def cache_info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._entries))
+
+
+file_locations = FileLocationCache()
+metrics.register_cache('file_locations', file_locations.cache_info)
+
+# خدمة فحص الصور تستورد عند أول استخدام: face_recognition (dlib) ثقيلة
+# ولا داعي لتحميلها في كل عملية عند بدء التشغيل
+_validation_backend = None
+_validation_backend_lock = threading.Lock()
+
+
+def load_validation_backend():
+    """تحميل خدمة فحص الصور المتاحة مرة واحدة لكل عملية
+
+    Returns:
+        tuple: (الخدمة أو None، هل التعرف على الوجوه متاح، وصف النظام)
+    """
+    global _validation_backend
+    if _validation_backend is not None:
+        return _validation_backend
+
+    with _validation_backend_lock:
+        if _validation_backend is None:
+            try:
+                from .face_recognition_service import face_recognition_service
+                backend = (face_recognition_service, True, "متقدم (التعرف على الوجوه)")
+            except ImportError:
+                try:
+                    from .simple_image_validator import simple_image_validator
+                    backend = (simple_image_validator, False, "أساسي (فحص الجودة والتكرار)")
+                except ImportError:
+                    backend = (None, False, "معطل")
+            _validation_backend = backend
+    return _validation_backend
 
 
 def get_validation_system_status():
     """الحصول على حالة نظام التحقق من الصور"""
+    service, face_recognition_available, method = load_validation_backend()
     return {
-        'face_recognition_available': FACE_RECOGNITION_AVAILABLE,
-        'validation_method': VALIDATION_METHOD,
-        'service_available': VALIDATION_SERVICE is not None
+        'face_recognition_available': face_recognition_available,
+        'validation_method': method,
+        'service_available': service is not None
     }
 
 
@@ -77,7 +152,7 @@ def validate_file_type(file, allowed_extensions, file_type='file'):
                 if header != b"%PDF-":
                     return False, 'الملف ليس PDF صالح'
     except Exception as e:
-        current_app.logger.error(f'خطأ في التحقق من نوع/سلامة الملف: {str(e)}')
+        current_app.logger.error('خطأ في التحقق من نوع/سلامة الملف: %s', e)
         return False, 'نوع الملف غير صحيح أو ملف تالف'
 
     return True, 'الملف صحيح'
@@ -135,7 +210,7 @@ def validate_image_dimensions(file, min_width=300, min_height=300):
                     file.seek(0)
                     return True, 'تم تعديل أبعاد الصورة تلقائياً لتتوافق مع الحد الأدنى (بيئة التطوير)'
                 except Exception as ie:
-                    current_app.logger.error(f'فشل تعديل أبعاد الصورة تلقائياً: {str(ie)}')
+                    current_app.logger.error('فشل تعديل أبعاد الصورة تلقائياً: %s', ie)
                     file.seek(pos)
                     return False, f'أبعاد الصورة صغيرة جداً. الحد الأدنى: {min_width}×{min_height} بكسل'
             else:
@@ -147,7 +222,7 @@ def validate_image_dimensions(file, min_width=300, min_height=300):
         return True, 'أبعاد الصورة مناسبة'
 
     except Exception as e:
-        current_app.logger.error(f'خطأ في التحقق من أبعاد الصورة: {str(e)}')
+        current_app.logger.error('خطأ في التحقق من أبعاد الصورة: %s', e)
         return False, 'خطأ في قراءة الصورة'
 
 
@@ -167,38 +242,49 @@ def validate_file(file, file_type='document', user_id=None, image_name=None):
         check_dimensions = False
     
     # التحقق من نوع الملف
-    valid_type, type_message = validate_file_type(file, allowed_extensions, file_type)
+    with span('upload.validate_type'):
+        valid_type, type_message = validate_file_type(file, allowed_extensions, file_type)
     if not valid_type:
         return False, type_message
     
     # التحقق من حجم الملف
-    valid_size, size_message = validate_file_size(file, max_size, file_type)
+    with span('upload.validate_size'):
+        valid_size, size_message = validate_file_size(file, max_size, file_type)
     if not valid_size:
         return False, size_message
     
     # فحص الصور الشخصية (وجوه أو تكرار حسب النظام المتاح)
-    if file_type == 'photo' and VALIDATION_SERVICE and user_id and image_name:
+    if file_type == 'photo' and user_id and image_name:
+        service, face_recognition_available, method = load_validation_backend()
+    else:
+        service = None
+    if service:
         try:
-            if FACE_RECOGNITION_AVAILABLE:
+            if face_recognition_available:
                 # استخدام النظام المتقدم للتعرف على الوجوه
-                valid_face, face_message = VALIDATION_SERVICE.validate_person_image(
-                    file, user_id, image_name
-                )
+                with span('upload.validate_face'):
+                    valid_face, face_message = service.validate_person_image(
+                        file, user_id, image_name
+                    )
             else:
                 # استخدام النظام المبسط للتحقق من الجودة والتكرار
-                valid_face, face_message = VALIDATION_SERVICE.validate_person_image_simple(
-                    file, user_id, image_name
-                )
+                with span('upload.validate_quality'):
+                    valid_face, face_message = service.validate_person_image_simple(
+                        file, user_id, image_name
+                    )
             
             if not valid_face:
+                UPLOAD_VALIDATIONS.inc(result='rejected')
                 return False, face_message
                 
-            current_app.logger.info(f"تم فحص الصورة باستخدام النظام: {VALIDATION_METHOD}")
+            UPLOAD_VALIDATIONS.inc(result='accepted')
+            current_app.logger.debug("تم فحص الصورة باستخدام النظام: %s", method)
             
         except Exception as e:
-            current_app.logger.error(f"خطأ في فحص الصورة: {str(e)}")
+            UPLOAD_VALIDATIONS.inc(result='error')
+            current_app.logger.error("خطأ في فحص الصورة: %s", e)
             # في حالة فشل الفحص، نكمل بدون فحص مع تحذير
-            current_app.logger.warning(f"تم تخطي فحص الصورة بسبب خطأ تقني - النظام: {VALIDATION_METHOD}")
+            current_app.logger.warning("تم تخطي فحص الصورة بسبب خطأ تقني - النظام: %s", method)
     
     return True, 'الملف صحيح'
 
@@ -262,7 +348,7 @@ def create_default_avatar(name, user_id, save_path, is_male=True):
 
         return True
     except Exception as e:
-        current_app.logger.error(f'خطأ في إنشاء الصورة الافتراضية: {str(e)}')
+        current_app.logger.error('خطأ في إنشاء الصورة الافتراضية: %s', e)
         return False
 
 
@@ -294,15 +380,46 @@ def ensure_student_has_files(user_id, full_name, gender, folder_type='temp'):
 
             if create_default_avatar(full_name, user_id, photo_path, is_male):
                 files_created['photo'] = f"{folder_type}/{user_id}/{photo_filename}"
-                current_app.logger.info(f'تم إنشاء صورة افتراضية للمستخدم {user_id}')
+                current_app.logger.info('تم إنشاء صورة افتراضية للمستخدم %s', user_id)
 
         return files_created
 
     except Exception as e:
-        current_app.logger.error(f'خطأ في ضمان وجود ملفات الطالب: {str(e)}')
+        current_app.logger.error('خطأ في ضمان وجود ملفات الطالب: %s', e)
         return {}
 
 
+@timed('upload.metadata')
+def get_image_metadata(file):
+    """استخراج البيانات الوصفية للصورة (hash، الأبعاد، الحجم) دون تغيير موضع المؤشر"""
+    pos = file.tell()
+    try:
+        file.seek(0)
+        digest = hashlib.sha256()
+        file_size = 0
+        for chunk in iter(lambda: file.read(65536), b''):
+            digest.update(chunk)
+            file_size += len(chunk)
+
+        # قراءة الأبعاد من ترويسة الصورة فقط دون فك ترميزها بالكامل
+        file.seek(0)
+        width = height = None
+        try:
+            with Image.open(file) as img:
+                width, height = img.size
+        except Exception:
+            pass
+
+        return {
+            'file_hash': digest.hexdigest(),
+            'file_size': file_size,
+            'width': width,
+            'height': height,
+        }
+    finally:
+        file.seek(pos)
+
+
 def save_uploaded_file(file, folder_type, user_id, file_type='document', image_name=None):
     """حفظ الملف المرفوع بجودة عالية مع فحص الوجوه"""
     # إنشاء اسم الصورة إذا لم يتم تمريره
@@ -342,16 +459,18 @@ def save_uploaded_file(file, folder_type, user_id, file_type='document', image_n
         else:
             # للمستندات: حفظ مباشر
             file.save(file_path)
+        UPLOAD_BYTES.inc(os.path.getsize(file_path))
 
         # إرجاع المسار النسبي (استخدام / دائماً للمسارات النسبية)
         relative_path = f"{folder_type}/{user_id}/{filename}"
         return relative_path
 
     except Exception as e:
-        current_app.logger.error(f'خطأ في حفظ الملف: {str(e)}')
+        current_app.logger.error('خطأ في حفظ الملف: %s', e)
         raise ValueError('فشل في حفظ الملف')
 
 
+@timed('upload.save_image')
 def save_high_quality_image(file, file_path):
     """حفظ الصورة بجودة عالية مضمونة"""
     try:
@@ -390,10 +509,10 @@ def save_high_quality_image(file, file_path):
                 # افتراضي: حفظ كـ JPEG بجودة عالية
                 img.save(file_path, 'JPEG', quality=100, optimize=False)
                 
-        current_app.logger.info(f'تم حفظ الصورة بجودة عالية: {file_path}')
+        current_app.logger.debug('تم حفظ الصورة بجودة عالية: %s', file_path)
         
     except Exception as e:
-        current_app.logger.error(f'خطأ في حفظ الصورة بجودة عالية: {str(e)}')
+        current_app.logger.error('خطأ في حفظ الصورة بجودة عالية: %s', e)
         # في حالة الفشل، احفظ الملف مباشرة
         file.seek(0)
         file.save(file_path)
@@ -401,6 +520,9 @@ def save_high_quality_image(file, file_path):
 
 def move_file(source_path, dest_folder_type, user_id):
     """نقل الملف من مجلد إلى آخر"""
+    # image_derivatives تستورد من هذه الوحدة
+    from app.services.image_derivatives import delete_derivatives
+
     upload_folder = current_app.config['UPLOAD_FOLDER']
     # تطبيع المسار لتجنب مشاكل الخلط بين الشرطات المائلة على ويندوز
     normalized_source_path = source_path.replace('/', os.sep).replace('\\', os.sep)
@@ -421,7 +543,7 @@ def move_file(source_path, dest_folder_type, user_id):
     dest_folder = os.path.normpath(dest_folder)
 
     if not os.path.exists(source_full_path):
-        current_app.logger.warning(f'الملف المصدر غير موجود: {source_full_path}')
+        current_app.logger.warning('الملف المصدر غير موجود: %s', source_full_path)
         return None
 
     # إنشاء مجلد الوجهة
@@ -434,18 +556,23 @@ def move_file(source_path, dest_folder_type, user_id):
     try:
         # نقل الملف
         shutil.move(source_full_path, dest_path)
+        invalidate_file_location(source_path)
+        delete_derivatives(source_path)
 
         # إرجاع المسار النسبي الجديد (استخدام / دائماً للمسارات النسبية)
         relative_path = f"{dest_folder_type}/{user_id}/{filename}"
         return relative_path
 
     except Exception as e:
-        current_app.logger.error(f'خطأ في نقل الملف: {str(e)}')
+        current_app.logger.error('خطأ في نقل الملف: %s', e)
         return None
 
 
 def delete_file(file_path):
     """حذف الملف"""
+    # image_derivatives تستورد من هذه الوحدة
+    from app.services.image_derivatives import delete_derivatives
+
     if not file_path:
         return True
 
@@ -468,6 +595,8 @@ def delete_file(file_path):
     try:
         if os.path.exists(full_path):
             os.remove(full_path)
+            invalidate_file_location(file_path)
+            delete_derivatives(file_path)
 
             # حذف المجلد إذا كان فارغاً
             folder_path = os.path.dirname(full_path)
@@ -477,47 +606,90 @@ def delete_file(file_path):
         return True
 
     except Exception as e:
-        current_app.logger.error(f'خطأ في حذف الملف: {str(e)}')
+        current_app.logger.error('خطأ في حذف الملف: %s', e)
         return False
 
 
-def serve_file(file_path, user_id=None, check_permissions=True):
-    """تقديم الملف مع التحقق من الصلاحيات"""
-    if not file_path:
-        abort(404)
-
+def upload_root():
+    """المسار المطلق لمجلد الرفع (النسبي يحسب من جذر المشروع)"""
     upload_folder = current_app.config['UPLOAD_FOLDER']
+    if not os.path.isabs(upload_folder):
+        project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        upload_folder = os.path.join(project_root, upload_folder)
+    return os.path.realpath(upload_folder)
+
+
+def _locate_file(file_path):
+    """البحث عن الملف في مجلد الرفع ثم في مجلد static"""
+    root = upload_root()
     # تطبيع المسار لتجنب مشاكل الخلط بين الشرطات المائلة على ويندوز
-    normalized_file_path = file_path.replace('/', os.sep).replace('\\', os.sep)
+    full_path = os.path.normpath(os.path.join(root, file_path.replace('/', os.sep).replace('\\', os.sep)))
+    if os.path.isfile(full_path):
+        # التحقق من الأمان - التأكد من أن المسار داخل مجلد الرفع
+        real_path = os.path.realpath(full_path)
+        if not real_path.startswith(root + os.sep):
+            current_app.logger.warning('محاولة وصول غير آمنة للملف: %s', full_path)
+            abort(403)
+        path_parts = file_path.split('/')
+        try:
+            owner_id = int(path_parts[1]) if len(path_parts) >= 2 else None
+        except ValueError:
+            owner_id = None
+        return FileLocation(real_path, 'upload', owner_id)
 
-    # التأكد من أن المسار مطلق
-    if os.path.isabs(upload_folder):
-        full_path = os.path.join(upload_folder, normalized_file_path)
-    else:
-        # إذا كان المسار نسبي، نجعله نسبة إلى جذر المشروع (مجلد أعلى من app)
-        app_dir = os.path.dirname(os.path.abspath(__file__))  # app/services
-        project_root = os.path.dirname(os.path.dirname(app_dir))  # جذر المشروع
-        full_path = os.path.join(project_root, upload_folder, normalized_file_path)
+    # ملفات قديمة وضعت تحت static/
+    static_path = safe_join(current_app.static_folder or 'static', file_path)
+    if static_path and os.path.isfile(static_path):
+        return FileLocation(static_path, 'static', None)
+    return None
 
-    # تطبيع المسار النهائي
-    full_path = os.path.normpath(full_path)
 
-    current_app.logger.debug(f'محاولة الوصول للملف: {full_path}')
+def resolve_file_location(file_path):
+    """مكان الملف على القرص (مجلد الرفع أولاً ثم static)، أو None إذا لم يوجد
+
+    النتيجة تحفظ في file_locations فلا يلمس الطلب المتكرر القرص إلا عند إرسال الملف.
+    الملفات غير الموجودة لا تحفظ حتى يظهر الملف فور رفعه.
+    """
+    maxsize = current_app.config.get('FILE_LOCATION_CACHE_SIZE', 4096)
+    if maxsize <= 0:
+        return _locate_file(file_path)
+
+    key = (current_app.config['UPLOAD_FOLDER'], file_path)
+    location = file_locations.get(key)
+    if location is None:
+        location = _locate_file(file_path)
+        if location is not None:
+            file_locations.put(key, location, maxsize)
+    return location
+
 
-    # التحقق من الأمان - التأكد من أن المسار داخل مجلد الرفع
+def invalidate_file_location(file_path):
+    """حذف مكان الملف المحفوظ (بعد حذفه أو نقله)"""
+    file_locations.invalidate((current_app.config['UPLOAD_FOLDER'], file_path))
+
+
+def send_file_location(file_path, location):
+    """إرسال ملف من مكانه المحفوظ"""
     try:
-        upload_real_path = os.path.realpath(upload_folder if os.path.isabs(upload_folder)
-                                          else os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), upload_folder))
-        file_real_path = os.path.realpath(full_path)
-        if not file_real_path.startswith(upload_real_path):
-            current_app.logger.warning(f'محاولة وصول غير آمنة للملف: {full_path}')
-            abort(403)
+        return send_file(location.path)
+    except FileNotFoundError:
+        # حذف أو نقل في عملية أخرى بعد حفظ مكانه
+        invalidate_file_location(file_path)
+        current_app.logger.error('الملف غير موجود: %s', location.path)
+        abort(404)
     except Exception as e:
-        current_app.logger.error(f'خطأ في التحقق من أمان المسار: {str(e)}')
+        current_app.logger.error('خطأ في تقديم الملف: %s', e)
         abort(500)
 
-    if not os.path.exists(full_path):
-        current_app.logger.error(f'الملف غير موجود: {full_path}')
+
+def serve_file(file_path, user_id=None, check_permissions=True):
+    """تقديم الملف مع التحقق من الصلاحيات"""
+    if not file_path:
+        abort(404)
+
+    location = resolve_file_location(file_path)
+    if location is None or location.storage != 'upload':
+        current_app.logger.error('الملف غير موجود: %s', file_path)
         abort(404)
 
     # التحقق من الصلاحيات إذا كان مطلوباً
@@ -530,8 +702,4 @@ def serve_file(file_path, user_id=None, check_permissions=True):
             if current_user.id != user_id:
                 abort(403)
 
-    try:
-        return send_file(full_path)
-    except Exception as e:
-        current_app.logger.error(f'خطأ في تقديم الملف: {str(e)}')
-        abort(500)
\ No newline at end of file
+    return send_file_location(file_path, location)
\ No newline at end of file
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+تنفيذ تشفير كلمات المرور في مجمع عمال محدود
+
+يحد من عدد عمليات التشفير المتزامنة في كل عملية (worker) حتى لا يستهلك
+التسجيل وتسجيل الدخول كامل المعالج على حساب بقية الصفحات. خوارزميات
+hashlib و bcrypt تحرر GIL فتكفي الخيوط، ووضع process للخوارزميات التي لا تحرره.
+"""
+
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from flask import has_app_context
+from app.services import passwords
+from app.services.metrics import span
+
+
+class HashQueueFullError(Exception):
+    """انتظار مكان في طابور التشفير أو انتظار النتيجة تجاوز المهلة"""
+
+
+def _timed_call(func, args):
+    """تنفيذ الدالة في العامل وإرجاع النتيجة مع زمن التنفيذ"""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+class HashStats:
+    """إحصائيات طابور التشفير على مستوى العملية"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """تصفير جميع العدادات"""
+        with self._lock:
+            self.in_flight = 0
+            self.max_in_flight = 0
+            self.completed = 0
+            self.rejected = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+            self.total_run = 0.0
+
+    def started(self):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def finished(self, wait_seconds, run_seconds):
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+            self.total_wait += wait_seconds
+            self.max_wait = max(self.max_wait, wait_seconds)
+            self.total_run += run_seconds
+
+    def abandoned(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def increment_rejected(self):
+        with self._lock:
+            self.rejected += 1
+
+    def snapshot(self, workers):
+        """نسخة من العدادات مع عمق الطابور الحالي"""
+        with self._lock:
+            completed = self.completed or 1
+            return {
+                'active': min(self.in_flight, workers),
+                'queued': max(self.in_flight - workers, 0),
+                'max_in_flight': self.max_in_flight,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'avg_wait_ms': round(self.total_wait / completed * 1000, 3),
+                'max_wait_ms': round(self.max_wait * 1000, 3),
+                'avg_run_ms': round(self.total_run / completed * 1000, 3),
+            }
+
+
+class HashExecutor:
+    """مجمع عمال محدود لعمليات التشفير والتحقق
+
+    inline: التنفيذ في خيط الطلب (السلوك السابق)
+    thread: مجمع خيوط (مناسب لـ scrypt/pbkdf2/bcrypt لأنها تحرر GIL)
+    process: مجمع عمليات للخوارزميات التي لا تحرر GIL
+    """
+
+    def __init__(self):
+        self.mode = 'inline'
+        self.workers = 2
+        self.max_queue = 32
+        self.timeout = 10
+        self.stats = HashStats()
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+
+    def configure(self, config):
+        """تحديث الإعدادات - المجمع نفسه ينشأ عند أول استخدام"""
+        with self._lock:
+            self.shutdown()
+            self.mode = config.get('PASSWORD_EXECUTOR', 'thread')
+            self.workers = config.get('PASSWORD_EXECUTOR_WORKERS', 2)
+            self.max_queue = config.get('PASSWORD_EXECUTOR_QUEUE', 32)
+            self.timeout = config.get('PASSWORD_EXECUTOR_TIMEOUT', 10)
+            # العمليات المنفذة + المنتظرة لا تتجاوز workers + max_queue
+            self._slots = threading.BoundedSemaphore(self.workers + self.max_queue)
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.mode == 'process':
+                        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                            thread_name_prefix='password-hash')
+        return self._executor
+
+    def run(self, func, *args):
+        """تنفيذ الدالة في المجمع وانتظار نتيجتها
+
+        المهلة PASSWORD_EXECUTOR_TIMEOUT تشمل انتظار المكان وانتظار النتيجة معاً.
+
+        Raises:
+            HashQueueFullError: إذا لم تكتمل العملية خلال المهلة
+        """
+        slots = self._slots
+        if self.mode == 'inline' or slots is None:
+            return func(*args)
+
+        deadline = time.monotonic() + self.timeout
+        if not slots.acquire(timeout=self.timeout):
+            self.stats.increment_rejected()
+            raise HashQueueFullError('طابور تشفير كلمات المرور ممتلئ')
+
+        self.stats.started()
+        start = time.perf_counter()
+        try:
+            future = self._get_executor().submit(_timed_call, func, args)
+        except BaseException:
+            slots.release()
+            self.stats.abandoned()
+            raise
+        # المكان يحرر عند انتهاء العملية فعلاً (وليس عند انتهاء مهلة الطلب)
+        # حتى لا يتجاوز عدد العمليات العالقة حجم الطابور
+        future.add_done_callback(lambda _: slots.release())
+
+        try:
+            result, run_seconds = future.result(timeout=max(deadline - time.monotonic(), 0))
+        except FutureTimeoutError:
+            future.cancel()
+            self.stats.abandoned()
+            self.stats.increment_rejected()
+            raise HashQueueFullError('انتهت مهلة تشفير كلمة المرور')
+        except BaseException:
+            self.stats.abandoned()
+            raise
+        self.stats.finished(time.perf_counter() - start - run_seconds, run_seconds)
+        return result
+
+    def get_status(self):
+        """حالة المجمع للعرض في صفحة حالة النظام"""
+        status = self.stats.snapshot(self.workers)
+        status.update({
+            'mode': self.mode,
+            'workers': self.workers,
+            'max_queue': self.max_queue,
+        })
+        return status
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+hash_executor = HashExecutor()
+
+
+def _offload(func, *args):
+    # خارج سياق التطبيق (السكريبتات) يتم التنفيذ مباشرة
+    if not has_app_context():
+        return func(*args)
+    return hash_executor.run(func, *args)
+
+
+def hash_password(password):
+    """تشفير كلمة المرور في المجمع بإعدادات التطبيق الحالي"""
+    # نمرر نسخة من الإعدادات لأن العامل قد يكون عملية أخرى بلا سياق تطبيق
+    with span('password.hash'):
+        return _offload(passwords.hash_password, password, passwords.hash_settings())
+
+
+def verify_password(password_hash, password):
+    """التحقق من كلمة المرور في المجمع"""
+    with span('password.verify'):
+        return _offload(passwords.verify_password, password_hash, password)
+
+
+def init_hash_executor(app):
+    """ضبط المجمع من إعدادات التطبيق وتحويل امتلاء الطابور إلى 503"""
+    hash_executor.configure(app.config)
+
+    @app.errorhandler(HashQueueFullError)
+    def _hash_queue_full(error):
+        return 'الخادم مشغول حالياً، يرجى المحاولة بعد لحظات', 503, {'Retry-After': '2'}
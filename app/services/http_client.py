@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+عميل HTTP مشترك لمزودي الرسائل مع تجميع الاتصالات وقاطع دائرة
+"""
+
+import logging
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from app.services.metrics import span
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """المزود متعطل مؤقتاً - لم يتم إرسال الطلب"""
+
+
+class CircuitBreaker:
+    """قاطع دائرة بسيط: يفتح بعد عدد من الإخفاقات المتتالية
+
+    closed: الطلبات تمر عادياً
+    open: الطلبات ترفض فوراً حتى انتهاء reset_timeout
+    half-open: يسمح بطلب تجريبي واحد، نجاحه يغلق الدائرة وفشله يعيد فتحها
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    @property
+    def state(self):
+        """الحالة الحالية للدائرة"""
+        with self._lock:
+            return self._state_locked()
+
+    def _state_locked(self):
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        """هل يسمح بإرسال طلب الآن؟"""
+        with self._lock:
+            state = self._state_locked()
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        """تسجيل نجاح - إغلاق الدائرة"""
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        """تسجيل فشل - فتح الدائرة عند تجاوز الحد"""
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._failures >= self.failure_threshold or self._opened_at is not None:
+                if self._opened_at is None:
+                    logger.warning("⚠️ فتح قاطع الدائرة بعد %s إخفاقات متتالية", self._failures)
+                self._opened_at = time.monotonic()
+
+
+class PooledHTTPClient:
+    """عميل HTTP طويل العمر مع إعادة استخدام الاتصالات (keep-alive)
+
+    كل خيط يملك Session خاصة به (requests.Session غير آمنة بين الخيوط)،
+    وكل Session تحتفظ بتجمع اتصالات TCP/TLS مفتوحة للمزود.
+    """
+
+    def __init__(self, name, pool_maxsize=10, connect_timeout=3, read_timeout=10,
+                 failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.pool_maxsize = pool_maxsize
+        self.timeout = (connect_timeout, read_timeout)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._local = threading.local()
+
+    def configure(self, config, prefix):
+        """تحديث المهلات وإعدادات القاطع من إعدادات التطبيق"""
+        self.timeout = (config.get(f'{prefix}_CONNECT_TIMEOUT', self.timeout[0]),
+                        config.get(f'{prefix}_READ_TIMEOUT', self.timeout[1]))
+        self.breaker.failure_threshold = config.get(f'{prefix}_BREAKER_THRESHOLD',
+                                                    self.breaker.failure_threshold)
+        self.breaker.reset_timeout = config.get(f'{prefix}_BREAKER_RESET_SECONDS',
+                                                self.breaker.reset_timeout)
+
+    @property
+    def session(self):
+        """Session الخاصة بالخيط الحالي"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize, max_retries=0)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            self._local.session = session
+        return session
+
+    def request(self, method, url, **kwargs):
+        """إرسال طلب عبر التجمع مع احترام قاطع الدائرة
+
+        أخطاء الشبكة واستجابات 5xx تحسب إخفاقات، أما 4xx فهي أخطاء في الطلب نفسه.
+
+        Raises:
+            CircuitOpenError: إذا كانت الدائرة مفتوحة
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError(f'{self.name}: الدائرة مفتوحة - تم تخطي الطلب')
+
+        kwargs.setdefault('timeout', self.timeout)
+        # النتيجة تسجل في كل الحالات (حتى استثناء غير متوقع) حتى لا يبقى الطلب التجريبي
+        # في half-open محجوزاً للأبد
+        succeeded = False
+        try:
+            with span(f'http.{self.name}'):
+                response = self.session.request(method, url, **kwargs)
+            succeeded = response.status_code < 500
+            return response
+        finally:
+            if succeeded:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+
+# عملاء مشتركون على مستوى العملية
+whatsapp_client = PooledHTTPClient('whatsapp')
+local_sms_client = PooledHTTPClient('local_sms')
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+نسخ مصغرة من الصور المرفوعة وروابط موقعة لها
+
+صفحة الحالة تطلب روابط صور جميع طلباتها دفعة واحدة (student.status_images)،
+وكل رابط موقع بـ HMAC من SECRET_KEY مع وقت انتهاء، فلا يحتاج تقديم الصورة
+(main.signed_image) إلى جلسة أو استعلام صلاحيات. وقت الانتهاء مقرب لفترة
+IMAGE_URL_TTL_SECONDS حتى يبقى الرابط نفسه خلال الفترة ويستفيد من ذاكرة المتصفح.
+
+النسخ المصغرة (JPEG) تنشأ عند أول طلب في IMAGE_DERIVATIVE_FOLDER/<width>/ وتعاد
+إنشاؤها إذا تغير الأصل، وتحذف مع الأصل. المجلد خارج UPLOAD_FOLDER لأن مسارات
+الملفات العامة تستنتج مالك الملف من مساره داخل مجلد الرفع. width=0 يعني الصورة الأصلية.
+"""
+
+import hashlib
+import hmac
+import os
+import threading
+import time
+from flask import current_app, url_for
+from PIL import Image
+from app.services.files import resolve_file_location, upload_root
+from app.services.metrics import timed
+
+def derivative_widths():
+    return current_app.config.get('IMAGE_DERIVATIVE_WIDTHS', (160, 480, 1080))
+
+
+def derivative_root():
+    """المسار المطلق لمجلد النسخ المصغرة"""
+    folder = current_app.config.get('IMAGE_DERIVATIVE_FOLDER')
+    if not folder:
+        return upload_root() + '_derivatives'
+    return os.path.realpath(folder)
+
+
+def _derivative_target(relative_path, width):
+    return os.path.join(derivative_root(), str(width), os.path.splitext(relative_path)[0] + '.jpg')
+
+
+def resolve_upload_path(file_path):
+    """المسار الكامل لملف داخل مجلد الرفع، أو None إذا لم يكن موجوداً"""
+    location = resolve_file_location(file_path)
+    if location is None or location.storage != 'upload':
+        return None
+    return location.path
+
+
+def image_signature(file_path, width, expires):
+    message = f'{file_path}|{width}|{expires}'.encode('utf-8')
+    key = current_app.config['SECRET_KEY'].encode('utf-8')
+    return hmac.new(key, message, hashlib.sha256).hexdigest()[:32]
+
+
+def verify_image_signature(file_path, width, expires, signature):
+    if expires < time.time():
+        return False
+    return hmac.compare_digest(image_signature(file_path, width, expires), signature or '')
+
+
+def signed_image_url(file_path, width=0):
+    """رابط موقع لصورة (أو نسختها المصغرة بالعرض المحدد)"""
+    ttl = current_app.config.get('IMAGE_URL_TTL_SECONDS', 3600)
+    # صالح فترة ttl على الأقل، ونفس القيمة لكل الطلبات داخل الفترة
+    expires = (int(time.time()) // ttl + 2) * ttl
+    return url_for('main.signed_image', file_path=file_path, w=width, exp=expires,
+                   sig=image_signature(file_path, width, expires))
+
+
+def image_urls(file_path):
+    """روابط الصورة لشبكة الصور والنافذة المنبثقة
+
+    Returns:
+        dict: thumb (أصغر نسخة)، srcset لجميع النسخ، original
+    """
+    widths = derivative_widths()
+    return {
+        'thumb': signed_image_url(file_path, widths[0]),
+        'srcset': ', '.join(f'{signed_image_url(file_path, width)} {width}w' for width in widths),
+        'original': signed_image_url(file_path),
+    }
+
+
+@timed('upload.derivative')
+def derivative_path(source_path, file_path, width):
+    """مسار النسخة المصغرة بالعرض المحدد، تنشأ إذا لم تكن موجودة أو كانت أقدم من الأصل"""
+    # المسار النسبي من الأصل المحلول (داخل مجلد الرفع دائماً) وليس من الرابط
+    target = _derivative_target(os.path.relpath(source_path, upload_root()), width)
+    if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(source_path):
+        return target
+
+    # طلبان متزامنان لنفس النسخة ينشئانها معاً، والاستبدال الذري يضمن ملفاً كاملاً دائماً
+    with Image.open(source_path) as image:
+        # JPEG: فك الترميز بدقة مخفضة مباشرة (أسرع بكثير من فك الصورة كاملة ثم التصغير)
+        image.draft('RGB', (width, width * 2))
+        image = image.convert('RGB')
+        image.thumbnail((width, width * 2), Image.LANCZOS)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        temporary = f'{target}.{os.getpid()}.{threading.get_ident()}.tmp'
+        image.save(temporary, 'JPEG', quality=current_app.config.get('IMAGE_DERIVATIVE_QUALITY', 80),
+                   optimize=True, progressive=True)
+    os.replace(temporary, target)
+    return target
+
+
+def delete_derivatives(file_path):
+    """حذف جميع النسخ المصغرة لملف (عند حذف الأصل أو نقله)"""
+    relative_path = os.path.normpath(file_path.replace('/', os.sep).replace('\\', os.sep))
+    if os.path.isabs(relative_path) or relative_path.startswith(os.pardir):
+        return
+    for width in derivative_widths():
+        target = _derivative_target(relative_path, width)
+        if os.path.exists(target):
+            os.remove(target)
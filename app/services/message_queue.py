@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+طابور إرسال رموز التحقق في الخلفية
+
+الرسائل محفوظة في جدول outbound_messages، وتسحبها خيوط إرسال في الخلفية
+بعدد محدود، مع إعادة المحاولة بتأخير أسي ونقل الرسالة إلى حالة dead
+بعد استنفاد المحاولات. الطلب يعود فوراً دون انتظار مزود الرسائل.
+"""
+
+import logging
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import and_, or_
+from app.extensions import db
+from app.models import OutboundMessage
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+OTP_DELIVERIES = metrics.counter(
+    'otp_delivery_attempts_total', 'Verification message delivery attempts by result', ('result',))
+
+# الرسائل العالقة في حالة sending أكثر من هذه المدة تعتبر متروكة (توقف العامل)
+STALE_LOCK_SECONDS = 300
+
+
+def _claimable_filter(now):
+    """شرط الرسائل الجاهزة للإرسال"""
+    return or_(
+        and_(OutboundMessage.status == 'pending', OutboundMessage.next_attempt_at <= now),
+        and_(OutboundMessage.status == 'sending',
+             OutboundMessage.locked_at < now - timedelta(seconds=STALE_LOCK_SECONDS))
+    )
+
+
+def claim_next_message():
+    """حجز الرسالة التالية الجاهزة للإرسال
+
+    الحجز يتم بتحديث شرطي حتى لا ترسل نفس الرسالة من عاملين مختلفين.
+
+    Returns:
+        int: معرف الرسالة المحجوزة أو None
+    """
+    now = datetime.utcnow()
+    candidate = db.session.query(OutboundMessage.id).filter(
+        _claimable_filter(now)
+    ).order_by(OutboundMessage.next_attempt_at).first()
+    if not candidate:
+        return None
+
+    claimed = db.session.query(OutboundMessage).filter(
+        OutboundMessage.id == candidate.id,
+        _claimable_filter(now)
+    ).update({'status': 'sending', 'locked_at': now}, synchronize_session=False)
+    db.session.commit()
+    return candidate.id if claimed else None
+
+
+def deliver_message(message_id):
+    """إرسال رسالة محجوزة وتحديث حالتها
+
+    Returns:
+        bool: True إذا تم الإرسال بنجاح
+    """
+    from app.services.sms import SMSService
+
+    message = db.session.get(OutboundMessage, message_id)
+    if not message or message.status != 'sending':
+        return False
+
+    message.attempts += 1
+    try:
+        sent = SMSService.send_verification_code(message.phone, message.payload)
+        error = None if sent else 'فشل الإرسال من المزود'
+    except Exception as e:
+        sent = False
+        error = str(e)[:255]
+
+    if sent:
+        OTP_DELIVERIES.inc(result='sent')
+        message.status = 'sent'
+        message.sent_at = datetime.utcnow()
+        message.payload = None
+        message.last_error = None
+    elif message.attempts >= current_app.config.get('OTP_MAX_ATTEMPTS', 5):
+        OTP_DELIVERIES.inc(result='dead')
+        message.status = 'dead'
+        message.payload = None
+        message.last_error = error
+        logger.error("❌ نقل رسالة التحقق %s إلى dead بعد %s محاولات: %s", message.id, message.attempts, error)
+    else:
+        OTP_DELIVERIES.inc(result='retry')
+        base = current_app.config.get('OTP_RETRY_BASE_SECONDS', 2)
+        message.status = 'pending'
+        message.next_attempt_at = datetime.utcnow() + timedelta(seconds=base * (2 ** (message.attempts - 1)))
+        message.last_error = error
+        logger.warning("⚠️ إعادة جدولة رسالة التحقق %s (محاولة %s): %s", message.id, message.attempts, error)
+
+    message.locked_at = None
+    db.session.commit()
+    return sent
+
+
+def drain_once():
+    """إرسال رسالة واحدة جاهزة إن وجدت
+
+    Returns:
+        bool: True إذا تمت معالجة رسالة
+    """
+    message_id = claim_next_message()
+    if message_id is None:
+        return False
+    deliver_message(message_id)
+    return True
+
+
+class MessageDispatcher:
+    """خيوط إرسال في الخلفية لكل عملية (worker)"""
+
+    def __init__(self):
+        self._app = None
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self, app):
+        """تشغيل خيوط الإرسال مرة واحدة"""
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            self._app = app
+            for index in range(app.config.get('OTP_QUEUE_WORKERS', 2)):
+                thread = threading.Thread(target=self._run, name=f'otp-sender-{index}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            logger.info("📨 تم تشغيل %s خيط لإرسال رموز التحقق", len(self._threads))
+
+    @property
+    def thread_count(self):
+        return len(self._threads)
+
+    def notify(self):
+        """إيقاظ خيوط الإرسال عند وصول رسالة جديدة"""
+        self._wakeup.set()
+
+    def _run(self):
+        poll_seconds = self._app.config.get('OTP_QUEUE_POLL_SECONDS', 5)
+        while True:
+            self._wakeup.wait(poll_seconds)
+            self._wakeup.clear()
+            with self._app.app_context():
+                try:
+                    while drain_once():
+                        pass
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error("❌ خطأ في خيط إرسال رموز التحقق: %s", e)
+                finally:
+                    db.session.remove()
+
+
+dispatcher = MessageDispatcher()
+
+
+def queue_verification_sms(phone_number, verification_code):
+    """إضافة رمز التحقق إلى طابور الإرسال
+
+    في وضع sync (الاختبار) يتم الإرسال مباشرة داخل الطلب.
+
+    Returns:
+        OutboundMessage: الرسالة المضافة أو None في حالة الفشل
+    """
+    sync = current_app.config.get('OTP_QUEUE_MODE', 'async') == 'sync'
+    try:
+        message = OutboundMessage(kind='verification', phone=phone_number, payload=verification_code)
+        if sync:
+            # محجوزة مباشرة لهذا الطلب
+            message.status = 'sending'
+            message.locked_at = datetime.utcnow()
+        db.session.add(message)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error("خطأ في إضافة رمز التحقق إلى الطابور %s: %s", phone_number, e)
+        return None
+
+    if sync:
+        deliver_message(message.id)
+    else:
+        dispatcher.start(current_app._get_current_object())
+        dispatcher.notify()
+    return message
+
+
+def init_message_queue(app):
+    """تشغيل خيوط الإرسال عند أول طلب لاستكمال الرسائل المعلقة من تشغيل سابق"""
+    if app.config.get('OTP_QUEUE_MODE', 'async') != 'async':
+        return
+
+    @app.before_request
+    def _start_message_dispatcher():
+        if not dispatcher._threads:
+            dispatcher.start(app)
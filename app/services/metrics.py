@@ -0,0 +1,361 @@
+# -*- coding: utf-8 -*-
+"""
+قياس زمن الطلبات والمراحل الساخنة وعرضها بصيغة Prometheus
+
+span('upload.save_image') يقيس مرحلة داخل الطلب: يضاف زمنها إلى تفصيل الطلب
+الحالي (سجل app.requests وترويسة Server-Timing) وإلى مدرج تكراري على مستوى
+العملية يعرض في /metrics. الإحصائيات لكل عملية (worker) على حدة.
+"""
+
+import bisect
+import hmac
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from flask import Response, abort, g, has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger('app.requests')
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ''
+    escaped = ((name, str(value).replace('\\', '\\\\').replace('"', '\\"')) for name, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+class Counter:
+    """عداد تراكمي بتسميات"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield f'{self.name}{_format_labels(list(zip(self.labelnames, key)))} {value}'
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram:
+    """مدرج تكراري بحدود ثابتة (تراكمي كما في Prometheus)"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # عدادات الحدود (+Inf في الأخير) ثم المجموع
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def snapshot(self, **labels):
+        """عدادات الحدود والمجموع لتسميات محددة، أو لكل التسميات مجتمعة إذا لم تحدد"""
+        counts = [0] * (len(self.buckets) + 1)
+        total = 0.0
+        with self._lock:
+            if labels:
+                key = tuple(labels.get(name, '') for name in self.labelnames)
+                states = [self._values[key]] if key in self._values else []
+            else:
+                states = list(self._values.values())
+            for state_counts, state_total in states:
+                counts = [a + b for a, b in zip(counts, state_counts)]
+                total += state_total
+        return counts, total
+
+    def quantiles(self, quantiles=(0.5, 0.95, 0.99), **labels):
+        """تقدير النسب المئوية من الحدود بالاستيفاء الخطي داخل الحد
+
+        Returns:
+            dict: {'count', 'avg', 'p50', ...} بالوحدة نفسها، أو count=0 بدون قيم
+        """
+        counts, total = self.snapshot(**labels)
+        count = sum(counts)
+        result = {'count': count, 'avg': total / count if count else None}
+        for q in quantiles:
+            result[f'p{round(q * 100)}'] = _estimate_quantile(self.buckets, counts, count, q)
+        return result
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        for key, counts, total in items:
+            pairs = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                bucket_labels = _format_labels(pairs + [('le', le)])
+                yield f'{self.name}_bucket{bucket_labels} {cumulative}'
+            labels = _format_labels(pairs)
+            yield f'{self.name}_sum{labels} {total}'
+            yield f'{self.name}_count{labels} {cumulative}'
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+def _estimate_quantile(buckets, counts, count, q):
+    if not count:
+        return None
+    rank = q * count
+    cumulative = 0
+    lower = 0.0
+    for bound, bucket_count in zip(buckets, counts):
+        if bucket_count and cumulative + bucket_count >= rank:
+            return lower + (bound - lower) * (rank - cumulative) / bucket_count
+        cumulative += bucket_count
+        lower = bound
+    # القيمة في حد +Inf: أفضل تقدير هو آخر حد معروف
+    return buckets[-1]
+
+
+class MetricsRegistry:
+    """سجل المقاييس للعملية الحالية"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._caches = {}
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets)
+
+    def register_cache(self, name, info_func):
+        """تسجيل ذاكرة مؤقتة لعرض نسبة الإصابة
+
+        info_func تعيد كائناً بالحقول hits و misses و currsize و maxsize
+        (مثل cache_info في functools.lru_cache)
+        """
+        self._caches[name] = info_func
+
+    def register_pool(self, name, status_func):
+        """تسجيل تجمع اتصالات محرك قاعدة بيانات باسمه
+
+        status_func تعيد قاموساً كما في db_pool.get_pool_status
+        """
+        self._pools[name] = status_func
+
+    def pool_stats(self):
+        return {name: status_func() for name, status_func in list(self._pools.items())}
+
+    def cache_stats(self):
+        stats = {}
+        for name, info_func in list(self._caches.items()):
+            info = info_func()
+            lookups = info.hits + info.misses
+            stats[name] = {
+                'hits': info.hits,
+                'misses': info.misses,
+                'size': info.currsize,
+                'maxsize': info.maxsize,
+                'hit_ratio': info.hits / lookups if lookups else None,
+            }
+        return stats
+
+    def render(self):
+        """نص صيغة Prometheus exposition (text/plain 0.0.4)"""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        caches = self.cache_stats()
+        for field, kind in (('hits', 'counter'), ('misses', 'counter'), ('size', 'gauge')):
+            name = f'app_cache_{field}' + ('_total' if kind == 'counter' else '')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.extend(f'{name}{_format_labels([("cache", cache)])} {values[field]}'
+                         for cache, values in caches.items())
+        pools = self.pool_stats()
+        for field, kind in (('checkouts', 'counter'), ('timeouts', 'counter'), ('connects', 'counter'),
+                            ('invalidations', 'counter'), ('checked_out', 'gauge')):
+            name = f'app_db_pool_{field}' + ('_total' if kind == 'counter' else '')
+            lines.append(f'# TYPE {name} {kind}')
+            # checked_out غير متاح لتجمعات SQLite
+            lines.extend(f'{name}{_format_labels([("engine", engine)])} {values[field]}'
+                         for engine, values in pools.items() if field in values)
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        for metric in list(self._metrics.values()):
+            metric.reset()
+
+
+metrics = MetricsRegistry()
+PROCESS_STARTED = time.time()
+
+REQUEST_DURATION = metrics.histogram(
+    'http_request_duration_seconds', 'Request processing time', ('method', 'endpoint', 'status'))
+SPAN_DURATION = metrics.histogram(
+    'app_span_duration_seconds', 'Time spent in instrumented stages', ('span',))
+REQUEST_QUERIES = metrics.histogram(
+    'http_request_db_queries', 'Database queries per request', ('endpoint',),
+    buckets=(1, 2, 5, 10, 20, 50, 100))
+
+
+def record_span(name, seconds):
+    """إضافة زمن مرحلة إلى المدرج وإلى تفصيل الطلب الحالي"""
+    SPAN_DURATION.observe(seconds, span=name)
+    if has_request_context():
+        spans = g.setdefault('timing_spans', {})
+        total, count = spans.get(name, (0.0, 0))
+        spans[name] = (total + seconds, count + 1)
+
+
+@contextmanager
+def span(name):
+    """قياس زمن كتلة من الكود"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - start)
+
+
+def timed(name):
+    """مزخرف لقياس زمن الدالة كمرحلة"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def instrument_queries(engine):
+    """قياس زمن كل استعلام SQL كمرحلة db.query"""
+    if getattr(engine, '_metrics_instrumented', False):
+        return
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        record_span('db.query', time.perf_counter() - conn.info['query_started'].pop())
+
+    @event.listens_for(engine, 'handle_error')
+    def _handle_error(context):
+        started = context.connection.info.get('query_started') if context.connection else None
+        if started:
+            record_span('db.query', time.perf_counter() - started.pop())
+
+    engine._metrics_instrumented = True
+
+
+def has_bearer_token(token):
+    """ترويسة Authorization تحمل الرمز المحدد (مقارنة بزمن ثابت)"""
+    if not token:
+        return False
+    return hmac.compare_digest(request.headers.get('Authorization', '').encode('utf-8'),
+                               f'Bearer {token}'.encode('utf-8'))
+
+
+def init_metrics(app):
+    """تسجيل قياس زمن الطلبات ومسار /metrics"""
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    slow_seconds = app.config.get('METRICS_SLOW_REQUEST_MS', 1000) / 1000
+    server_timing = app.config.get('METRICS_SERVER_TIMING', False)
+
+    @app.before_request
+    def _start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        started = g.pop('request_started', None)
+        if started is None:
+            return response
+        duration = time.perf_counter() - started
+        endpoint = request.endpoint or 'unmatched'
+        spans = g.get('timing_spans', {})
+
+        REQUEST_DURATION.observe(duration, method=request.method, endpoint=endpoint,
+                                 status=response.status_code)
+        REQUEST_QUERIES.observe(spans.get('db.query', (0.0, 0))[1], endpoint=endpoint)
+
+        level = logging.INFO if duration >= slow_seconds else logging.DEBUG
+        if logger.isEnabledFor(level):
+            breakdown = ' '.join(f'{name}={total * 1000:.1f}ms/{count}'
+                                 for name, (total, count) in spans.items())
+            logger.log(level, '%s %s %s %.1fms %s', request.method, endpoint,
+                       response.status_code, duration * 1000, breakdown,
+                       extra={'duration_ms': round(duration * 1000, 2),
+                              'spans_ms': {name: round(total * 1000, 2)
+                                           for name, (total, _) in spans.items()}})
+
+        if server_timing:
+            entries = [f'{name};dur={total * 1000:.1f}' for name, (total, _) in spans.items()]
+            entries.append(f'total;dur={duration * 1000:.1f}')
+            response.headers['Server-Timing'] = ', '.join(entries)
+        return response
+
+    token = app.config.get('METRICS_TOKEN')
+
+    def metrics_view():
+        # بدون METRICS_TOKEN يسمح فقط للطلبات المحلية (جامع المقاييس على نفس الخادم)
+        if token:
+            if not has_bearer_token(token):
+                abort(403)
+        elif request.remote_addr not in ('127.0.0.1', '::1'):
+            abort(403)
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
+
+    from app.extensions import limiter
+    limiter.exempt(metrics_view)
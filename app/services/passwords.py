@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+تشفير كلمات المرور بإعدادات قابلة للضبط
+
+الخوارزمية وكلفتها من الإعدادات (PASSWORD_HASH_METHOD وما يتبعها)، والتحقق
+يدعم جميع الصيغ المخزنة سابقاً حتى تتم إعادة تشفيرها تلقائياً عند الدخول.
+"""
+
+from flask import current_app, has_app_context
+from werkzeug.security import generate_password_hash, check_password_hash
+
+try:
+    import bcrypt
+    BCRYPT_AVAILABLE = True
+except ImportError:
+    BCRYPT_AVAILABLE = False
+
+DEFAULT_SETTINGS = {
+    'PASSWORD_HASH_METHOD': 'scrypt',
+    'PASSWORD_SCRYPT_N': 32768,
+    'PASSWORD_SCRYPT_R': 8,
+    'PASSWORD_SCRYPT_P': 1,
+    'PASSWORD_PBKDF2_ITERATIONS': 600000,
+    'PASSWORD_BCRYPT_ROUNDS': 12,
+}
+
+
+def hash_settings(config=None):
+    """إعدادات التشفير من التطبيق الحالي أو القيم الافتراضية"""
+    if config is None and has_app_context():
+        config = current_app.config
+    config = config or {}
+    return {key: config.get(key, default) for key, default in DEFAULT_SETTINGS.items()}
+
+
+def hash_method(config=None):
+    """صيغة الخوارزمية والكلفة كما تظهر في بداية التشفير المخزن
+
+    Returns:
+        str: مثل scrypt:32768:8:1 أو pbkdf2:sha256:600000 أو bcrypt:12
+    """
+    settings = hash_settings(config)
+    method = settings['PASSWORD_HASH_METHOD']
+    if method == 'scrypt':
+        return (f"scrypt:{settings['PASSWORD_SCRYPT_N']}:"
+                f"{settings['PASSWORD_SCRYPT_R']}:{settings['PASSWORD_SCRYPT_P']}")
+    if method == 'pbkdf2':
+        return f"pbkdf2:sha256:{settings['PASSWORD_PBKDF2_ITERATIONS']}"
+    if method == 'bcrypt':
+        if not BCRYPT_AVAILABLE:
+            raise RuntimeError('PASSWORD_HASH_METHOD=bcrypt يتطلب تثبيت حزمة bcrypt')
+        return f"bcrypt:{settings['PASSWORD_BCRYPT_ROUNDS']}"
+    raise ValueError(f'خوارزمية تشفير غير مدعومة: {method}')
+
+
+def _stored_method(password_hash):
+    """استخراج الخوارزمية والكلفة من التشفير المخزن"""
+    if password_hash.startswith('$2'):
+        # صيغة bcrypt: $2b$12$...
+        return f"bcrypt:{int(password_hash.split('$')[2])}"
+    return password_hash.split('$', 1)[0]
+
+
+def hash_password(password, config=None):
+    """تشفير كلمة المرور بالإعدادات الحالية"""
+    method = hash_method(config)
+    if method.startswith('bcrypt:'):
+        rounds = int(method.split(':')[1])
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('ascii')
+    return generate_password_hash(password, method=method)
+
+
+def verify_password(password_hash, password):
+    """التحقق من كلمة المرور أياً كانت صيغة التشفير المخزن"""
+    if not password_hash:
+        return False
+    if password_hash.startswith('$2'):
+        if not BCRYPT_AVAILABLE:
+            raise RuntimeError('كلمة مرور مشفرة بـ bcrypt وحزمة bcrypt غير مثبتة')
+        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('ascii'))
+    return check_password_hash(password_hash, password)
+
+
+def needs_rehash(password_hash, config=None):
+    """هل التشفير المخزن بخوارزمية أو كلفة مختلفة عن الإعدادات الحالية؟"""
+    return _stored_method(password_hash) != hash_method(config)
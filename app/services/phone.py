@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+توحيد أرقام الجوال اليمنية إلى الصيغة +9677xxxxxxxx
+
+مصدر واحد لتنظيف الأرقام تستخدمه النماذج وخدمة الرسائل ومسارات المصادقة.
+"""
+
+import re
+from functools import lru_cache
+from app.services.metrics import metrics
+
+COUNTRY_CODE = '+967'
+
+# حذف الفواصل الشائعة وتحويل الأرقام العربية والفارسية إلى أرقام لاتينية في خطوة واحدة
+_TRANSLATE_TABLE = str.maketrans(
+    {**{ch: None for ch in ' \t\n\r -().'},
+     **{chr(0x0660 + i): str(i) for i in range(10)},
+     **{chr(0x06F0 + i): str(i) for i in range(10)}}
+)
+
+# المسار السريع: رقم صحيح مع رمز دولة اختياري
+_VALID_RE = re.compile(r'(?:\+967|00967|967|0)?(7[0-9]{8})')
+_PREFIX_RE = re.compile(r'^(?:\+967|00967|967)')
+
+
+class PhoneNumberError(ValueError):
+    """رقم جوال غير صالح - الرسالة مناسبة للعرض للمستخدم"""
+
+
+@lru_cache(maxsize=4096)
+def _parse(value):
+    """تحليل الرقم وإرجاع (الرقم الموحد، رسالة الخطأ)"""
+    # أغلب المدخلات بلا فواصل، فنجرب المطابقة قبل الترجمة
+    match = _VALID_RE.fullmatch(value)
+    if match is None:
+        cleaned = value.translate(_TRANSLATE_TABLE)
+        match = _VALID_RE.fullmatch(cleaned)
+    if match:
+        return COUNTRY_CODE + match.group(1), None
+
+    # المسار البطيء: تحديد سبب الرفض بنفس ترتيب الرسائل السابقة
+    local = _PREFIX_RE.sub('', cleaned)
+    if not local:
+        return None, 'رقم الجوال مطلوب'
+    if not local.startswith('7'):
+        return None, 'رقم الجوال يجب أن يبدأ بـ 7 (مثال: 712345678)'
+    if len(local) != 9:
+        return None, f'رقم الجوال يجب أن يكون 9 أرقام، لكن الرقم المدخل {len(local)} أرقام'
+    return None, 'رقم الجوال يجب أن يحتوي على أرقام فقط'
+
+
+metrics.register_cache('phone_normalize', _parse.cache_info)
+
+
+def normalize_phone(value):
+    """تحويل رقم الجوال إلى الصيغة +9677xxxxxxxx
+
+    يقبل: 712345678، 0712345678، 967712345678، 00967712345678، +967 712-345-678
+
+    Raises:
+        PhoneNumberError: إذا كان الرقم غير صالح
+    """
+    phone, error = _parse(value or '')
+    if error:
+        raise PhoneNumberError(error)
+    return phone
+
+
+def normalize_phone_or_none(value):
+    """مثل normalize_phone لكن تعيد None بدلاً من الاستثناء"""
+    return _parse(value or '')[0]
+
+
+def is_valid_phone(value):
+    """هل الرقم جوال يمني صالح؟"""
+    return _parse(value or '')[0] is not None
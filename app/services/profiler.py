@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+تشخيص الأداء في الإنتاج: عينات إحصائية من مكدسات الخيوط و cProfile لطلب واحد
+
+معطل افتراضياً ومتاح للمدير أو بترويسة Authorization: Bearer <PROFILER_TOKEN>.
+
+- POST /system-status/profile?seconds=10 يبدأ أخذ العينات في خيط خلفي على العملية
+  التي استقبلت الطلب، ويكتب النتيجة بصيغة folded stacks (flamegraph.pl / speedscope)
+  في PROFILER_OUTPUT_DIR حتى يمكن تنزيلها من أي عملية على نفس الخادم.
+- GET /system-status/profile يعرض الملفات المتاحة، و /system-status/profile/<name> ينزلها.
+- ?profile=1 على أي مسار (مع PROFILER_REQUEST_ENABLED) يعيد نتيجة cProfile للطلب
+  بدلاً من الاستجابة، و profile_format=pstats يعيد ملف pstats لأدوات مثل snakeviz.
+"""
+
+import cProfile
+import io
+import logging
+import marshal
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from flask import Response, abort, current_app, g, jsonify, request, send_from_directory
+from app.services.metrics import has_bearer_token
+
+logger = logging.getLogger(__name__)
+
+# إطارات الانتظار: خيط خامل لا يفيد في تحليل الأداء
+IDLE_FUNCTIONS = frozenset({
+    'wait', 'sleep', 'select', 'poll', 'accept', 'recv', 'recv_into', 'readinto',
+    '_wait_for_tstate_lock', 'get', 'epoll', 'kqueue', 'acquire',
+})
+
+PROFILE_NAME_RE = re.compile(r'profile-\d+-\d{8}T\d{6}\.folded')
+
+# مفاتيح ترتيب cProfile المقبولة في ?sort= (مع الاختصارات مثل tottime)
+SORT_KEYS = frozenset(key.value for key in pstats.SortKey) | frozenset(pstats.Stats.sort_arg_dict_default)
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+def sample_stacks(seconds, interval, include_idle=False, exclude=()):
+    """أخذ عينات من مكدسات جميع الخيوط لمدة محددة
+
+    Returns:
+        tuple: (Counter للمكدسات بصيغة folded، عدد جولات العينات)
+    """
+    stacks = Counter()
+    rounds = 0
+    excluded = set(exclude) | {threading.get_ident()}
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id in excluded:
+                continue
+            if not include_idle and frame.f_code.co_name in IDLE_FUNCTIONS:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            labels.append(names.get(thread_id, f'thread-{thread_id}'))
+            stacks[';'.join(reversed(labels))] += 1
+        rounds += 1
+        time.sleep(interval)
+    return stacks, rounds
+
+
+class SamplingSession:
+    """جلسة عينات واحدة على الأكثر لكل عملية"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.running = None
+
+    def start(self, output_dir, seconds, interval, include_idle=False):
+        """بدء العينات في خيط خلفي
+
+        Returns:
+            str: اسم ملف النتيجة، أو None إذا كانت هناك جلسة جارية
+        """
+        if not self._lock.acquire(blocking=False):
+            return None
+        name = f'profile-{os.getpid()}-{datetime.utcnow():%Y%m%dT%H%M%S}.folded'
+        self.running = name
+        os.makedirs(output_dir, exist_ok=True)
+
+        def run():
+            try:
+                stacks, rounds = sample_stacks(seconds, interval, include_idle)
+                path = os.path.join(output_dir, name)
+                with open(path + '.tmp', 'w', encoding='utf-8') as handle:
+                    for stack, count in stacks.most_common():
+                        handle.write(f'{stack} {count}\n')
+                os.replace(path + '.tmp', path)
+                logger.info('تم حفظ عينات الأداء (%s جولة) في %s', rounds, path)
+            except Exception as e:
+                logger.error('خطأ في أخذ عينات الأداء: %s', e)
+            finally:
+                self.running = None
+                self._lock.release()
+
+        threading.Thread(target=run, name='sampling-profiler', daemon=True).start()
+        return name
+
+
+sampling_session = SamplingSession()
+
+
+def _has_token():
+    return has_bearer_token(current_app.config.get('PROFILER_TOKEN'))
+
+
+def _is_authorized():
+    if _has_token():
+        return True
+    from flask_login import current_user
+    return current_user.is_authenticated and current_user.role == 'admin'
+
+
+def _output_dir():
+    return current_app.config.get('PROFILER_OUTPUT_DIR')
+
+
+def profile_collection():
+    """GET: قائمة ملفات العينات، POST: بدء جلسة عينات جديدة"""
+    if not _is_authorized():
+        abort(403)
+
+    if request.method == 'GET':
+        output_dir = _output_dir()
+        names = sorted((name for name in os.listdir(output_dir) if PROFILE_NAME_RE.fullmatch(name)),
+                       reverse=True) if os.path.isdir(output_dir) else []
+        return jsonify({'running': sampling_session.running, 'profiles': names})
+
+    # المسار مستثنى من فحص CSRF العام لأجل طلبات Bearer (لا يرسلها المتصفح تلقائياً)،
+    # أما POST بجلسة المدير فيحتاج رمز CSRF حتى لا يبدأه موقع آخر من متصفح المدير
+    if not _has_token() and current_app.config.get('WTF_CSRF_ENABLED', True):
+        from app.extensions import csrf
+        csrf.protect()
+
+    max_seconds = current_app.config.get('PROFILER_MAX_SECONDS', 60)
+    seconds = min(request.args.get('seconds', 10, type=float), max_seconds)
+    interval = max(request.args.get('interval_ms', current_app.config.get('PROFILER_INTERVAL_MS', 5),
+                                    type=float), 1) / 1000
+    include_idle = request.args.get('idle') == '1'
+    name = sampling_session.start(_output_dir(), seconds, interval, include_idle)
+    if name is None:
+        return jsonify({'error': 'جلسة عينات جارية بالفعل في هذه العملية',
+                        'running': sampling_session.running}), 409
+    return jsonify({'profile': name, 'pid': os.getpid(), 'seconds': seconds}), 202
+
+
+def profile_download(name):
+    """تنزيل ملف عينات بصيغة folded"""
+    if not _is_authorized():
+        abort(403)
+    if not PROFILE_NAME_RE.fullmatch(name):
+        abort(404)
+    return send_from_directory(_output_dir(), name, mimetype='text/plain')
+
+
+def init_profiler(app):
+    """تسجيل مسارات العينات وخطاف ?profile=1 حسب الإعدادات"""
+    if app.config.get('PROFILER_ENABLED'):
+        from app.extensions import csrf, limiter
+        app.add_url_rule('/system-status/profile', 'profile_collection', profile_collection,
+                         methods=['GET', 'POST'])
+        app.add_url_rule('/system-status/profile/<name>', 'profile_download', profile_download)
+        for view in (profile_collection, profile_download):
+            csrf.exempt(view)
+            limiter.exempt(view)
+
+    if not app.config.get('PROFILER_REQUEST_ENABLED'):
+        return
+
+    @app.before_request
+    def _start_request_profile():
+        if request.args.get('profile') != '1' or not _is_authorized():
+            return
+        g.request_profiler = cProfile.Profile()
+        g.request_profiler.enable()
+
+    @app.after_request
+    def _return_request_profile(response):
+        profiler = g.pop('request_profiler', None)
+        if profiler is None:
+            return response
+        profiler.disable()
+        stats = pstats.Stats(profiler)
+
+        if request.args.get('profile_format') == 'pstats':
+            # نفس محتوى Stats.dump_stats بدون ملف مؤقت
+            return Response(marshal.dumps(stats.stats), mimetype='application/octet-stream',
+                            headers={'Content-Disposition': 'attachment; filename=request.pstats'})
+
+        output = io.StringIO()
+        stats.stream = output
+        sort = request.args.get('sort', 'cumulative')
+        stats.sort_stats(sort if sort in SORT_KEYS else 'cumulative').print_stats(60)
+        header = f'{request.method} {request.path} -> {response.status_code}\n\n'
+        return Response(header + output.getvalue(), mimetype='text/plain')
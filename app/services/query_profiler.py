@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+عد استعلامات SQL لكل طلب واكتشاف أنماط N+1
+
+في وضع التطوير (SQL_PROFILER، افتراضياً مع DEBUG) يسجل كل طلب عدد استعلاماته
+وزمنها في ترويستي X-Query-Count و X-Query-Time-Ms، ويحذر في السجل app.sql عند
+تكرار نفس الاستعلام عدة مرات في طلب واحد.
+
+للاختبارات:
+    with assert_max_queries(4):
+        client.get('/student/status')
+"""
+
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from flask import g, request
+from sqlalchemy import event
+
+logger = logging.getLogger('app.sql')
+
+_local = threading.local()
+
+
+def _active_recorders():
+    stack = getattr(_local, 'recorders', None)
+    if stack is None:
+        stack = _local.recorders = []
+    return stack
+
+
+class QueryRecorder:
+    """الاستعلامات المنفذة في الخيط الحالي أثناء التسجيل"""
+
+    def __init__(self):
+        self.queries = []  # (statement, parameters, seconds)
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def total_ms(self):
+        return sum(seconds for _, _, seconds in self.queries) * 1000
+
+    def repeated(self, threshold=3):
+        """استعلامات SELECT المتكررة بنفس النص (نمط N+1 المعتاد)
+
+        إدخال عدة صفوف بنفس النص متوقع (مثل صور الطلب) فلا يحسب.
+
+        Returns:
+            list: [(statement, عدد التنفيذ, عدد القيم المختلفة)] بترتيب تنازلي
+        """
+        counts = Counter(statement for statement, _, _ in self.queries
+                         if statement.lstrip()[:6].upper() == 'SELECT')
+        result = []
+        for statement, count in counts.most_common():
+            if count < threshold:
+                break
+            distinct = len({repr(parameters) for text, parameters, _ in self.queries if text == statement})
+            result.append((statement, count, distinct))
+        return result
+
+    def describe(self):
+        return '\n'.join(f'{index}. ({seconds * 1000:.2f} ms) {statement}'
+                         for index, (statement, _, seconds) in enumerate(self.queries, 1))
+
+
+def instrument_engine(engine):
+    """تسجيل مستمعي المحرك مرة واحدة - بدون مسجل نشط لا يفعلان شيئاً تقريباً"""
+    if getattr(engine, '_query_profiler_instrumented', False):
+        return
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if getattr(_local, 'recorders', None):
+            conn.info.setdefault('profiler_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('profiler_started')
+        if not started:
+            return
+        seconds = time.perf_counter() - started.pop()
+        for recorder in _active_recorders():
+            recorder.queries.append((statement, parameters, seconds))
+
+    engine._query_profiler_instrumented = True
+
+
+def _default_engines():
+    from app.extensions import db
+    return list(db.engines.values())
+
+
+@contextmanager
+def record_queries(engines=None):
+    """تسجيل الاستعلامات المنفذة في الخيط الحالي داخل الكتلة"""
+    for engine in engines or _default_engines():
+        instrument_engine(engine)
+    recorder = QueryRecorder()
+    stack = _active_recorders()
+    stack.append(recorder)
+    try:
+        yield recorder
+    finally:
+        stack.remove(recorder)
+
+
+@contextmanager
+def assert_max_queries(limit, engines=None):
+    """فشل الاختبار إذا نفذت الكتلة أكثر من limit استعلاماً
+
+    Raises:
+        AssertionError: مع قائمة الاستعلامات المنفذة
+    """
+    with record_queries(engines) as recorder:
+        yield recorder
+    if recorder.count > limit:
+        raise AssertionError(
+            f'{recorder.count} queries executed, budget is {limit}:\n{recorder.describe()}')
+
+
+def init_query_profiler(app):
+    """تفعيل عد الاستعلامات لكل طلب في وضع التطوير"""
+    if not app.config.get('SQL_PROFILER', app.debug):
+        return
+
+    threshold = app.config.get('SQL_PROFILER_REPEAT_THRESHOLD', 3)
+    with app.app_context():
+        for engine in _default_engines():
+            instrument_engine(engine)
+
+    @app.before_request
+    def _start_query_recording():
+        recorder = QueryRecorder()
+        _active_recorders().append(recorder)
+        g.query_recorder = recorder
+
+    @app.after_request
+    def _report_queries(response):
+        recorder = g.get('query_recorder')
+        if recorder is None:
+            return response
+        response.headers['X-Query-Count'] = str(recorder.count)
+        response.headers['X-Query-Time-Ms'] = f'{recorder.total_ms:.2f}'
+        endpoint = request.endpoint or 'unmatched'
+        logger.debug('%s: %d queries in %.2f ms', endpoint, recorder.count, recorder.total_ms)
+        for statement, count, distinct in recorder.repeated(threshold):
+            logger.warning('possible N+1 on %s: statement ran %d times with %d distinct parameter sets: %s',
+                           endpoint, count, distinct, statement)
+        return response
+
+    @app.teardown_request
+    def _stop_query_recording(error=None):
+        recorder = g.pop('query_recorder', None)
+        if recorder is not None:
+            stack = _active_recorders()
+            if recorder in stack:
+                stack.remove(recorder)
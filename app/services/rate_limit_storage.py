@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+تخزين عدادات Flask-Limiter في قاعدة البيانات (نافذة زمنية ثابتة)
+
+يسمح بمشاركة حدود الطلبات بين جميع عمليات gunicorn والخوادم دون الحاجة
+إلى Redis. الاستخدام:
+
+    RATELIMIT_STORAGE_URI=sqldb://
+    RATELIMIT_STORAGE_OPTIONS={'url': '<رابط قاعدة البيانات>'}
+
+يدعم استراتيجية fixed-window فقط، لاستراتيجية moving-window استخدم redis://.
+"""
+
+import threading
+import time
+from limits.storage import Storage
+from sqlalchemy import (Column, Float, Integer, MetaData, String, Table, case, create_engine,
+                        delete, exc, insert, select, update)
+
+metadata = MetaData()
+
+rate_limit_counters = Table(
+    'rate_limit_counters', metadata,
+    Column('key', String(255), primary_key=True),
+    Column('count', Integer, nullable=False),
+    Column('expires_at', Float, nullable=False, index=True),
+)
+
+
+# الاستراتيجيات التي ينفذها SQLRateLimitStorage
+SUPPORTED_STRATEGIES = ('fixed-window',)
+
+
+def check_strategy(app):
+    """رفض استراتيجية لا يدعمها sqldb:// عند بدء التطبيق
+
+    بدونه يفشل Flask-Limiter بـ NotImplementedError لا يذكر الإعداد المسؤول.
+    """
+    if not app.config.get('RATELIMIT_STORAGE_URI', '').startswith('sqldb'):
+        return
+    strategy = app.config.get('RATELIMIT_STRATEGY', 'fixed-window')
+    if strategy not in SUPPORTED_STRATEGIES:
+        raise ValueError(f'RATELIMIT_STRATEGY={strategy} غير مدعوم مع sqldb://، '
+                         f'استخدم fixed-window أو RATELIMIT_STORAGE_URI=redis://')
+
+
+class SQLRateLimitStorage(Storage):
+    """تخزين عدادات الحدود في جدول rate_limit_counters"""
+
+    STORAGE_SCHEME = ['sqldb']
+
+    def __init__(self, uri=None, wrap_exceptions=False, url=None, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions)
+        if not url:
+            raise ValueError('sqldb:// يتطلب RATELIMIT_STORAGE_OPTIONS={"url": ...}')
+        self._engine = create_engine(url, pool_pre_ping=True)
+        self._table_ready = False
+        self._lock = threading.Lock()
+
+    @property
+    def base_exceptions(self):
+        return exc.SQLAlchemyError
+
+    def _ensure_table(self):
+        """إنشاء الجدول عند أول استخدام وليس عند بدء التطبيق"""
+        if self._table_ready:
+            return
+        with self._lock:
+            if not self._table_ready:
+                metadata.create_all(self._engine, checkfirst=True)
+                self._table_ready = True
+
+    def incr(self, key, expiry, elastic_expiry=False, amount=1):
+        self._ensure_table()
+        now = time.time()
+        table = rate_limit_counters
+        expired = table.c.expires_at <= now
+
+        with self._engine.begin() as connection:
+            # تحديث ذري: إعادة بدء النافذة إذا انتهت، وإلا زيادة العداد
+            result = connection.execute(
+                update(table).where(table.c.key == key).values(
+                    count=case((expired, amount), else_=table.c.count + amount),
+                    expires_at=case((expired, now + expiry), else_=table.c.expires_at),
+                )
+            )
+            if result.rowcount == 0:
+                try:
+                    with connection.begin_nested():
+                        connection.execute(insert(table).values(key=key, count=amount, expires_at=now + expiry))
+                    return amount
+                except exc.IntegrityError:
+                    # عملية أخرى أنشأت المفتاح في نفس اللحظة
+                    connection.execute(
+                        update(table).where(table.c.key == key).values(count=table.c.count + amount)
+                    )
+            return connection.execute(select(table.c.count).where(table.c.key == key)).scalar() or 0
+
+    def get(self, key):
+        self._ensure_table()
+        table = rate_limit_counters
+        with self._engine.connect() as connection:
+            count = connection.execute(
+                select(table.c.count).where(table.c.key == key, table.c.expires_at > time.time())
+            ).scalar()
+        return count or 0
+
+    def get_expiry(self, key):
+        self._ensure_table()
+        table = rate_limit_counters
+        with self._engine.connect() as connection:
+            expires_at = connection.execute(
+                select(table.c.expires_at).where(table.c.key == key)
+            ).scalar()
+        return expires_at or time.time()
+
+    def check(self):
+        try:
+            with self._engine.connect() as connection:
+                connection.execute(select(1))
+            return True
+        except exc.SQLAlchemyError:
+            return False
+
+    def reset(self):
+        self._ensure_table()
+        with self._engine.begin() as connection:
+            return connection.execute(delete(rate_limit_counters)).rowcount
+
+    def clear(self, key):
+        self._ensure_table()
+        with self._engine.begin() as connection:
+            connection.execute(delete(rate_limit_counters).where(rate_limit_counters.c.key == key))
+
+    def cleanup_expired(self, batch_size=1000):
+        """حذف العدادات المنتهية على دفعات"""
+        self._ensure_table()
+        table = rate_limit_counters
+        deleted = 0
+        while True:
+            with self._engine.begin() as connection:
+                keys = [row.key for row in connection.execute(
+                    select(table.c.key).where(table.c.expires_at <= time.time()).limit(batch_size)
+                )]
+                if not keys:
+                    return deleted
+                deleted += connection.execute(delete(table).where(table.c.key.in_(keys))).rowcount
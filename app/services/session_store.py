@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+"""
+تخزين الجلسات في الخادم بدلاً من الكوكي (اختياري)
+
+SESSION_BACKEND:
+    cookie: جلسة Flask الافتراضية الموقعة في الكوكي
+    sql: جدول sessions في قاعدة البيانات (مشترك بين العمليات)
+    memory: قاموس في ذاكرة العملية (للتطوير والاختبار فقط)
+
+الكوكي يحمل معرفاً عشوائياً قصيراً فقط، والبيانات تحمل من التخزين عند
+أول استخدام للجلسة في الطلب. الطلبات بدون كوكي وطلبات الملفات الثابتة
+لا تصل إلى التخزين إطلاقاً (Flask-Login يقرأ الجلسة بعد كل طلب آخر).
+"""
+
+import re
+import secrets
+import threading
+import time
+from datetime import datetime
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from sqlalchemy import delete, insert, select, update
+
+SID_RE = re.compile(r'[A-Za-z0-9_-]{32}')
+
+
+def new_session_id():
+    """معرف جلسة عشوائي (192 بت) بطول 32 حرفاً"""
+    return secrets.token_urlsafe(24)
+
+
+class LazySession(SessionMixin):
+    """جلسة تحمل بياناتها من التخزين عند أول وصول فقط"""
+
+    def __init__(self, store, sid):
+        self.store = store
+        self.sid = sid
+        self.new = sid is None
+        self.modified = False
+        self.accessed = False
+        self.expires_at = None
+        self._data = None
+
+    @property
+    def data(self):
+        if self._data is None:
+            self.accessed = True
+            record = self.store.load(self.sid) if self.sid else None
+            if record is None:
+                self._data = {}
+                self.sid = None
+                self.new = True
+            else:
+                self._data, self.expires_at = record
+        return self._data
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __setitem__(self, key, value):
+        self.data[key] = value
+        self.modified = True
+
+    def __delitem__(self, key):
+        del self.data[key]
+        self.modified = True
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __len__(self):
+        return len(self.data)
+
+    def regenerate(self):
+        """تغيير معرف الجلسة مع الاحتفاظ بالبيانات (عند تسجيل الدخول)"""
+        data = self.data
+        if self.sid:
+            self.store.delete(self.sid)
+        self._data = data
+        self.sid = None
+        self.new = True
+        self.modified = True
+
+
+class MemorySessionStore:
+    """تخزين الجلسات في ذاكرة العملية"""
+
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions = {}
+
+    def load(self, sid):
+        with self._lock:
+            record = self._sessions.get(sid)
+        if record is None or record[1] < datetime.utcnow():
+            return None
+        # نسخة مستقلة حتى لا تتشارك الطلبات نفس الكائنات
+        return self.serializer.loads(record[0]), record[1]
+
+    def save(self, sid, data, expires_at):
+        payload = self.serializer.dumps(dict(data))
+        with self._lock:
+            self._sessions[sid] = (payload, expires_at)
+
+    def touch(self, sid, expires_at):
+        with self._lock:
+            if sid in self._sessions:
+                self._sessions[sid] = (self._sessions[sid][0], expires_at)
+
+    def delete(self, sid):
+        with self._lock:
+            self._sessions.pop(sid, None)
+
+    def cleanup(self, batch_size=500, max_batches=1):
+        now = datetime.utcnow()
+        with self._lock:
+            expired = [sid for sid, (_, expires_at) in self._sessions.items() if expires_at < now]
+            expired = expired[:batch_size * max_batches] if max_batches else expired
+            for sid in expired:
+                del self._sessions[sid]
+        return len(expired)
+
+
+class SQLSessionStore:
+    """تخزين الجلسات في جدول sessions
+
+    يستخدم اتصالات المحرك الرئيسي مباشرة وليس db.session حتى لا يحفظ
+    أو يلغي تغييرات الطلب نفسه.
+    """
+
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, db):
+        self.db = db
+
+    @property
+    def table(self):
+        from app.models import SessionRecord
+        return SessionRecord.__table__
+
+    def load(self, sid):
+        table = self.table
+        with self.db.engine.connect() as connection:
+            row = connection.execute(
+                select(table.c.data, table.c.expires_at)
+                .where(table.c.id == sid, table.c.expires_at > datetime.utcnow())
+            ).first()
+        if row is None:
+            return None
+        return self.serializer.loads(row.data), row.expires_at
+
+    def save(self, sid, data, expires_at):
+        table = self.table
+        payload = self.serializer.dumps(dict(data))
+        with self.db.engine.begin() as connection:
+            result = connection.execute(
+                update(table).where(table.c.id == sid).values(data=payload, expires_at=expires_at)
+            )
+            if result.rowcount == 0:
+                connection.execute(insert(table).values(id=sid, data=payload, expires_at=expires_at))
+
+    def touch(self, sid, expires_at):
+        table = self.table
+        with self.db.engine.begin() as connection:
+            connection.execute(update(table).where(table.c.id == sid).values(expires_at=expires_at))
+
+    def delete(self, sid):
+        table = self.table
+        with self.db.engine.begin() as connection:
+            connection.execute(delete(table).where(table.c.id == sid))
+
+    def cleanup(self, batch_size=500, max_batches=1):
+        """حذف الجلسات المنتهية على دفعات صغيرة عبر فهرس expires_at
+
+        Returns:
+            int: عدد الجلسات المحذوفة
+        """
+        table = self.table
+        deleted = 0
+        batches = 0
+        while not max_batches or batches < max_batches:
+            with self.db.engine.begin() as connection:
+                ids = connection.execute(
+                    select(table.c.id).where(table.c.expires_at < datetime.utcnow()).limit(batch_size)
+                ).scalars().all()
+                if not ids:
+                    break
+                deleted += connection.execute(delete(table).where(table.c.id.in_(ids))).rowcount
+            batches += 1
+        return deleted
+
+
+class ServerSessionInterface(SessionInterface):
+    """واجهة جلسات Flask فوق تخزين في الخادم"""
+
+    def __init__(self, store, cleanup_interval=300, cleanup_batch=500):
+        self.store = store
+        self.cleanup_interval = cleanup_interval
+        self.cleanup_batch = cleanup_batch
+        self._next_cleanup = time.monotonic() + cleanup_interval
+        self._cleanup_lock = threading.Lock()
+
+    def open_session(self, app, request):
+        # الملفات الثابتة لا تحتاج الجلسة: جلسة فارغة لا تحفظ ولا تمس الكوكي
+        if app.static_url_path and request.path.startswith(app.static_url_path + '/'):
+            return LazySession(self.store, None)
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid and not SID_RE.fullmatch(sid):
+            sid = None
+        return LazySession(self.store, sid)
+
+    def save_session(self, app, session, response):
+        # جلسة لم تستخدم في هذا الطلب: لا تخزين ولا تغيير في الكوكي
+        if not session.accessed:
+            return
+
+        response.vary.add('Cookie')
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session.data:
+            if session.sid:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        lifetime = app.permanent_session_lifetime
+        expires_at = datetime.utcnow() + lifetime
+        if session.modified or session.sid is None:
+            session.sid = session.sid or new_session_id()
+            self.store.save(session.sid, session.data, expires_at)
+        elif session.expires_at and session.expires_at - datetime.utcnow() < lifetime / 2:
+            # تمديد الصلاحية عند مرور نصف المدة فقط بدلاً من الكتابة في كل طلب
+            self.store.touch(session.sid, expires_at)
+        else:
+            self._maybe_cleanup()
+            return
+
+        response.set_cookie(
+            name, session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain, path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+        self._maybe_cleanup()
+
+    def _maybe_cleanup(self):
+        """دفعة تنظيف واحدة على الأكثر كل cleanup_interval ثانية لكل عملية"""
+        if time.monotonic() < self._next_cleanup or not self._cleanup_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_cleanup = time.monotonic() + self.cleanup_interval
+            self.store.cleanup(batch_size=self.cleanup_batch, max_batches=1)
+        finally:
+            self._cleanup_lock.release()
+
+
+def init_session_store(app, db):
+    """تفعيل تخزين الجلسات في الخادم حسب SESSION_BACKEND"""
+    backend = app.config.get('SESSION_BACKEND', 'cookie')
+    if backend == 'cookie':
+        return
+    if backend == 'sql':
+        store = SQLSessionStore(db)
+    elif backend == 'memory':
+        store = MemorySessionStore()
+    else:
+        raise ValueError(f'SESSION_BACKEND غير مدعوم: {backend}')
+
+    app.session_interface = ServerSessionInterface(
+        store,
+        cleanup_interval=app.config.get('SESSION_CLEANUP_INTERVAL', 300),
+        cleanup_batch=app.config.get('SESSION_CLEANUP_BATCH', 500),
+    )
+
+    from flask import session
+    from flask_login import user_logged_in
+
+    @user_logged_in.connect_via(app)
+    def _rotate_session_id(sender, user, **extra):
+        # معرف جديد بعد تسجيل الدخول لمنع تثبيت الجلسة (session fixation)
+        if isinstance(session._get_current_object(), LazySession):
+            session.regenerate()
@@ -56,7 +56,7 @@ class SimpleImageValidator:
             return True, "الصورة مقبولة للرفع"
             
         except Exception as e:
-            current_app.logger.error(f"خطأ في التحقق من الصورة: {str(e)}")
+            current_app.logger.error("خطأ في التحقق من الصورة: %s", e)
             image_file.seek(0)
             return False, "خطأ في قراءة الصورة. يرجى التأكد من صحة الملف"
     
@@ -93,7 +93,7 @@ class SimpleImageValidator:
             return True, "جودة الصورة مقبولة"
             
         except Exception as e:
-            current_app.logger.error(f"خطأ في فحص جودة الصورة: {str(e)}")
+            current_app.logger.error("خطأ في فحص جودة الصورة: %s", e)
             return False, "خطأ في تحليل جودة الصورة"
     
     def get_image_hash(self, image_file) -> str:
@@ -145,7 +145,7 @@ class SimpleImageValidator:
             return False, ""
             
         except Exception as e:
-            current_app.logger.error(f"خطأ في فحص تكرار الصورة: {str(e)}")
+            current_app.logger.error("خطأ في فحص تكرار الصورة: %s", e)
             return False, ""
     
     def save_image_hash(self, user_id: int, image_name: str, image_hash: str):
@@ -179,7 +179,7 @@ class SimpleImageValidator:
                 json.dump(user_hashes, f, ensure_ascii=False, indent=2)
                 
         except Exception as e:
-            current_app.logger.error(f"خطأ في حفظ hash الصورة: {str(e)}")
+            current_app.logger.error("خطأ في حفظ hash الصورة: %s", e)
     
     def validate_person_image_simple(self, image_file, user_id: int, image_name: str) -> Tuple[bool, str]:
         """
@@ -212,7 +212,7 @@ class SimpleImageValidator:
             return True, "تم قبول الصورة بنجاح"
             
         except Exception as e:
-            current_app.logger.error(f"خطأ في التحقق من صورة الشخص: {str(e)}")
+            current_app.logger.error("خطأ في التحقق من صورة الشخص: %s", e)
             return False, "خطأ في معالجة الصورة. يرجى المحاولة مرة أخرى"
 
 
@@ -3,9 +3,11 @@
 خدمة إرسال رسائل SMS للتحقق من رقم الهاتف
 """
 
-import requests
 import logging
 from flask import current_app
+from app.services.http_client import local_sms_client
+from app.services.metrics import timed
+from app.services.phone import normalize_phone_or_none, is_valid_phone
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +15,7 @@ class SMSService:
     """خدمة إرسال رسائل SMS"""
     
     @staticmethod
+    @timed('sms.send')
     def send_verification_code(phone_number, verification_code):
         """
         إرسال رمز التحقق عبر SMS
@@ -22,42 +25,32 @@ class SMSService:
             verification_code (str): رمز التحقق المكون من 6 أرقام
 
         Returns:
-            bool: True إذا تم الإرسال بنجاح، False في حالة الفشل
+            bool: True إذا تم الإرسال بنجاح، False في حالة الفشل (يعيد الطابور المحاولة)
         """
 
         try:
             # إرسال عبر WhatsApp إذا كان مفعل
             if current_app.config.get('WHATSAPP_ENABLED', False):
-                logger.info(f"📱 محاولة إرسال رمز التحقق عبر WhatsApp إلى {phone_number}")
+                logger.info("📱 محاولة إرسال رمز التحقق عبر WhatsApp إلى %s", phone_number)
                 try:
                     from app.services.whatsapp import WhatsAppService
                     result = WhatsAppService.send_verification_code(phone_number, verification_code)
-                    if result:
-                        logger.info(f"✅ تم إرسال رمز التحقق عبر WhatsApp بنجاح")
-                        return True
-                    else:
-                        logger.warning(f"⚠️ فشل إرسال WhatsApp، التبديل للوضع المحلي")
                 except Exception as whatsapp_error:
-                    logger.error(f"❌ خطأ في WhatsApp: {str(whatsapp_error)}")
-                    logger.info(f"🔄 التبديل للوضع المحلي...")
-
-            # الوضع المحلي - عرض الرمز في الكونسول (يعمل دائماً)
-            print(f"\n" + "="*60)
-            print(f"📱 رمز التحقق لرقم {phone_number}")
-            print(f"🔢 الرمز: {verification_code}")
-            print(f"⏰ صالح لمدة 10 دقائق")
-            print(f"💡 استخدم هذا الرمز في صفحة التحقق")
-            if current_app.config.get('WHATSAPP_ENABLED', False):
-                print(f"⚠️ تم التبديل للوضع المحلي بسبب مشكلة في WhatsApp")
-            else:
-                print(f"ℹ️ WhatsApp غير مفعل - وضع التطوير")
-            print(f"="*60 + "\n")
-
-            logger.info(f"✅ تم عرض رمز التحقق {verification_code} لرقم {phone_number} في الكونسول")
+                    logger.error("❌ خطأ في WhatsApp: %s", whatsapp_error)
+                    return False
+                if result:
+                    logger.info("✅ تم إرسال رمز التحقق عبر WhatsApp بنجاح")
+                else:
+                    logger.warning("⚠️ فشل إرسال رمز التحقق عبر WhatsApp إلى %s", phone_number)
+                return bool(result)
+
+            # الوضع المحلي (WhatsApp معطل) - عرض الرمز في السجل
+            logger.info("📱 رمز التحقق لرقم %s: %s (صالح لمدة 10 دقائق)", phone_number, verification_code,
+                        extra={'phone': phone_number, 'delivery': 'console'})
             return True
 
         except Exception as e:
-            logger.error(f"خطأ في إرسال رمز التحقق إلى {phone_number}: {str(e)}")
+            logger.error("خطأ في إرسال رمز التحقق إلى %s: %s", phone_number, e)
             return False
     
 
@@ -86,17 +79,18 @@ class SMSService:
                 'api_key': api_key
             }
             
-            response = requests.post(api_url, json=payload, timeout=30)
+            local_sms_client.configure(current_app.config, 'LOCAL_SMS')
+            response = local_sms_client.post(api_url, json=payload)
             
             if response.status_code == 200:
-                logger.info(f"تم إرسال رمز التحقق عبر الخدمة المحلية")
+                logger.info("تم إرسال رمز التحقق عبر الخدمة المحلية")
                 return True
             else:
-                logger.error(f"فشل إرسال رمز التحقق: {response.status_code}")
+                logger.error("فشل إرسال رمز التحقق: %s", response.status_code)
                 return False
                 
         except Exception as e:
-            logger.error(f"خطأ في إرسال رمز التحقق عبر الخدمة المحلية: {str(e)}")
+            logger.error("خطأ في إرسال رمز التحقق عبر الخدمة المحلية: %s", e)
             return False
     
     @staticmethod
@@ -111,43 +105,7 @@ class SMSService:
         Returns:
             str: رقم الهاتف بالصيغة الصحيحة +967xxxxxxxxx أو None إذا كان غير صالح
         """
-        if not phone_number:
-            return None
-
-        # إزالة المسافات والرموز الإضافية
-        phone = phone_number.strip().replace(' ', '').replace('-', '').replace('(', '').replace(')', '')
-
-        # إزالة الأصفار الإضافية في البداية
-        phone = phone.lstrip('0')
-
-        # إضافة +967 إذا لم تكن موجودة
-        if phone.startswith('967'):
-            phone = '+' + phone
-        elif phone.startswith('7') and len(phone) == 9:
-            phone = '+967' + phone
-        elif phone.startswith('+967'):
-            # الرقم صحيح بالفعل
-            pass
-        else:
-            # محاولة أخيرة: إذا كان الرقم يبدأ بأرقام أخرى
-            if len(phone) == 9 and phone[0] == '7':
-                phone = '+967' + phone
-            else:
-                return None
-
-        # التحقق من طول الرقم النهائي
-        if len(phone) != 13:  # +967 + 9 أرقام
-            return None
-
-        # التحقق من أن الرقم يحتوي على أرقام فقط بعد +967
-        if not phone[4:].isdigit():
-            return None
-
-        # التحقق من أن الرقم يبدأ بـ 7 (الأرقام اليمنية)
-        if not phone.startswith('+9677'):
-            return None
-
-        return phone
+        return normalize_phone_or_none(phone_number)
     
     @staticmethod
     def is_valid_yemen_phone(phone_number):
@@ -161,43 +119,7 @@ class SMSService:
         Returns:
             bool: True إذا كان الرقم صحيح
         """
-        import re
-
-        if not phone_number:
-            return False
-
-        # تنظيف الرقم
-        clean_phone = phone_number.strip().replace(' ', '').replace('-', '')
-
-        # إضافة +967 إذا لم تكن موجودة
-        if clean_phone.startswith('967'):
-            clean_phone = '+' + clean_phone
-        elif clean_phone.startswith('7') and len(clean_phone) == 9:
-            clean_phone = '+967' + clean_phone
-        elif not clean_phone.startswith('+967'):
-            return False
-
-        # فحص الطول الإجمالي
-        if len(clean_phone) != 13:  # +967 + 9 أرقام
-            return False
-
-        # أنماط الشبكات اليمنية المدعومة
-        yemen_patterns = [
-            r'^\+967(70[0-9]|71[0-9]|72[0-9]|73[0-9]|74[0-9]|75[0-9]|76[0-9]|77[0-9]|78[0-9])[0-9]{6}$',  # يمن موبايل
-            r'^\+967(73[0-9]|77[0-9])[0-9]{6}$',  # سبائفون
-            r'^\+967(70[0-9]|71[0-9])[0-9]{6}$',  # واي
-            r'^\+967(78[0-9])[0-9]{6}$',  # MTN
-            r'^\+9677[0-9]{7}$',  # جميع الأرقام التي تبدأ بـ 7 (عام)
-        ]
-
-        # فحص مع جميع الأنماط
-        for pattern in yemen_patterns:
-            if re.match(pattern, clean_phone):
-                return True
-
-        # فحص عام للأرقام اليمنية (7xxxxxxxx)
-        general_pattern = r'^\+9677[0-9]{7}$'
-        return bool(re.match(general_pattern, clean_phone))
+        return is_valid_phone(phone_number)
 
 
 # دالة مساعدة للاستخدام المباشر
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+قياس زمن مراحل إنشاء التطبيق (create_app)
+
+تسجل المراحل في السجل app.startup كسطر واحد بصيغة key=value مع الحقول نفسها
+في extra، وتحفظ في app.extensions['startup_profile'] لعرضها أو قياسها.
+STARTUP_PROFILE=True يرفع مستوى السجل إلى INFO، وإلا يبقى DEBUG.
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger('app.startup')
+
+
+class StartupProfile:
+    """مؤقت بسيط لمراحل بدء التشغيل بالترتيب"""
+
+    def __init__(self, imports_ms=None):
+        self._started = time.perf_counter()
+        # زمن استيراد الحزمة يحسب مرة واحدة لكل عملية
+        self.phases = {'imports': imports_ms} if imports_ms is not None else {}
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + (time.perf_counter() - start) * 1000
+
+    @property
+    def total_ms(self):
+        return (time.perf_counter() - self._started) * 1000 + self.phases.get('imports', 0.0)
+
+    def as_dict(self):
+        return {
+            'total_ms': round(self.total_ms, 2),
+            'phases_ms': {name: round(ms, 2) for name, ms in self.phases.items()},
+        }
+
+    def log(self, app):
+        """تسجيل النتيجة وحفظها في app.extensions"""
+        result = self.as_dict()
+        app.extensions['startup_profile'] = result
+        level = logging.INFO if app.config.get('STARTUP_PROFILE') else logging.DEBUG
+        if logger.isEnabledFor(level):
+            fields = ' '.join(f'{name}_ms={ms}' for name, ms in result['phases_ms'].items())
+            logger.log(level, 'create_app total_ms=%s %s', result['total_ms'], fields,
+                       extra={'startup': result})
+        return result
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+سجلات منظمة (JSON) غير معطلة للطلبات مع معرف لكل طلب
+
+كل السجلات (التطبيق و werkzeug و SQLAlchemy) تمر عبر QueueHandler على المسجل
+الجذر: خيط الطلب يضيف السجل إلى طابور في الذاكرة فقط، وخيط QueueListener يحوله
+إلى JSON ويكتبه. النص يبنى بأسلوب logger.info('... %s', value) فلا يكلف شيئاً
+إذا كان المستوى معطلاً.
+
+كل سجل داخل طلب يحمل request_id (من ترويسة X-Request-ID إن وجدت أو معرف جديد)،
+ويعاد المعرف في ترويسة الاستجابة لربط سجلات الطلب الواحد.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import re
+import sys
+import uuid
+from datetime import datetime, timezone
+from flask import g, has_request_context, request
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+REQUEST_ID_RE = re.compile(r'[A-Za-z0-9._-]{1,64}')
+
+TEXT_FORMAT = '%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s'
+
+# حقول LogRecord القياسية - أي حقل آخر جاء من extra ويضاف إلى JSON
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {
+    'message', 'asctime', 'request_id', 'taskName',
+}
+
+_listener = None
+_handler = None
+
+
+class StderrHandler(logging.StreamHandler):
+    """الكتابة إلى sys.stderr الحالي وقت كل سجل (يتغير أثناء الاختبارات مثلاً)"""
+
+    @property
+    def stream(self):
+        return sys.stderr
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+class RequestIdFilter(logging.Filter):
+    """إضافة معرف الطلب الحالي إلى السجل (في خيط الطلب قبل دخول الطابور)"""
+
+    def filter(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = g.get('request_id', '-') if has_request_context() else '-'
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """سطر JSON واحد لكل سجل"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', '-'),
+            'pid': record.process,
+            'thread': record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        if record.stack_info:
+            entry['stack'] = record.stack_info
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RequestQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler يترك بناء JSON والكتابة لخيط المستمع
+
+    prepare الافتراضي ينسق السجل بالكامل في خيط الطلب؛ هنا يحسب نص الرسالة
+    والخطأ فقط (لأن الوسائط وكائن traceback قد تتغير بعد عودة الطلب).
+    """
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def parse_levels(spec):
+    """'app.sql=DEBUG,werkzeug=WARNING' -> {'app.sql': 'DEBUG', 'werkzeug': 'WARNING'}"""
+    levels = {}
+    for item in (spec or '').split(','):
+        name, _, level = item.partition('=')
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(level='INFO', fmt='json', levels=None, use_queue=True, stream=None):
+    """تهيئة المسجل الجذر (يمكن استدعاؤها أكثر من مرة، تستبدل الإعداد السابق)"""
+    global _listener, _handler
+    shutdown_logging()
+
+    output = logging.StreamHandler(stream) if stream else StderrHandler()
+    output.setFormatter(JsonFormatter() if fmt == 'json' else logging.Formatter(TEXT_FORMAT))
+
+    if use_queue:
+        log_queue = queue.SimpleQueue()
+        _handler = RequestQueueHandler(log_queue)
+        _listener = logging.handlers.QueueListener(log_queue, output)
+        _listener.start()
+    else:
+        _handler = output
+    _handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    root.addHandler(_handler)
+    root.setLevel(level.upper())
+    for name, module_level in (levels or {}).items():
+        logging.getLogger(name).setLevel(module_level)
+
+
+def shutdown_logging():
+    """إزالة المعالج وكتابة ما تبقى في الطابور"""
+    global _listener, _handler
+    if _handler is not None:
+        logging.getLogger().removeHandler(_handler)
+        _handler = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
+
+
+def init_logging(app):
+    """تهيئة السجلات حسب إعدادات التطبيق وربطها بمعرف الطلب"""
+    if app.config.get('LOG_CONFIGURE', True):
+        from flask.logging import default_handler
+        app.logger.removeHandler(default_handler)
+        # مستوى مسجل التطبيق يتبع LOG_LEVEL/LOG_LEVELS وليس DEBUG في Flask
+        app.logger.setLevel(logging.NOTSET)
+        configure_logging(
+            level=app.config.get('LOG_LEVEL', 'INFO'),
+            fmt=app.config.get('LOG_FORMAT', 'json'),
+            levels=parse_levels(app.config.get('LOG_LEVELS')),
+            use_queue=app.config.get('LOG_QUEUE', True),
+        )
+
+    @app.before_request
+    def _assign_request_id():
+        incoming = request.headers.get(REQUEST_ID_HEADER, '')
+        g.request_id = incoming if REQUEST_ID_RE.fullmatch(incoming) else uuid.uuid4().hex
+
+    @app.after_request
+    def _return_request_id(response):
+        request_id = g.get('request_id')
+        if request_id:
+            response.headers[REQUEST_ID_HEADER] = request_id
+        return response
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+بيانات الأداء الحية لصفحة حالة النظام
+
+كل القيم من إحصائيات في ذاكرة العملية (metrics و hash_executor وإحصائيات تجمع كل محرك)،
+ما عدا عمق طابور الرسائل المشترك الذي يحسب باستعلام واحد كل
+TELEMETRY_QUEUE_REFRESH_SECONDS ثانية على الأكثر.
+"""
+
+import shutil
+import threading
+import time
+from flask import current_app
+from app.extensions import db
+from app.models import OutboundMessage
+from app.services.db_pool import get_pools_status
+from app.services.files import UPLOAD_BYTES, UPLOAD_VALIDATIONS, load_validation_backend
+from app.services.hash_executor import hash_executor
+from app.services.message_queue import OTP_DELIVERIES, dispatcher
+from app.services.metrics import PROCESS_STARTED, REQUEST_DURATION, SPAN_DURATION, metrics
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+class _CachedValue:
+    """قيمة تحسب مرة كل فترة ويعاد استخدامها بين الطلبات"""
+
+    def __init__(self, compute):
+        self._compute = compute
+        self._lock = threading.Lock()
+        self._value = None
+        self._expires = 0.0
+
+    def get(self, ttl):
+        now = time.monotonic()
+        if now >= self._expires and self._lock.acquire(blocking=False):
+            try:
+                self._value = self._compute()
+            except Exception as e:
+                current_app.logger.warning('تعذر تحديث عمق طابور الرسائل: %s', e)
+            finally:
+                self._expires = now + ttl
+                self._lock.release()
+        return self._value
+
+
+def _count_pending_messages():
+    return db.session.query(OutboundMessage.id).filter(
+        OutboundMessage.status.in_(('pending', 'sending'))
+    ).count()
+
+
+_pending_messages = _CachedValue(_count_pending_messages)
+
+
+def validation_stats(uptime):
+    """زمن فحص الصور الشخصية ومعدله ونتائجه"""
+    face_recognition_available = load_validation_backend()[1]
+    span_name = 'upload.validate_face' if face_recognition_available else 'upload.validate_quality'
+    latency = SPAN_DURATION.quantiles(span=span_name)
+    return {
+        'stage': span_name,
+        'count': latency['count'],
+        'per_minute': round(latency['count'] / uptime * 60, 2),
+        'avg_ms': _ms(latency['avg']),
+        'p50_ms': _ms(latency['p50']),
+        'p95_ms': _ms(latency['p95']),
+        'p99_ms': _ms(latency['p99']),
+        'accepted': UPLOAD_VALIDATIONS.value(result='accepted'),
+        'rejected': UPLOAD_VALIDATIONS.value(result='rejected'),
+        'errors': UPLOAD_VALIDATIONS.value(result='error'),
+    }
+
+
+def request_stats(uptime):
+    """زمن جميع الطلبات في هذه العملية"""
+    latency = REQUEST_DURATION.quantiles()
+    return {
+        'count': latency['count'],
+        'per_minute': round(latency['count'] / uptime * 60, 2),
+        'p50_ms': _ms(latency['p50']),
+        'p95_ms': _ms(latency['p95']),
+        'p99_ms': _ms(latency['p99']),
+    }
+
+
+def queue_stats(hash_status):
+    """عمق طوابير العمل: تشفير كلمات المرور (محلي) والرسائل (مشترك)"""
+    ttl = current_app.config.get('TELEMETRY_QUEUE_REFRESH_SECONDS', 30)
+    return {
+        'hash_active': hash_status['active'],
+        'hash_queued': hash_status['queued'],
+        'otp_pending': _pending_messages.get(ttl),
+        'otp_senders': dispatcher.thread_count,
+    }
+
+
+def otp_stats():
+    """نجاح إرسال رموز التحقق من هذه العملية"""
+    sent = OTP_DELIVERIES.value(result='sent')
+    retried = OTP_DELIVERIES.value(result='retry')
+    dead = OTP_DELIVERIES.value(result='dead')
+    attempts = sent + retried + dead
+    return {
+        'sent': sent,
+        'retried': retried,
+        'dead': dead,
+        'success_rate': round(sent / attempts * 100, 1) if attempts else None,
+    }
+
+
+def disk_stats():
+    """مساحة قرص مجلد الرفع (استدعاء statvfs واحد بدون المرور على الملفات)"""
+    try:
+        usage = shutil.disk_usage(current_app.config['UPLOAD_FOLDER'])
+    except OSError:
+        usage = None
+    gb = 1024 ** 3
+    return {
+        'total_gb': round(usage.total / gb, 2) if usage else None,
+        'free_gb': round(usage.free / gb, 2) if usage else None,
+        'used_percent': round(usage.used / usage.total * 100, 1) if usage else None,
+        'uploaded_mb': round(UPLOAD_BYTES.value() / 1024 ** 2, 2),
+    }
+
+
+def collect_telemetry():
+    """جميع بيانات الأداء لعرضها في صفحة حالة النظام"""
+    uptime = max(time.time() - PROCESS_STARTED, 1.0)
+    hash_status = hash_executor.get_status()
+    return {
+        'uptime_minutes': round(uptime / 60, 1),
+        'requests': request_stats(uptime),
+        'validation': validation_stats(uptime),
+        'queues': queue_stats(hash_status),
+        'caches': metrics.cache_stats(),
+        'pool': get_pools_status(db.engines),
+        'hash': hash_status,
+        'disk': disk_stats(),
+        'otp': otp_stats(),
+    }
@@ -6,9 +6,22 @@
 import requests
 import logging
 from flask import current_app
+from app.services.http_client import whatsapp_client, CircuitOpenError
 
 logger = logging.getLogger(__name__)
 
+
+def _get_client():
+    """عميل WhatsApp المشترك بعد تطبيق إعدادات التطبيق"""
+    whatsapp_client.configure(current_app.config, 'WHATSAPP')
+    return whatsapp_client
+
+
+def _api_url(path):
+    """رابط WhatsApp Business API"""
+    base_url = current_app.config.get('WHATSAPP_API_URL', 'https://graph.facebook.com/v18.0')
+    return f"{base_url.rstrip('/')}/{path}"
+
 class WhatsAppService:
     """خدمة إرسال رسائل WhatsApp Business"""
     
@@ -47,7 +60,7 @@ class WhatsAppService:
 نظام تسجيل الطلاب"""
             
             # إعداد البيانات للإرسال
-            url = f"https://graph.facebook.com/v18.0/{phone_number_id}/messages"
+            url = _api_url(f"{phone_number_id}/messages")
             
             headers = {
                 'Authorization': f'Bearer {access_token}',
@@ -64,18 +77,21 @@ class WhatsAppService:
             }
             
             # إرسال الطلب
-            response = requests.post(url, json=data, headers=headers, timeout=30)
+            response = _get_client().post(url, json=data, headers=headers)
             
             if response.status_code == 200:
                 response_data = response.json()
-                logger.info(f"✅ تم إرسال رمز التحقق عبر WhatsApp إلى {phone_number}")
-                logger.info(f"معرف الرسالة: {response_data.get('messages', [{}])[0].get('id', 'غير محدد')}")
+                logger.info("✅ تم إرسال رمز التحقق عبر WhatsApp إلى %s", phone_number)
+                logger.info("معرف الرسالة: %s", response_data.get('messages', [{}])[0].get('id', 'غير محدد'))
                 return True
             else:
-                logger.error(f"❌ فشل إرسال رمز التحقق عبر WhatsApp: {response.status_code}")
-                logger.error(f"الاستجابة: {response.text}")
+                logger.error("❌ فشل إرسال رمز التحقق عبر WhatsApp: %s", response.status_code)
+                logger.error("الاستجابة: %s", response.text)
                 return False
                 
+        except CircuitOpenError:
+            logger.warning("⚠️ WhatsApp API متعطل مؤقتاً - تم تخطي الإرسال")
+            return False
         except requests.exceptions.Timeout:
             logger.error("❌ انتهت مهلة الاتصال مع WhatsApp API")
             return False
@@ -83,7 +99,7 @@ class WhatsAppService:
             logger.error("❌ خطأ في الاتصال مع WhatsApp API")
             return False
         except Exception as e:
-            logger.error(f"❌ خطأ غير متوقع في إرسال رمز التحقق عبر WhatsApp: {str(e)}")
+            logger.error("❌ خطأ غير متوقع في إرسال رمز التحقق عبر WhatsApp: %s", e)
             return False
     
     @staticmethod
@@ -120,7 +136,7 @@ class WhatsAppService:
 
 نتمنى لك التوفيق! 🌟"""
             
-            url = f"https://graph.facebook.com/v18.0/{phone_number_id}/messages"
+            url = _api_url(f"{phone_number_id}/messages")
             
             headers = {
                 'Authorization': f'Bearer {access_token}',
@@ -136,19 +152,63 @@ class WhatsAppService:
                 }
             }
             
-            response = requests.post(url, json=data, headers=headers, timeout=30)
+            response = _get_client().post(url, json=data, headers=headers)
             
             if response.status_code == 200:
-                logger.info(f"✅ تم إرسال رسالة الترحيب عبر WhatsApp إلى {phone_number}")
+                logger.info("✅ تم إرسال رسالة الترحيب عبر WhatsApp إلى %s", phone_number)
                 return True
             else:
-                logger.error(f"❌ فشل إرسال رسالة الترحيب: {response.status_code}")
+                logger.error("❌ فشل إرسال رسالة الترحيب: %s", response.status_code)
                 return False
                 
         except Exception as e:
-            logger.error(f"❌ خطأ في إرسال رسالة الترحيب: {str(e)}")
+            logger.error("❌ خطأ في إرسال رسالة الترحيب: %s", e)
             return False
     
+    @staticmethod
+    def send_text_message(phone_number, text):
+        """
+        إرسال رسالة نصية عامة (للإشعارات الجماعية)
+
+        Args:
+            phone_number (str): رقم الهاتف بصيغة +967xxxxxxxxx
+            text (str): نص الرسالة
+
+        Returns:
+            tuple: (هل تم الإرسال, رسالة الخطأ أو None)
+        """
+        try:
+            access_token = current_app.config.get('WHATSAPP_ACCESS_TOKEN')
+            phone_number_id = current_app.config.get('WHATSAPP_PHONE_NUMBER_ID')
+
+            if not access_token or not phone_number_id:
+                return False, 'إعدادات WhatsApp غير مكتملة'
+
+            url = _api_url(f"{phone_number_id}/messages")
+
+            headers = {
+                'Authorization': f'Bearer {access_token}',
+                'Content-Type': 'application/json'
+            }
+
+            data = {
+                "messaging_product": "whatsapp",
+                "to": phone_number.replace('+', ''),
+                "type": "text",
+                "text": {
+                    "body": text
+                }
+            }
+
+            response = _get_client().post(url, json=data, headers=headers)
+
+            if response.status_code == 200:
+                return True, None
+            return False, f'HTTP {response.status_code}'
+
+        except Exception as e:
+            return False, str(e)
+
     @staticmethod
     def test_connection():
         """
@@ -168,13 +228,13 @@ class WhatsAppService:
                 }
             
             # اختبار الحصول على معلومات رقم الهاتف
-            url = f"https://graph.facebook.com/v18.0/{phone_number_id}"
+            url = _api_url(phone_number_id)
             
             headers = {
                 'Authorization': f'Bearer {access_token}'
             }
             
-            response = requests.get(url, headers=headers, timeout=10)
+            response = _get_client().get(url, headers=headers)
             
             if response.status_code == 200:
                 data = response.json()
@@ -11,11 +11,17 @@ from werkzeug.utils import secure_filename
 from app.student import bp
 from app.extensions import db
 from app.forms.application import ApplicationForm
-from app.models import Application, User
-from app.services.files import save_uploaded_file, validate_file
+from app.models import APPLICATION_PAGE_SIZE, MAX_APPLICATIONS_PER_USER, Application, ApplicationImage, User
+from app.services.db_routing import replica_reads
+from app.services.files import save_uploaded_file, validate_file, get_image_metadata
+from app.services.image_derivatives import image_urls
 from functools import wraps
 
 
+# أسماء الصور الشخصية حسب ترتيبها في النموذج
+IMAGE_NAMES = ['الصورة الأولى', 'الصورة الثانية', 'الصورة الثالثة', 'الصورة الرابعة', 'الصورة الخامسة']
+
+
 def student_required(f):
     """ديكوريتر للتحقق من أن المستخدم طالب"""
     @wraps(f)
@@ -27,19 +33,49 @@ def student_required(f):
 
 
 @bp.route('/status')
+@replica_reads
 @login_required
 @student_required
 def status():
     """عرض حالة طلبات التسجيل"""
-    applications = Application.query.filter_by(user_id=current_user.id).order_by(Application.created_at.desc()).all()
-    application_count = len(applications)
-    can_submit_new = Application.can_user_submit_new_application(current_user.id)
+    # الصفحة تعرض الصور وبيانات ولي الأمر، لذا نحملها مع الطلبات دفعة واحدة
+    query = Application.listing_query(user_id=current_user.id,
+                                      include_images=True,
+                                      include_guardian=True)
+    applications, next_cursor = Application.paginate_listing(query, after=request.args.get('after'))
+    application_count = Application.get_user_application_count(current_user.id)
+    can_submit_new = application_count < MAX_APPLICATIONS_PER_USER
 
     return render_template('student/status.html',
                          title='حالة الطلبات',
                          applications=applications,
                          application_count=application_count,
-                         can_submit_new=can_submit_new)
+                         can_submit_new=can_submit_new,
+                         next_cursor=next_cursor)
+
+
+@bp.route('/status/images')
+@replica_reads
+@login_required
+@student_required
+def status_images():
+    """روابط صور الطلبات المعروضة في صفحة الحالة دفعة واحدة
+
+    ?applications=1,2,3 -> {"1": [{"position", "thumb", "srcset", "original"}, ...], ...}
+    """
+    application_ids = [int(value) for value in request.args.get('applications', '').split(',')
+                       if value.strip().isdecimal()][:APPLICATION_PAGE_SIZE]
+    images = {}
+    if application_ids:
+        rows = (db.session.query(ApplicationImage.application_id, ApplicationImage.position,
+                                 ApplicationImage.file_path)
+                .join(Application, ApplicationImage.application_id == Application.id)
+                .filter(Application.user_id == current_user.id,
+                        ApplicationImage.application_id.in_(application_ids))
+                .order_by(ApplicationImage.application_id, ApplicationImage.position))
+        for application_id, position, file_path in rows:
+            images.setdefault(str(application_id), []).append({'position': position, **image_urls(file_path)})
+    return jsonify(images)
 
 
 @bp.route('/application', methods=['GET', 'POST'])
@@ -49,7 +85,7 @@ def application():
     """تقديم طلب تسجيل جديد"""
     # التحقق من عدد الطلبات السابقة
     if not Application.can_user_submit_new_application(current_user.id):
-        flash('لقد تجاوزت الحد الأقصى للطلبات (5 طلبات). لا يمكن تقديم طلبات إضافية.', 'error')
+        flash(f'لقد تجاوزت الحد الأقصى للطلبات ({MAX_APPLICATIONS_PER_USER} طلبات). لا يمكن تقديم طلبات إضافية.', 'error')
         return redirect(url_for('student.status'))
     
     form = ApplicationForm()
@@ -81,30 +117,18 @@ def application():
             application.calculate_and_save_age()
             
             # حفظ الصور الشخصية الخمس مع فحص الوجوه
-            if form.image1.data:
-                img1_path = save_uploaded_file(form.image1.data, 'applications', current_user.id, 'photo', 'الصورة الأولى')
-                application.image1_path = img1_path
-
-            if form.image2.data:
-                img2_path = save_uploaded_file(form.image2.data, 'applications', current_user.id, 'photo', 'الصورة الثانية')
-                application.image2_path = img2_path
-
-            if form.image3.data:
-                img3_path = save_uploaded_file(form.image3.data, 'applications', current_user.id, 'photo', 'الصورة الثالثة')
-                application.image3_path = img3_path
-
-            if form.image4.data:
-                img4_path = save_uploaded_file(form.image4.data, 'applications', current_user.id, 'photo', 'الصورة الرابعة')
-                application.image4_path = img4_path
-
-            if form.image5.data:
-                img5_path = save_uploaded_file(form.image5.data, 'applications', current_user.id, 'photo', 'الصورة الخامسة')
-                application.image5_path = img5_path
+            for position, image_name in enumerate(IMAGE_NAMES, 1):
+                image_file = getattr(form, f'image{position}').data
+                if not image_file:
+                    continue
+                metadata = get_image_metadata(image_file)
+                file_path = save_uploaded_file(image_file, 'applications', current_user.id, 'photo', image_name)
+                application.images.append(ApplicationImage(position=position, file_path=file_path, **metadata))
             
             db.session.add(application)
             db.session.commit()
             
-            remaining_applications = 5 - Application.get_user_application_count(current_user.id)
+            remaining_applications = MAX_APPLICATIONS_PER_USER - new_application_number
             if remaining_applications > 0:
                 flash(f'تم تقديم طلبك رقم {new_application_number} بنجاح وحفظ بياناتك في النظام. يمكنك تقديم {remaining_applications} طلبات إضافية.', 'success')
             else:
@@ -113,7 +137,7 @@ def application():
             
         except Exception as e:
             db.session.rollback()
-            current_app.logger.error(f'خطأ في تقديم الطلب: {str(e)}')
+            current_app.logger.error('خطأ في تقديم الطلب: %s', e)
             flash('حدث خطأ أثناء تقديم الطلب. يرجى المحاولة مرة أخرى.', 'error')
     
     return render_template('student/application.html', 
@@ -152,7 +176,7 @@ def validate_image():
         })
         
     except Exception as e:
-        current_app.logger.error(f'خطأ في فحص الصورة: {str(e)}')
+        current_app.logger.error('خطأ في فحص الصورة: %s', e)
         return jsonify({
             'valid': False,
             'message': 'خطأ في فحص الصورة. يرجى المحاولة مرة أخرى.'
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+قياس تقديم الملفات عبر /files_or_static/ مع ذاكرة أماكن الملفات وبدونها
+
+ثلاث حالات لطالب مسجل: صور الطالب نفسه من مجلد الرفع (بالتناوب على --files ملفاً)،
+نفس الصورة مكررة، وملف قديم تحت static/. لكل حالة: الطلبات في الثانية وعدد
+استدعاءات stat/lstat لكل طلب (يشمل ما يحتاجه send_file نفسه).
+
+FILE_LOCATION_CACHE_SIZE=0 يعيد البحث في القرص مع كل طلب. للمقارنة مع commit
+سابق يشغل نفس الأمر عليه (الإعداد يتجاهل هناك).
+
+الاستخدام:
+    python benchmarks/bench_file_serving.py --requests 3000 --files 50
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+from app import create_app
+from app.config import TestingConfig
+from app.extensions import db
+from app.models import User
+
+PASSWORD = 'Sample-Passw0rd'
+STATIC_FILE = 'css/style.css'
+
+
+class StatCounter:
+    """عد استدعاءات os.stat و os.lstat (isfile و exists و realpath و send_file تمر بها)"""
+
+    def __init__(self):
+        self.calls = 0
+        self._originals = (os.stat, os.lstat)
+
+    def __enter__(self):
+        stat, lstat = self._originals
+
+        def counted_stat(*args, **kwargs):
+            self.calls += 1
+            return stat(*args, **kwargs)
+
+        def counted_lstat(*args, **kwargs):
+            self.calls += 1
+            return lstat(*args, **kwargs)
+
+        os.stat, os.lstat = counted_stat, counted_lstat
+        return self
+
+    def __exit__(self, *exc):
+        os.stat, os.lstat = self._originals
+
+
+def make_app(cache_size, upload_folder):
+    db_path = os.path.join(tempfile.mkdtemp(), 'files.db')
+
+    class BenchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{db_path}'
+        RATELIMIT_ENABLED = False
+        PASSWORD_EXECUTOR = 'inline'
+        METRICS_ENABLED = False
+        LOG_LEVEL = 'WARNING'
+        UPLOAD_FOLDER = upload_folder
+        FILE_LOCATION_CACHE_SIZE = cache_size
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        user = User(phone='+967771234567', is_phone_verified=True)
+        user.set_password(PASSWORD)
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+    return app, user_id
+
+
+def make_files(upload_folder, user_id, count):
+    folder = os.path.join(upload_folder, 'applications', str(user_id))
+    os.makedirs(folder, exist_ok=True)
+    paths = []
+    for i in range(count):
+        name = f'photo{i}.jpg'
+        Image.new('RGB', (480, 600), (i % 256, 120, 200)).save(os.path.join(folder, name), 'JPEG', quality=85)
+        paths.append(f'applications/{user_id}/{name}')
+    return paths
+
+
+def measure(client, paths, count):
+    """(طلبات/ثانية، stat لكل طلب) بعد طلب تمهيدي لكل مسار"""
+    for path in paths:
+        assert client.get(f'/files_or_static/{path}').status_code == 200, path
+    with StatCounter() as counter:
+        start = time.perf_counter()
+        for i in range(count):
+            client.get(f'/files_or_static/{paths[i % len(paths)]}')
+        elapsed = time.perf_counter() - start
+    return count / elapsed, counter.calls / count
+
+
+def run(cache_size, count, file_count):
+    upload_folder = tempfile.mkdtemp()
+    app, user_id = make_app(cache_size, upload_folder)
+    paths = make_files(upload_folder, user_id, file_count)
+
+    client = app.test_client()
+    client.post('/auth/login', data={'phone': '771234567', 'password': PASSWORD})
+    cases = [
+        ('uploads (rotating)', paths),
+        ('uploads (same file)', paths[:1]),
+        ('static fallback', [STATIC_FILE]),
+    ]
+    for name, case_paths in cases:
+        rate, stats = measure(client, case_paths, count)
+        print(f'{cache_size:>10}  {name:<22}{rate:>12.0f}{stats:>14.1f}')
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='قياس تقديم الملفات مع ذاكرة أماكن الملفات')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--files', type=int, default=50)
+    parser.add_argument('--cache-size', type=int,
+                        default=getattr(TestingConfig, 'FILE_LOCATION_CACHE_SIZE', 4096),
+                        help='حجم الذاكرة في القياس الثاني (الأول دائماً 0)')
+    args = parser.parse_args()
+
+    print(f'{"cache size":>10}  {"case":<22}{"req/s":>12}{"stat/req":>14}')
+    for cache_size in (0, args.cache_size):
+        run(cache_size, args.requests, args.files)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+"""
+قياس أداء مراحل فحص الصور الشخصية وحفظها
+
+مجموعة صور ثابتة (وجوه اصطناعية بنفس البذرة دائماً) بعدة أبعاد وصيغ، وكل
+حالة (مرحلة × أبعاد × صيغة) تقاس في عملية Python مستقلة حتى تكون أقصى ذاكرة
+مقيمة (peak RSS) خاصة بها. لكل حالة: زمن التنفيذ (الوسيط والأدنى و p95)، زيادة
+الذاكرة، البايتات المكتوبة على القرص، ونتيجة الفحص (قبول/رفض).
+
+المراحل:
+    simple.validate_image_basic    SimpleImageValidator.validate_image_basic
+    simple.validate_person_image   SimpleImageValidator.validate_person_image_simple (مع سجل hash)
+    face.check_image_quality       FaceRecognitionService.check_image_quality
+    face.detect_faces_in_image     FaceRecognitionService.detect_faces_in_image
+    face.validate_person_image     FaceRecognitionService.validate_person_image
+    files.get_image_metadata       files.get_image_metadata
+    files.save_high_quality_image  files.save_high_quality_image
+
+مراحل face.* تتخطى إذا لم تكن face_recognition مثبتة.
+
+الاستخدام:
+    python benchmarks/bench_image_validation.py --output before.json
+    python benchmarks/bench_image_validation.py --output after.json --compare before.json
+    python benchmarks/bench_image_validation.py --stages files.save_high_quality_image --sizes 3000x4000
+"""
+
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+STAGES = (
+    'simple.validate_image_basic',
+    'simple.validate_person_image',
+    'face.check_image_quality',
+    'face.detect_faces_in_image',
+    'face.validate_person_image',
+    'files.get_image_metadata',
+    'files.save_high_quality_image',
+)
+DEFAULT_SIZES = ('480x600', '1200x1500', '3000x4000')
+DEFAULT_FORMATS = ('JPEG', 'PNG', 'WEBP')
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp'}
+CORPUS_SEED = 2024
+# ترميز الصور الكبيرة بطيء (PNG بأبعاد 3000x4000 يستغرق ثواني) فتحفظ المجموعة بين التشغيلات
+DEFAULT_CORPUS_DIR = os.path.join(tempfile.gettempdir(), 'student-registration-image-corpus')
+
+
+def corpus_image(size, format, corpus_dir=DEFAULT_CORPUS_DIR):
+    """صورة المجموعة الثابتة لأبعاد وصيغة محددة (من الذاكرة المؤقتة على القرص إن وجدت)"""
+    path = os.path.join(corpus_dir, f'face-{CORPUS_SEED}-{size}.{EXTENSIONS[format]}')
+    if os.path.exists(path):
+        with open(path, 'rb') as handle:
+            return handle.read()
+
+    from benchmarks.synthetic_faces import face_photo
+    width, height = (int(value) for value in size.split('x'))
+    payload = face_photo(CORPUS_SEED, (width, height), format)
+    os.makedirs(corpus_dir, exist_ok=True)
+    with open(path + '.tmp', 'wb') as handle:
+        handle.write(payload)
+    os.replace(path + '.tmp', path)
+    return payload
+
+
+def face_recognition_available():
+    return all(importlib.util.find_spec(name) for name in ('face_recognition', 'cv2'))
+
+
+def _directory_size(path):
+    total = 0
+    for directory, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(directory, name)) for name in files)
+    return total
+
+
+def _proc_status_bytes(field):
+    try:
+        with open('/proc/self/status') as handle:
+            for line in handle:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak_rss():
+    """تصفير أقصى ذاكرة مقيمة (Linux 4+)، وإلا تعيد False"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as handle:
+            handle.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_bytes():
+    """أقصى ذاكرة مقيمة للعملية
+
+    VmHWM في Linux لأن ru_maxrss في العملية الابن يبدأ من ذاكرة الأب وقت fork.
+    """
+    peak = _proc_status_bytes('VmHWM')
+    if peak is not None:
+        return peak
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss بالكيلوبايت في Linux وبالبايت في macOS
+    return usage if sys.platform == 'darwin' else usage * 1024
+
+
+# ---------------------------------------------------------------- child
+
+def make_stage(stage, workdir):
+    """دالة تنفذ المرحلة على ملف واحد وتعيد True عند القبول"""
+    if stage.startswith('simple.'):
+        from app.services.simple_image_validator import SimpleImageValidator
+        validator = SimpleImageValidator()
+        if stage == 'simple.validate_image_basic':
+            return lambda file, iteration: validator.validate_image_basic(file)[0]
+        # مستخدم مختلف لكل تكرار حتى لا يرفض كصورة مكررة
+        return lambda file, iteration: validator.validate_person_image_simple(file, iteration, 'image1')[0]
+
+    if stage.startswith('face.'):
+        from app.services.face_recognition_service import FaceRecognitionService
+        service = FaceRecognitionService()
+        if stage == 'face.check_image_quality':
+            return lambda file, iteration: service.check_image_quality(file)[0]
+        if stage == 'face.detect_faces_in_image':
+            return lambda file, iteration: service.detect_faces_in_image(file)[0]
+        return lambda file, iteration: service.validate_person_image(file, iteration, 'image1')[0]
+
+    from app.services import files
+    if stage == 'files.get_image_metadata':
+        return lambda file, iteration: bool(files.get_image_metadata(file)['width'])
+
+    output_dir = os.path.join(workdir, 'saved')
+    os.makedirs(output_dir, exist_ok=True)
+
+    def save(file, iteration):
+        extension = file.filename.rsplit('.', 1)[1]
+        files.save_high_quality_image(file, os.path.join(output_dir, f'{iteration}.{extension}'))
+        return True
+    return save
+
+
+def run_case(stage, size, format, iterations, warmup, corpus_dir):
+    """قياس حالة واحدة في العملية الحالية"""
+    from werkzeug.datastructures import FileStorage
+    from app import create_app
+    from app.config import TestingConfig
+
+    workdir = tempfile.mkdtemp(prefix='bench-images-')
+
+    class BenchConfig(TestingConfig):
+        UPLOAD_FOLDER = workdir
+        METRICS_ENABLED = False
+
+    payload = corpus_image(size, format, corpus_dir)
+    filename = f'photo.{EXTENSIONS[format]}'
+    app = create_app(BenchConfig)
+    try:
+        with app.app_context():
+            run = make_stage(stage, workdir)
+            rss_before = _proc_status_bytes('VmRSS') if _reset_peak_rss() else _peak_rss_bytes()
+            for iteration in range(warmup):
+                run(FileStorage(io.BytesIO(payload), filename=filename), -1 - iteration)
+            written_before = _directory_size(workdir)
+
+            timings = []
+            accepted = 0
+            for iteration in range(iterations):
+                file = FileStorage(io.BytesIO(payload), filename=filename)
+                start = time.perf_counter()
+                accepted += bool(run(file, iteration))
+                timings.append(time.perf_counter() - start)
+            written = _directory_size(workdir) - written_before
+            rss_after = _peak_rss_bytes()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    ordered = sorted(timings)
+    return {
+        'median_ms': round(statistics.median(timings) * 1000, 3),
+        'min_ms': round(ordered[0] * 1000, 3),
+        'p95_ms': round(ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)] * 1000, 3),
+        'mean_ms': round(statistics.mean(timings) * 1000, 3),
+        'peak_rss_mb': round(rss_after / 1024 ** 2, 1) if rss_after else None,
+        'peak_rss_delta_mb': round(max(rss_after - rss_before, 0) / 1024 ** 2, 1) if rss_after else None,
+        'bytes_written': round(written / iterations),
+        'input_bytes': len(payload),
+        'accepted': accepted,
+        'iterations': iterations,
+    }
+
+
+# ---------------------------------------------------------------- parent
+
+def measure(stage, size, format, args):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--run-case', stage, size, format,
+         '--iterations', str(args.iterations), '--warmup', str(args.warmup), '--corpus-dir', args.corpus_dir],
+        cwd=ROOT, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        return {'error': completed.stderr.strip().splitlines()[-1] if completed.stderr else 'failed'}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def environment():
+    from PIL import __version__ as pillow_version
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'pillow': pillow_version,
+        'machine': platform.machine(),
+        'face_recognition': face_recognition_available(),
+    }
+
+
+def corpus_fingerprint(sizes, formats, corpus_dir):
+    """sha256 لكل صورة في المجموعة حتى يتأكد أن المقارنة على نفس المدخلات"""
+    return {f'{size}/{format}': hashlib.sha256(corpus_image(size, format, corpus_dir)).hexdigest()[:16]
+            for size in sizes for format in formats}
+
+
+def print_table(cases, baseline=None):
+    print(f'{"stage":<32}{"size":>11}{"fmt":>6}{"median":>10}{"p95":>10}{"rss +MB":>9}'
+          f'{"written":>10}{"ok":>5}' + ('   vs base' if baseline else ''))
+    for key, result in cases.items():
+        stage, size, format = key.split('|')
+        if 'error' in result or 'skipped' in result:
+            print(f'{stage:<32}{size:>11}{format:>6}  {result.get("skipped") or result.get("error")}')
+            continue
+        line = (f'{stage:<32}{size:>11}{format:>6}{result["median_ms"]:>10.2f}{result["p95_ms"]:>10.2f}'
+                f'{result["peak_rss_delta_mb"]!s:>9}{result["bytes_written"]:>10}'
+                f'{result["accepted"]:>3}/{result["iterations"]}')
+        old = (baseline or {}).get(key)
+        if old and old.get('median_ms'):
+            line += f'   {(result["median_ms"] / old["median_ms"] - 1) * 100:+7.1f}%'
+        print(line)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='قياس أداء مراحل فحص الصور الشخصية')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES)
+    parser.add_argument('--sizes', nargs='+', default=DEFAULT_SIZES, help='أبعاد بصيغة WIDTHxHEIGHT')
+    parser.add_argument('--formats', nargs='+', choices=tuple(EXTENSIONS), default=DEFAULT_FORMATS)
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--output', help='حفظ النتائج بصيغة JSON (للمقارنة بين commits)')
+    parser.add_argument('--compare', help='ملف JSON سابق لعرض الفرق في الوسيط')
+    parser.add_argument('--corpus-dir', default=DEFAULT_CORPUS_DIR, help='مجلد صور المجموعة المولدة')
+    parser.add_argument('--run-case', nargs=3, metavar=('STAGE', 'SIZE', 'FORMAT'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        print(json.dumps(run_case(*args.run_case, args.iterations, args.warmup, args.corpus_dir)))
+        return 0
+
+    # توليد المجموعة مرة واحدة قبل تشغيل الحالات
+    corpus = corpus_fingerprint(args.sizes, args.formats, args.corpus_dir)
+    face_available = face_recognition_available()
+    cases = {}
+    for stage in args.stages:
+        for size in args.sizes:
+            for format in args.formats:
+                key = f'{stage}|{size}|{format}'
+                if stage.startswith('face.') and not face_available:
+                    cases[key] = {'skipped': 'face_recognition not installed'}
+                    continue
+                cases[key] = measure(stage, size, format, args)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as handle:
+            previous = json.load(handle)
+        baseline = previous['cases']
+        if any(previous.get('corpus', {}).get(name) != digest for name, digest in corpus.items()):
+            print('warning: corpus differs from the compared run')
+    print_table(cases, baseline)
+
+    if args.output:
+        result = {
+            'environment': environment(),
+            'settings': {'iterations': args.iterations, 'warmup': args.warmup},
+            'corpus': corpus,
+            'cases': cases,
+        }
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            json.dump(result, handle, indent=2, sort_keys=True)
+        print(f'results saved: {args.output}')
+    return 1 if any('error' in result for result in cases.values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
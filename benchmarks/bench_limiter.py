@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+قياس كلفة Flask-Limiter لكل طلب على auth.login و auth.register حسب نوع التخزين
+
+الاستخدام:
+    python benchmarks/bench_limiter.py --requests 2000
+    python benchmarks/bench_limiter.py --redis-uri redis://localhost:6379
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.config import TestingConfig
+
+ENDPOINTS = ['/auth/login', '/auth/register']
+
+
+def make_config(enabled, storage_uri, storage_options=None, strategy='fixed-window'):
+    class BenchConfig(TestingConfig):
+        RATELIMIT_ENABLED = enabled
+        RATELIMIT_STORAGE_URI = storage_uri
+        RATELIMIT_STORAGE_OPTIONS = storage_options or {}
+        RATELIMIT_STRATEGY = strategy
+    return BenchConfig
+
+
+def run(label, config, requests_count):
+    app = create_app(config)
+    client = app.test_client()
+    results = {}
+    for path in ENDPOINTS:
+        # عنوان مختلف لكل طلب حتى لا يصل أي عنوان إلى الحد ويعود 429
+        client.get(path, environ_base={'REMOTE_ADDR': '10.255.255.255'})
+        start = time.perf_counter()
+        for i in range(requests_count):
+            address = f'10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}'
+            response = client.get(path, environ_base={'REMOTE_ADDR': address})
+            assert response.status_code == 200, response.status_code
+        results[path] = (time.perf_counter() - start) / requests_count * 1e6
+    print(f'{label:<22}' + ''.join(f'{results[path]:>24.1f}' for path in ENDPOINTS))
+    return results
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='قياس كلفة محدد معدل الطلبات')
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--redis-uri', help='قياس تخزين Redis أيضاً (مثال: redis://localhost:6379)')
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'ratelimit.db')
+    scenarios = [
+        ('disabled', make_config(False, 'memory://')),
+        ('memory fixed', make_config(True, 'memory://')),
+        ('memory moving', make_config(True, 'memory://', strategy='moving-window')),
+        ('sqldb (sqlite)', make_config(True, 'sqldb://', {'url': f'sqlite:///{db_path}'})),
+    ]
+    if args.redis_uri:
+        scenarios.append(('redis fixed', make_config(True, args.redis_uri)))
+        scenarios.append(('redis moving', make_config(True, args.redis_uri, strategy='moving-window')))
+
+    print(f'{"storage":<22}' + ''.join(f'{path + " us/req":>24}' for path in ENDPOINTS))
+    baseline = None
+    for label, config in scenarios:
+        results = run(label, config, args.requests)
+        if baseline is None:
+            baseline = results
+        else:
+            overhead = sum(results[p] - baseline[p] for p in ENDPOINTS) / len(ENDPOINTS)
+            print(f'{"":<22}overhead: {overhead:+.1f} us/req')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+قياس زمن ومعالج تشفير كلمات المرور لاختيار الكلفة المناسبة
+
+يقيس لكل إعداد: زمن التشفير والتحقق (p50/p95) وزمن المعالج لكل عملية،
+ثم زمن طلب auth.login كاملاً بالإعدادات المختارة ومقارنته بالميزانية.
+
+الاستخدام:
+    python benchmarks/bench_password_hash.py --iterations 20 --budget-ms 250
+"""
+
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.passwords import BCRYPT_AVAILABLE, hash_password, verify_password
+
+PASSWORD = 'Sample-Passw0rd'
+
+CANDIDATES = [
+    ('scrypt N=16384', {'PASSWORD_HASH_METHOD': 'scrypt', 'PASSWORD_SCRYPT_N': 16384}),
+    ('scrypt N=32768', {'PASSWORD_HASH_METHOD': 'scrypt', 'PASSWORD_SCRYPT_N': 32768}),
+    ('pbkdf2 260k', {'PASSWORD_HASH_METHOD': 'pbkdf2', 'PASSWORD_PBKDF2_ITERATIONS': 260000}),
+    ('pbkdf2 600k', {'PASSWORD_HASH_METHOD': 'pbkdf2', 'PASSWORD_PBKDF2_ITERATIONS': 600000}),
+]
+if BCRYPT_AVAILABLE:
+    CANDIDATES += [
+        ('bcrypt 10', {'PASSWORD_HASH_METHOD': 'bcrypt', 'PASSWORD_BCRYPT_ROUNDS': 10}),
+        ('bcrypt 12', {'PASSWORD_HASH_METHOD': 'bcrypt', 'PASSWORD_BCRYPT_ROUNDS': 12}),
+    ]
+
+
+def measure(func, iterations):
+    """زمن التنفيذ وزمن المعالج لكل عملية بالمللي ثانية"""
+    wall, cpu = [], []
+    for _ in range(iterations):
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        func()
+        cpu.append((time.process_time() - cpu_start) * 1000)
+        wall.append((time.perf_counter() - wall_start) * 1000)
+    wall.sort()
+    return statistics.median(wall), wall[int(len(wall) * 0.95) - 1], statistics.mean(cpu)
+
+
+def bench_hashes(iterations, budget_ms):
+    print(f'{"settings":<16}{"hash p50":>10}{"hash p95":>10}{"verify p50":>12}{"verify p95":>12}{"cpu/op":>10}')
+    for label, settings in CANDIDATES:
+        stored = hash_password(PASSWORD, settings)
+        h50, h95, _ = measure(lambda: hash_password(PASSWORD, settings), iterations)
+        v50, v95, cpu = measure(lambda: verify_password(stored, PASSWORD), iterations)
+        flag = '' if v95 <= budget_ms else '  > budget'
+        print(f'{label:<16}{h50:>10.1f}{h95:>10.1f}{v50:>12.1f}{v95:>12.1f}{cpu:>10.1f}{flag}')
+
+
+def bench_login(iterations, budget_ms):
+    """زمن طلب تسجيل الدخول كاملاً بالإعدادات الحالية (متغيرات البيئة)"""
+    from app import create_app
+    from app.config import TestingConfig
+    from app.extensions import db
+    from app.models import User
+
+    class BenchConfig(TestingConfig):
+        RATELIMIT_ENABLED = False
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        user = User(phone='+967771234567', is_phone_verified=True)
+        user.set_password(PASSWORD)
+        db.session.add(user)
+        db.session.commit()
+
+    def login():
+        client = app.test_client()
+        response = client.post('/auth/login', data={'phone': '771234567', 'password': PASSWORD})
+        assert response.status_code == 302, response.status_code
+
+    p50, p95, cpu = measure(login, iterations)
+    status = 'ضمن الميزانية' if p95 <= budget_ms else 'تتجاوز الميزانية'
+    print(f'\nauth.login ({BenchConfig.PASSWORD_HASH_METHOD}): p50 {p50:.1f}ms  p95 {p95:.1f}ms  '
+          f'cpu {cpu:.1f}ms  -> {status} ({budget_ms}ms)')
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='قياس كلفة تشفير كلمات المرور')
+    parser.add_argument('--iterations', type=int, default=10)
+    parser.add_argument('--budget-ms', type=float, default=250)
+    parser.add_argument('--skip-login', action='store_true', help='قياس التشفير فقط بدون طلب الدخول')
+    args = parser.parse_args()
+
+    bench_hashes(args.iterations, args.budget_ms)
+    if not args.skip_login:
+        bench_login(args.iterations, args.budget_ms)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+قياس سرعة توحيد أرقام الجوال: سلسلة replace السابقة مقابل app.services.phone
+
+الاستخدام:
+    python benchmarks/bench_phone.py --numbers 20000 --repeat 5
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import phone
+
+
+def legacy_normalize(value):
+    """المنطق المكرر سابقاً في النماذج ومسار التسجيل"""
+    clean_phone = value.strip().replace(' ', '').replace('-', '')
+    if clean_phone.startswith('+967'):
+        clean_phone = clean_phone[4:]
+    elif clean_phone.startswith('967'):
+        clean_phone = clean_phone[3:]
+    elif clean_phone.startswith('00967'):
+        clean_phone = clean_phone[5:]
+    if clean_phone.startswith('7') and len(clean_phone) == 9 and clean_phone.isdigit():
+        return '+967' + clean_phone
+    return None
+
+
+def make_inputs(count, distinct):
+    """مدخلات واقعية: نفس الأرقام تتكرر (دخول متكرر وإعادة إرسال النماذج)"""
+    rng = random.Random(7)
+    pool = []
+    for _ in range(distinct):
+        local = '7' + ''.join(rng.choice('0123456789') for _ in range(8))
+        prefix = rng.choice(['', '+967', '967', '00967'])
+        pool.append(prefix + (local if rng.random() < 0.7 else f'{local[:3]} {local[3:6]} {local[6:]}'))
+    return [rng.choice(pool) for _ in range(count)]
+
+
+def bench(label, func, inputs, repeat, before=None):
+    best = float('inf')
+    for _ in range(repeat):
+        if before:
+            before()
+        start = time.perf_counter()
+        for value in inputs:
+            func(value)
+        best = min(best, time.perf_counter() - start)
+    print(f'{label:<28}{best / len(inputs) * 1e9:>10.0f} ns/call')
+    return best
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='قياس سرعة توحيد أرقام الجوال')
+    parser.add_argument('--numbers', type=int, default=20000)
+    parser.add_argument('--distinct', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    inputs = make_inputs(args.numbers, args.distinct)
+    for value in inputs:
+        assert legacy_normalize(value) == phone.normalize_phone_or_none(value), value
+
+    legacy = bench('legacy replace chain', legacy_normalize, inputs, args.repeat)
+    uncached = bench('regex (no cache)', phone._parse.__wrapped__, inputs, args.repeat)
+    cached = bench('regex + lru_cache', phone.normalize_phone_or_none, inputs, args.repeat,
+                   before=phone._parse.cache_clear)
+    print(f'\nspeedup vs legacy: no cache {legacy / uncached:.2f}x, cached {legacy / cached:.2f}x')
+    print(phone._parse.cache_info())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+قياس كلفة الجلسة لكل طلب حسب SESSION_BACKEND
+
+يقيس ثلاث حالات: زائر بدون كوكي، ملف ثابت مع كوكي جلسة (لا يلمس الجلسة)،
+ومستخدم مسجل (تحميل الجلسة والمستخدم في كل طلب).
+
+الاستخدام:
+    python benchmarks/bench_sessions.py --requests 2000
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.config import TestingConfig
+from app.extensions import db
+from app.models import User
+
+PASSWORD = 'Sample-Passw0rd'
+BACKENDS = ['cookie', 'memory', 'sql']
+
+
+def make_app(backend):
+    db_path = os.path.join(tempfile.mkdtemp(), 'sessions.db')
+
+    class BenchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{db_path}'
+        RATELIMIT_ENABLED = False
+        SESSION_BACKEND = backend
+        PASSWORD_EXECUTOR = 'inline'
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        user = User(phone='+967771234567', is_phone_verified=True)
+        user.set_password(PASSWORD)
+        db.session.add(user)
+        db.session.commit()
+    return app
+
+
+def timed(client, path, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        client.get(path)
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def run(backend, count):
+    app = make_app(backend)
+    static_path = '/static/css/style.css'
+
+    anonymous = app.test_client()
+    results = [timed(anonymous, '/', count)]
+
+    user_client = app.test_client()
+    user_client.post('/auth/login', data={'phone': '771234567', 'password': PASSWORD})
+    results.append(timed(user_client, static_path, count))
+    results.append(timed(user_client, '/', count))
+    print(f'{backend:<10}' + ''.join(f'{value:>16.1f}' for value in results))
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='قياس كلفة تخزين الجلسات')
+    parser.add_argument('--requests', type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f'{"backend":<10}{"anonymous /":>16}{"static+cookie":>16}{"logged-in /":>16}  (us/req)')
+    for backend in BACKENDS:
+        run(backend, args.requests)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+قياس زمن البدء البارد للتطبيق (استيراد app + create_app) في عمليات جديدة
+
+كل تشغيل عملية Python مستقلة، ويطبع الوسيط وتفصيل المراحل من
+app.extensions['startup_profile']. يقارن الوسيط بخط أساس محفوظ ويخرج بالرمز 1
+إذا زاد عنه بأكثر من النسبة المسموحة، وبالرمز 2 إذا لم يوجد خط أساس (يعتمد
+على الجهاز لذا لا يحفظ في المستودع).
+
+الاستخدام:
+    python benchmarks/bench_startup.py --runs 7 --save-baseline   # تسجيل خط الأساس
+    python benchmarks/bench_startup.py --runs 7 --tolerance 0.2    # فحص التراجع
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'startup_baseline.json')
+
+CHILD = r'''
+import json, time
+start = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app(%r)
+done = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'create_app_ms': (done - imported) * 1000,
+    'total_ms': (done - start) * 1000,
+    'phases_ms': app.extensions['startup_profile']['phases_ms'],
+}))
+'''
+
+
+def run_once(config_name):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD % config_name],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='قياس زمن بدء التطبيق')
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--config', default='production')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='الزيادة المسموحة على خط الأساس (0.25 = 25%%)')
+    parser.add_argument('--save-baseline', action='store_true')
+    args = parser.parse_args()
+
+    if not args.save_baseline and not os.path.exists(args.baseline):
+        print(f'no baseline at {args.baseline}, run with --save-baseline first')
+        return 2
+
+    samples = [run_once(args.config) for _ in range(args.runs)]
+    median = {key: statistics.median(s[key] for s in samples)
+              for key in ('import_ms', 'create_app_ms', 'total_ms')}
+    phases = {name: statistics.median(s['phases_ms'].get(name, 0.0) for s in samples)
+              for name in samples[0]['phases_ms']}
+
+    print(f'runs={args.runs} config={args.config}')
+    for key, value in median.items():
+        print(f'  {key:<22}{value:>10.1f} ms')
+    for name, value in phases.items():
+        print(f'    {name:<20}{value:>10.1f} ms')
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as handle:
+            json.dump({'total_ms': median['total_ms'], 'phases_ms': phases}, handle, indent=2)
+        print(f'baseline saved: {args.baseline}')
+        return 0
+
+    with open(args.baseline) as handle:
+        baseline = json.load(handle)
+    limit = baseline['total_ms'] * (1 + args.tolerance)
+    print(f'baseline {baseline["total_ms"]:.1f} ms, limit {limit:.1f} ms')
+    if median['total_ms'] > limit:
+        print('FAIL: cold start regressed')
+        return 1
+    print('OK')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
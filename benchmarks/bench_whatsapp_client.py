@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+قياس إنتاجية إرسال رسائل WhatsApp: requests.post المباشر مقابل العميل المجمع
+
+الاستخدام:
+    python benchmarks/bench_whatsapp_client.py --messages 500 --threads 4 --latency-ms 5
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+from benchmarks.fake_whatsapp_server import FakeWhatsAppServer
+from app.services.http_client import PooledHTTPClient
+
+MESSAGE = {
+    'messaging_product': 'whatsapp',
+    'to': '967771234567',
+    'type': 'text',
+    'text': {'body': 'رمز التحقق الخاص بك: 123456'},
+}
+
+
+def bare_send(url):
+    response = requests.post(url, json=MESSAGE, timeout=30)
+    return response.status_code == 200
+
+
+def run(label, send, url, messages, threads):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(lambda _: send(url), range(messages)))
+    elapsed = time.perf_counter() - start
+    ok = sum(results)
+    print(f'{label:<10} {ok}/{messages} ok  {elapsed:7.3f}s  {messages / elapsed:9.1f} msg/s')
+    return messages / elapsed
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='قياس إنتاجية عميل WhatsApp')
+    parser.add_argument('--messages', type=int, default=500)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--latency-ms', type=int, default=0)
+    args = parser.parse_args()
+
+    server = FakeWhatsAppServer(latency_ms=args.latency_ms).start_background()
+    url = f'{server.url}/000000/messages'
+    client = PooledHTTPClient('bench', pool_maxsize=args.threads)
+
+    bare = run('bare', bare_send, url, args.messages, args.threads)
+    pooled = run('pooled', lambda u: client.post(u, json=MESSAGE).status_code == 200,
+                 url, args.messages, args.threads)
+    print(f'speedup: {pooled / bare:.2f}x')
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+خادم WhatsApp Business API وهمي للاختبار المحلي وقياس الأداء
+
+يستجيب لـ POST /<phone_number_id>/messages و GET /<phone_number_id>
+بنفس شكل استجابات Graph API. يدعم keep-alive (HTTP/1.1).
+
+الاستخدام:
+    python benchmarks/fake_whatsapp_server.py --port 8089 --latency-ms 20
+    WHATSAPP_API_URL=http://127.0.0.1:8089 WHATSAPP_ENABLED=true python run.py
+"""
+
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeWhatsAppHandler(BaseHTTPRequestHandler):
+    """معالج طلبات Graph API الوهمي"""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _respond(self, status, body):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _simulate(self):
+        server = self.server
+        with server.lock:
+            server.request_count += 1
+        if server.latency:
+            time.sleep(server.latency)
+        return server.fail_status
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = json.loads(self.rfile.read(length) or b'{}')
+        fail_status = self._simulate()
+        if fail_status:
+            self._respond(fail_status, {'error': {'message': 'simulated failure'}})
+            return
+        with self.server.lock:
+            self.server.messages.append(body)
+        self._respond(200, {
+            'messaging_product': 'whatsapp',
+            'contacts': [{'input': body.get('to'), 'wa_id': body.get('to')}],
+            'messages': [{'id': f'wamid.{uuid.uuid4().hex}'}],
+        })
+
+    def do_GET(self):
+        fail_status = self._simulate()
+        if fail_status:
+            self._respond(fail_status, {'error': {'message': 'simulated failure'}})
+            return
+        self._respond(200, {'display_phone_number': '+967 700 000 000', 'verified_name': 'Fake WhatsApp'})
+
+
+class FakeWhatsAppServer(ThreadingHTTPServer):
+    """خادم وهمي يحتفظ بالرسائل المستلمة"""
+
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency_ms=0, fail_status=None):
+        super().__init__((host, port), FakeWhatsAppHandler)
+        self.latency = latency_ms / 1000
+        self.fail_status = fail_status
+        self.lock = threading.Lock()
+        self.messages = []
+        self.request_count = 0
+
+    @property
+    def url(self):
+        return f'http://{self.server_address[0]}:{self.server_address[1]}'
+
+    def start_background(self):
+        """تشغيل الخادم في خيط خلفي"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='خادم WhatsApp Business API وهمي')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency-ms', type=int, default=0, help='تأخير مصطنع لكل طلب')
+    parser.add_argument('--fail-status', type=int, default=None, help='إرجاع هذا الرمز لكل الطلبات')
+    args = parser.parse_args()
+
+    server = FakeWhatsAppServer(port=args.port, latency_ms=args.latency_ms, fail_status=args.fail_status)
+    print(f'Fake WhatsApp API listening on {server.url}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
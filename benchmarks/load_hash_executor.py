@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+اختبار حمل: زمن استجابة الصفحات العادية أثناء إغراق تسجيل الدخول
+
+يشغل التطبيق على خادم محلي متعدد الخيوط، ويرسل طلبات دخول متزامنة
+باستمرار مع قياس زمن الصفحة الرئيسية، مرة بالتشفير في خيط الطلب (inline)
+ومرة عبر مجمع التشفير المحدود.
+
+الاستخدام:
+    python benchmarks/load_hash_executor.py --login-threads 8 --duration 10
+"""
+
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+from werkzeug.serving import make_server
+from app import create_app
+from app.config import TestingConfig
+from app.extensions import db
+from app.models import User
+
+PASSWORD = 'Sample-Passw0rd'
+
+
+def make_config(mode, workers, db_path):
+    class LoadConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{db_path}'
+        RATELIMIT_ENABLED = False
+        PASSWORD_EXECUTOR = mode
+        PASSWORD_EXECUTOR_WORKERS = workers
+    return LoadConfig
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def run(mode, workers, login_threads, page_threads, duration):
+    db_path = os.path.join(tempfile.mkdtemp(), 'load.db')
+    app = create_app(make_config(mode, workers, db_path))
+    with app.app_context():
+        db.create_all()
+        user = User(phone='+967771234567', is_phone_verified=True)
+        user.set_password(PASSWORD)
+        db.session.add(user)
+        db.session.commit()
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+
+    stop = threading.Event()
+    page_latencies, login_latencies = [], []
+
+    def login_loop():
+        while not stop.is_set():
+            start = time.perf_counter()
+            requests.post(f'{base_url}/auth/login', data={'phone': '771234567', 'password': PASSWORD},
+                          allow_redirects=False)
+            login_latencies.append(time.perf_counter() - start)
+
+    def page_loop():
+        session = requests.Session()
+        while not stop.is_set():
+            start = time.perf_counter()
+            session.get(f'{base_url}/')
+            page_latencies.append(time.perf_counter() - start)
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=login_loop) for _ in range(login_threads)]
+    threads += [threading.Thread(target=page_loop) for _ in range(page_threads)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    server.shutdown()
+
+    label = mode if mode == 'inline' else f'{mode} x{workers}'
+    print(f'{label:<12}'
+          f'{statistics.median(page_latencies) * 1000:>10.1f}'
+          f'{percentile(page_latencies, 0.99) * 1000:>10.1f}'
+          f'{statistics.median(login_latencies) * 1000:>12.1f}'
+          f'{len(login_latencies) / duration:>12.1f}')
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='اختبار حمل مجمع تشفير كلمات المرور')
+    parser.add_argument('--login-threads', type=int, default=8)
+    parser.add_argument('--page-threads', type=int, default=2)
+    parser.add_argument('--workers', type=int, default=1, help='عدد عمال مجمع التشفير')
+    parser.add_argument('--duration', type=float, default=10)
+    args = parser.parse_args()
+
+    print(f'{"executor":<12}{"page p50":>10}{"page p99":>10}{"login p50":>12}{"logins/s":>12}  (ms)')
+    run('inline', args.workers, args.login_threads, args.page_threads, args.duration)
+    run('thread', args.workers, args.login_threads, args.page_threads, args.duration)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+صور شخصية اصطناعية لقياس الأداء
+
+وجه مرسوم (رأس وعينان وحاجبان وفم) على خلفية متدرجة مع ضجيج، بإضاءة وتباين
+يقبلهما فاحص الجودة. نفس البذرة تعطي نفس البايتات دائماً، وبذور مختلفة تعطي
+صوراً مختلفة (hash مختلف).
+"""
+
+import io
+import random
+from PIL import Image, ImageDraw, ImageFilter
+
+SKIN_TONES = ((224, 172, 105), (198, 134, 66), (141, 85, 36), (241, 194, 125), (255, 219, 172))
+
+
+def face_image(seed, size=(600, 750)):
+    """صورة وجه اصطناعية كـ PIL.Image بوضع RGB"""
+    rng = random.Random(seed)
+    width, height = size
+    top = tuple(rng.randint(90, 200) for _ in range(3))
+    bottom = tuple(max(channel - 60, 20) for channel in top)
+
+    # خلفية متدرجة عمودياً
+    gradient = Image.linear_gradient('L').resize(size)
+    image = Image.composite(Image.new('RGB', size, bottom), Image.new('RGB', size, top), gradient)
+    draw = ImageDraw.Draw(image)
+
+    skin = rng.choice(SKIN_TONES)
+    cx, cy = width / 2 + rng.uniform(-0.03, 0.03) * width, height * 0.45
+    face_w, face_h = width * rng.uniform(0.26, 0.32), height * rng.uniform(0.28, 0.33)
+    draw.rectangle((cx - face_w * 0.35, cy + face_h * 0.8, cx + face_w * 0.35, height), fill=skin)
+    draw.ellipse((cx - face_w * 1.6, cy + face_h * 1.2, cx + face_w * 1.6, height * 1.4),
+                 fill=tuple(rng.randint(20, 120) for _ in range(3)))
+    draw.ellipse((cx - face_w, cy - face_h, cx + face_w, cy + face_h), fill=skin)
+    draw.chord((cx - face_w * 1.05, cy - face_h * 1.15, cx + face_w * 1.05, cy + face_h * 0.2),
+               180, 360, fill=(rng.randint(10, 60),) * 3)
+
+    eye_y = cy - face_h * 0.1
+    eye_r = face_w * 0.12
+    for side in (-1, 1):
+        ex = cx + side * face_w * 0.4
+        draw.ellipse((ex - eye_r * 1.4, eye_y - eye_r, ex + eye_r * 1.4, eye_y + eye_r), fill=(245, 245, 245))
+        draw.ellipse((ex - eye_r * 0.6, eye_y - eye_r * 0.6, ex + eye_r * 0.6, eye_y + eye_r * 0.6),
+                     fill=(rng.randint(30, 90), rng.randint(20, 60), 10))
+        draw.line((ex - eye_r * 1.6, eye_y - eye_r * 2, ex + eye_r * 1.6, eye_y - eye_r * 2.2),
+                  fill=(40, 30, 20), width=max(int(eye_r * 0.5), 2))
+    shade = tuple(int(channel * 0.8) for channel in skin)
+    draw.line((cx, eye_y + eye_r, cx - eye_r * 0.6, cy + face_h * 0.3), fill=shade, width=max(int(eye_r * 0.3), 2))
+    draw.arc((cx - face_w * 0.35, cy + face_h * 0.3, cx + face_w * 0.35, cy + face_h * 0.65),
+             20, 160, fill=(150, 60, 60), width=max(int(eye_r * 0.4), 2))
+
+    # ضجيج خفيف حتى تختلف الصور ولا تبدو مسطحة للفاحص
+    noise = Image.frombytes('L', size, rng.randbytes(width * height)).convert('RGB')
+    image = Image.blend(image, noise, 0.06)
+    return image.filter(ImageFilter.GaussianBlur(0.6))
+
+
+def face_photo(seed, size=(600, 750), format='JPEG', quality=90):
+    """صورة وجه اصطناعية مرمزة
+
+    Returns:
+        bytes: محتوى الملف بالصيغة المطلوبة (JPEG أو PNG أو WEBP ...)
+    """
+    image = face_image(seed, size)
+    buffer = io.BytesIO()
+    options = {'quality': quality} if format.upper() in ('JPEG', 'WEBP') else {}
+    image.save(buffer, format, **options)
+    return buffer.getvalue()
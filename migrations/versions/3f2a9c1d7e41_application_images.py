@@ -0,0 +1,68 @@
+"""نقل الصور الشخصية من أعمدة image1_path..image5_path إلى جدول application_images
+
+Revision ID: 3f2a9c1d7e41
+Revises: 
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f2a9c1d7e41'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+IMAGE_POSITIONS = range(1, 6)
+
+
+def upgrade():
+    op.create_table(
+        'application_images',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('application_id', sa.Integer(), nullable=False),
+        sa.Column('position', sa.SmallInteger(), nullable=False),
+        sa.Column('file_path', sa.String(length=500), nullable=False),
+        sa.Column('file_hash', sa.String(length=64), nullable=True),
+        sa.Column('width', sa.Integer(), nullable=True),
+        sa.Column('height', sa.Integer(), nullable=True),
+        sa.Column('file_size', sa.Integer(), nullable=True),
+        sa.Column('face_encoding_id', sa.String(length=64), nullable=True),
+        sa.Column('thumbnail_path', sa.String(length=500), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['application_id'], ['applications.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('application_id', 'position', name='uq_app_image_position'),
+    )
+    op.create_index('idx_app_image_hash', 'application_images', ['file_hash'], unique=False)
+
+    # نسخ المسارات الموجودة - استعلام INSERT ... SELECT واحد لكل موضع
+    for position in IMAGE_POSITIONS:
+        op.execute(
+            f"INSERT INTO application_images (application_id, position, file_path, created_at) "
+            f"SELECT id, {position}, image{position}_path, created_at FROM applications "
+            f"WHERE image{position}_path IS NOT NULL AND image{position}_path <> ''"
+        )
+
+    with op.batch_alter_table('applications') as batch_op:
+        for position in IMAGE_POSITIONS:
+            batch_op.drop_column(f'image{position}_path')
+
+
+def downgrade():
+    with op.batch_alter_table('applications') as batch_op:
+        for position in IMAGE_POSITIONS:
+            batch_op.add_column(sa.Column(f'image{position}_path', sa.String(length=500), nullable=True))
+
+    for position in IMAGE_POSITIONS:
+        op.execute(
+            f"UPDATE applications SET image{position}_path = ("
+            f"SELECT file_path FROM application_images "
+            f"WHERE application_images.application_id = applications.id "
+            f"AND application_images.position = {position})"
+        )
+
+    op.drop_index('idx_app_image_hash', table_name='application_images')
+    op.drop_table('application_images')
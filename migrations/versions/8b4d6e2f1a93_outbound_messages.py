@@ -0,0 +1,40 @@
+"""طابور رسائل التحقق الصادرة outbound_messages
+
+Revision ID: 8b4d6e2f1a93
+Revises: 3f2a9c1d7e41
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b4d6e2f1a93'
+down_revision = '3f2a9c1d7e41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'outbound_messages',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=30), nullable=False),
+        sa.Column('phone', sa.String(length=20), nullable=False),
+        sa.Column('payload', sa.String(length=100), nullable=True),
+        sa.Column('status', sa.Enum('pending', 'sending', 'sent', 'dead', name='message_status'), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+        sa.Column('locked_at', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.String(length=255), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('sent_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('idx_outbound_status_next', 'outbound_messages', ['status', 'next_attempt_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('idx_outbound_status_next', table_name='outbound_messages')
+    op.drop_table('outbound_messages')
@@ -0,0 +1,24 @@
+"""فهرس قائمة طلبات المستخدم idx_app_user_created (ترقيم keyset في paginate_listing)
+
+Revision ID: a91c3e5f7b20
+Revises: e2b7c9d1f3a6
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a91c3e5f7b20'
+down_revision = 'e2b7c9d1f3a6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('idx_app_user_created', 'applications', ['user_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('idx_app_user_created', table_name='applications')
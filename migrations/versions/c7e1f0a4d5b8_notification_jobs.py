@@ -0,0 +1,55 @@
+"""مهام الإشعارات الجماعية notification_jobs و notification_deliveries
+
+Revision ID: c7e1f0a4d5b8
+Revises: 8b4d6e2f1a93
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7e1f0a4d5b8'
+down_revision = '8b4d6e2f1a93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'notification_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=200), nullable=False),
+        sa.Column('template', sa.Text(), nullable=False),
+        sa.Column('filters', sa.Text(), nullable=True),
+        sa.Column('status', sa.Enum('pending', 'running', 'completed', 'failed',
+                                    name='notification_job_status'), nullable=False),
+        sa.Column('last_application_id', sa.Integer(), nullable=False),
+        sa.Column('sent_count', sa.Integer(), nullable=False),
+        sa.Column('failed_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_table(
+        'notification_deliveries',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('job_id', sa.Integer(), nullable=False),
+        sa.Column('application_id', sa.Integer(), nullable=False),
+        sa.Column('phone', sa.String(length=20), nullable=False),
+        sa.Column('status', sa.Enum('sending', 'sent', 'failed',
+                                    name='notification_delivery_status'), nullable=False),
+        sa.Column('error', sa.String(length=255), nullable=True),
+        sa.Column('sent_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['job_id'], ['notification_jobs.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('job_id', 'phone', name='uq_notification_job_phone'),
+    )
+    op.create_index('idx_notification_job_status', 'notification_deliveries', ['job_id', 'status'], unique=False)
+
+
+def downgrade():
+    op.drop_index('idx_notification_job_status', table_name='notification_deliveries')
+    op.drop_table('notification_deliveries')
+    op.drop_table('notification_jobs')
@@ -0,0 +1,59 @@
+"""رموز التحقق في جدول verification_codes منفصل عن users
+
+Revision ID: d4a8b2c6e9f1
+Revises: c7e1f0a4d5b8
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4a8b2c6e9f1'
+down_revision = 'c7e1f0a4d5b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'verification_codes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('code_hash', sa.String(length=64), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id'),
+    )
+    op.create_index('ix_verification_codes_expires_at', 'verification_codes', ['expires_at'], unique=False)
+
+    # الرموز القديمة مخزنة كنص فلا تنقل، لكن تنقل صلاحيتها حتى يبقى حذف
+    # الحسابات غير المؤكدة منتهية الصلاحية صحيحاً. الرمز الفارغ لا يطابق أي إدخال
+    # فيطلب المستخدم رمزاً جديداً.
+    op.execute(
+        "INSERT INTO verification_codes (user_id, code_hash, attempts, expires_at, created_at) "
+        "SELECT id, '', 0, verification_expires, CURRENT_TIMESTAMP FROM users "
+        "WHERE NOT is_phone_verified AND verification_expires IS NOT NULL"
+    )
+
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('verification_code')
+        batch_op.drop_column('verification_expires')
+
+
+def downgrade():
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('verification_code', sa.String(length=10), nullable=True))
+        batch_op.add_column(sa.Column('verification_expires', sa.DateTime(), nullable=True))
+
+    op.execute(
+        "UPDATE users SET verification_expires = ("
+        "SELECT expires_at FROM verification_codes WHERE verification_codes.user_id = users.id)"
+    )
+
+    op.drop_index('ix_verification_codes_expires_at', table_name='verification_codes')
+    op.drop_table('verification_codes')
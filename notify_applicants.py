@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+أداة إرسال الإشعارات الجماعية للمتقدمين عبر WhatsApp
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from app.extensions import db
+from app.models import NotificationJob
+from app.services.bulk_notifications import (
+    create_job, run_job, retry_failed, build_recipient_query, preview_messages, FILTER_FIELDS, TEMPLATE_FIELDS
+)
+
+
+def preview_notifications(args):
+    """عرض الرسائل في الكونسول بدون إنشاء مهمة أو تسجيل أي إرسال
+
+    لا يكتب شيئاً في قاعدة البيانات، فالمهمة الحقيقية اللاحقة ترسل لجميع الأرقام.
+    """
+    app = create_app()
+
+    with app.app_context():
+        filters = {name: getattr(args, name) for name in FILTER_FIELDS if getattr(args, name)}
+        count = 0
+        for phone_number, text in preview_messages(args.template, filters, chunk_size=args.chunk_size):
+            print(f"📱 {phone_number}: {text}")
+            count += 1
+        print("="*60)
+        print(f"👀 تجربة فقط: {count} رسالة لم ترسل ولم تسجل")
+
+
+def send_notifications(args):
+    """إنشاء مهمة جديدة أو استئناف مهمة سابقة وتنفيذها"""
+    app = create_app()
+
+    with app.app_context():
+        if not app.config.get('WHATSAPP_ENABLED'):
+            print("❌ WhatsApp غير مفعل. استخدم --dry-run للتجربة أو فعّل WHATSAPP_ENABLED")
+            return
+
+        if args.resume:
+            job = db.session.get(NotificationJob, args.resume)
+            if not job:
+                print(f"❌ المهمة {args.resume} غير موجودة")
+                return
+            print(f"🔄 استئناف المهمة {job.id} بعد الطلب رقم {job.last_application_id}")
+        else:
+            filters = {name: getattr(args, name) for name in FILTER_FIELDS if getattr(args, name)}
+            job = create_job(args.name, args.template, filters)
+            total = build_recipient_query(filters).count()
+            print(f"📋 المهمة {job.id}: {total} طلب مستهدف")
+
+        print("="*60)
+        if args.retry_failed:
+            recovered = retry_failed(job.id, concurrency=args.concurrency, rate_per_second=args.rate)
+            print(f"🔁 تمت إعادة الإرسال بنجاح لـ {recovered} رقم")
+        else:
+            run_job(job.id, concurrency=args.concurrency, rate_per_second=args.rate,
+                    chunk_size=args.chunk_size)
+
+        unknown = job.deliveries.filter_by(status='sending').count()
+        print("\n" + "="*60)
+        print(f"📊 نتائج المهمة {job.id}:")
+        print(f"   ✅ تم الإرسال: {job.sent_count}")
+        print(f"   ❌ فشل: {job.failed_count}")
+        if unknown:
+            print(f"   ⚠️ غير معروف (توقف أثناء الإرسال): {unknown}")
+        print("="*60)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='أداة الإشعارات الجماعية للمتقدمين')
+    parser.add_argument('--name', default='إشعار جماعي', help='اسم المهمة')
+    parser.add_argument('--template',
+                        help=f'نص الرسالة، المتغيرات المتاحة: {", ".join("{" + f + "}" for f in TEMPLATE_FIELDS)}')
+    for field in FILTER_FIELDS:
+        parser.add_argument(f'--{field.replace("_", "-")}', dest=field, help=f'تصفية حسب {field}')
+    parser.add_argument('--resume', type=int, help='استئناف مهمة سابقة بمعرفها')
+    parser.add_argument('--retry-failed', action='store_true', help='إعادة الإرسال للأرقام الفاشلة في المهمة')
+    parser.add_argument('--concurrency', type=int, default=4, help='عدد الرسائل المتزامنة')
+    parser.add_argument('--rate', type=float, default=20, help='أقصى عدد رسائل في الثانية')
+    parser.add_argument('--chunk-size', type=int, default=200, help='عدد الطلبات في كل دفعة')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='عرض الرسائل في الكونسول بدون إرسال أو إنشاء مهمة')
+
+    args = parser.parse_args()
+    if not args.resume and not args.template:
+        parser.error('--template مطلوب عند إنشاء مهمة جديدة')
+    if args.retry_failed and not args.resume:
+        parser.error('--retry-failed يتطلب --resume')
+    if args.dry_run and args.resume:
+        parser.error('--dry-run لا يستخدم مع --resume (التجربة لا تنشئ مهمة)')
+
+    if args.dry_run:
+        preview_notifications(args)
+    else:
+        send_notifications(args)
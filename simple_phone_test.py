@@ -3,58 +3,90 @@
 اختبار بسيط للتحقق من أرقام الجوال
 """
 
+import os
+import random
+import re
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.phone import normalize_phone, normalize_phone_or_none, PhoneNumberError
+
+# (المدخل، النتيجة المتوقعة أو None إذا يجب رفضه)
+PHONE_CORPUS = [
+    ("773397089", "+967773397089"),
+    ("777679136", "+967777679136"),
+    ("712345678", "+967712345678"),
+    ("+967773397089", "+967773397089"),
+    ("967777679136", "+967777679136"),
+    ("00967712345678", "+967712345678"),
+    ("0712345678", "+967712345678"),
+    ("+967 771-234-567", "+967771234567"),
+    (" (771) 234 567 ", "+967771234567"),
+    ("٧٧١٢٣٤٥٦٧", "+967771234567"),
+    ("۷۷۱۲۳۴۵۶۷", "+967771234567"),
+    ("770123456", "+967770123456"),
+    ("779012345", "+967779012345"),
+    ("673397089", None),     # لا يبدأ بـ 7
+    ("77339708", None),      # أقل من 9 أرقام
+    ("7733970899", None),    # أكثر من 9 أرقام
+    ("abc123456", None),     # يحتوي على أحرف
+    ("812345678", None),     # يبدأ بـ 8
+    ("612345678", None),     # يبدأ بـ 6
+    ("7123456", None),       # قصير جداً
+    ("77123456a", None),     # حرف في النهاية
+    ("+966771234567", None), # رمز دولة آخر
+    ("", None),              # فارغ
+    ("+967", None),          # رمز الدولة فقط
+]
+
+NORMALIZED_RE = re.compile(r'^\+9677\d{8}$')
+PREFIXES = ['', '+967', '967', '00967', '0']
+SEPARATORS = ['', ' ', '-', '  ']
+
+
+def _random_variant(rng, local):
+    """كتابة رقم محلي صحيح بصيغة عشوائية كما قد يدخلها المستخدم"""
+    text = rng.choice(PREFIXES)
+    for index, digit in enumerate(local):
+        if index and rng.random() < 0.2:
+            text += rng.choice(SEPARATORS)
+        text += chr(0x0660 + int(digit)) if rng.random() < 0.1 else digit
+    return text
+
+
 def test_phone_validation():
     """اختبار منطق التحقق من أرقام الجوال"""
-    
-    def validate_yemeni_phone(phone_data):
-        """محاكاة دالة التحقق"""
-        if not phone_data:
-            return False, "رقم الجوال مطلوب"
-        
-        # تنظيف الرقم
-        clean_phone = phone_data.strip().replace(' ', '').replace('-', '')
-        
-        # إزالة رمز الدولة إذا كان موجوداً
-        if clean_phone.startswith('+967'):
-            clean_phone = clean_phone[4:]
-        elif clean_phone.startswith('967'):
-            clean_phone = clean_phone[3:]
-        elif clean_phone.startswith('00967'):
-            clean_phone = clean_phone[5:]
-        
-        # التحقق من صحة الرقم اليمني (يبدأ بـ 7 ويكون 9 أرقام)
-        if not (clean_phone.startswith('7') and len(clean_phone) == 9 and clean_phone.isdigit()):
-            return False, 'رقم الجوال يجب أن يبدأ بـ 7 ويكون 9 أرقام (مثال: 712345678)'
-        
-        # إضافة رمز اليمن
-        final_phone = '+967' + clean_phone
-        return True, final_phone
-    
     print("🧪 اختبار التحقق من أرقام الجوال اليمنية...")
     print("="*60)
-    
-    # أرقام للاختبار
-    test_phones = [
-        "773397089",    # صحيح
-        "777679136",    # صحيح
-        "712345678",    # صحيح
-        "+967773397089", # صحيح مع رمز الدولة
-        "967777679136",  # صحيح مع رمز الدولة
-        "673397089",     # خطأ - لا يبدأ بـ 7
-        "77339708",      # خطأ - أقل من 9 أرقام
-        "7733970899",    # خطأ - أكثر من 9 أرقام
-        "abc123456",     # خطأ - يحتوي على أحرف
-        "812345678",     # خطأ - يبدأ بـ 8
-        "",              # خطأ - فارغ
-    ]
-    
-    for phone in test_phones:
-        is_valid, result = validate_yemeni_phone(phone)
-        status = "✅" if is_valid else "❌"
+
+    for phone, expected in PHONE_CORPUS:
+        result = normalize_phone_or_none(phone)
+        status = "✅" if result == expected else "❌"
         print(f"{status} '{phone}' → {result}")
-    
+        assert result == expected, phone
+        if expected is None:
+            try:
+                normalize_phone(phone)
+            except PhoneNumberError:
+                pass
+            else:
+                raise AssertionError(f'{phone} يجب أن يرفض')
+
+    # خصائص عامة على أرقام عشوائية
+    rng = random.Random(967)
+    for _ in range(2000):
+        local = '7' + ''.join(rng.choice('0123456789') for _ in range(8))
+        result = normalize_phone(_random_variant(rng, local))
+        assert result == '+967' + local
+        assert NORMALIZED_RE.match(result)
+        assert normalize_phone(result) == result  # التوحيد ثابت عند التكرار
+
+        # أي رقم بطول خاطئ أو بداية غير 7 يرفض
+        assert normalize_phone_or_none(local[:rng.randint(1, 8)]) is None
+        assert normalize_phone_or_none(rng.choice('012345689') + local[1:]) is None
+
     print("="*60)
     print("✅ انتهى الاختبار")
 
 if __name__ == "__main__":
-    test_phone_validation()
\ No newline at end of file
+    test_phone_validation()
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+الإشعارات الجماعية مع دالة إرسال بديلة (send=)
+
+استئناف مهمة توقفت أثناء التنفيذ لا يعيد الإرسال لأي رقم سبق تسجيله، والرقم
+المكرر في أكثر من طلب يرسل له مرة واحدة، والتجربة (dry run) لا تكتب شيئاً.
+
+الاستخدام:
+    python -m pytest -q test_bulk_notifications.py
+"""
+
+import os
+import sys
+import threading
+from datetime import date
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from app.config import TestingConfig
+from app.extensions import db
+from app.models import Application, NotificationDelivery, NotificationJob, User
+from app.services.bulk_notifications import create_job, preview_messages, run_job
+
+TEMPLATE = 'مرحباً {full_name}، طلبك رقم {application_number}'
+
+
+class BulkConfig(TestingConfig):
+    RATELIMIT_ENABLED = False
+    METRICS_ENABLED = False
+
+
+class RecordingSender:
+    """دالة إرسال تسجل الرسائل بدلاً من إرسالها، وتتوقف بعد stop_after رسالة"""
+
+    def __init__(self, stop_after=None):
+        self.sent = []
+        self.stop_after = stop_after
+        self._lock = threading.Lock()
+
+    def __call__(self, phone, text):
+        with self._lock:
+            if self.stop_after is not None and len(self.sent) >= self.stop_after:
+                raise Interrupted()
+            self.sent.append((phone, text))
+        return True, None
+
+
+class Interrupted(BaseException):
+    """توقف العملية أثناء الإرسال (لا تلتقطه دالة الإرسال ولا run_job)"""
+
+
+def make_app(phones):
+    app = create_app(BulkConfig)
+    with app.app_context():
+        db.create_all()
+        user = User(phone='+967770000000', is_phone_verified=True)
+        user.set_password('Sample-Passw0rd')
+        db.session.add(user)
+        db.session.flush()
+        for number, phone in enumerate(phones, start=1):
+            db.session.add(Application(
+                user_id=user.id, application_number=number, full_name=f'طالب {number}',
+                birth_date=date(2005, 5, 15), gender='male', nationality='يمني',
+                birthplace='صنعاء', phone=phone, term_name='الفصل الأول',
+                school_name='ثانوية الثورة', guardian_name='ولي الأمر',
+                guardian_phone='+967771234568',
+            ))
+        db.session.commit()
+    return app
+
+
+def test_resume_does_not_send_twice():
+    phones = [f'+96777100000{i}' for i in range(6)]
+    app = make_app(phones)
+    with app.app_context():
+        job_id = create_job('استئناف', TEMPLATE).id
+
+        first = RecordingSender(stop_after=3)
+        try:
+            run_job(job_id, concurrency=1, rate_per_second=0, chunk_size=2, send=first)
+        except Interrupted:
+            db.session.rollback()
+        else:
+            raise AssertionError('المهمة يجب أن تتوقف أثناء الدفعة الثانية')
+
+        second = RecordingSender()
+        job = run_job(job_id, concurrency=1, rate_per_second=0, chunk_size=2, send=second)
+
+        first_phones = {phone for phone, _ in first.sent}
+        second_phones = {phone for phone, _ in second.sent}
+        assert len(first.sent) == 3
+        assert not first_phones & second_phones
+        # الدفعة الثانية سجلت قبل التوقف ولم تحفظ نتيجتها، فتبقى sending ولا تعاد
+        assert second_phones == set(phones[4:])
+        assert job.status == 'completed'
+        assert job.deliveries.count() == len(phones)
+        assert job.deliveries.filter_by(status='sending').count() == 2
+
+
+def test_duplicate_phones_are_sent_once():
+    phones = ['+967771000001', '+967771000002', '+967771000001', '+967771000003', '+967771000002']
+    app = make_app(phones)
+    with app.app_context():
+        job_id = create_job('أرقام مكررة', TEMPLATE).id
+        sender = RecordingSender()
+        job = run_job(job_id, concurrency=2, rate_per_second=0, chunk_size=2, send=sender)
+
+        sent_phones = [phone for phone, _ in sender.sent]
+        assert sorted(sent_phones) == sorted(set(phones))
+        assert (job.sent_count, job.failed_count) == (3, 0)
+        assert job.deliveries.count() == 3
+
+
+def test_dry_run_writes_nothing():
+    phones = ['+967771000001', '+967771000002', '+967771000001']
+    app = make_app(phones)
+    with app.app_context():
+        messages = list(preview_messages(TEMPLATE, {'term_name': 'الفصل الأول'}, chunk_size=2))
+
+        assert [phone for phone, _ in messages] == ['+967771000001', '+967771000002']
+        assert messages[0][1] == 'مرحباً طالب 1، طلبك رقم 1'
+        assert not db.session.new and not db.session.dirty
+        assert db.session.query(NotificationJob).count() == 0
+        assert db.session.query(NotificationDelivery).count() == 0
+        assert db.session.query(Application).count() == len(phones)
+
+
+if __name__ == '__main__':
+    test_resume_does_not_send_twice()
+    test_duplicate_phones_are_sent_once()
+    test_dry_run_writes_nothing()
+    print('✅ الإشعارات الجماعية لا تكرر الإرسال')
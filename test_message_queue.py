@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+طابور رموز التحقق عند فشل مزود WhatsApp
+
+فشل المزود يجب أن يعيد جدولة الرسالة بتأخير أسي ثم ينقلها إلى dead بعد
+OTP_MAX_ATTEMPTS، ولا يعتبر إرسالاً ناجحاً (الوضع المحلي فقط عند تعطيل WhatsApp).
+
+الاستخدام:
+    python -m pytest -q test_message_queue.py
+"""
+
+import os
+import socket
+import sys
+from datetime import datetime
+from flask import render_template
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from app.config import TestingConfig
+from app.extensions import db
+from app.models import OutboundMessage
+from app.services.files import get_validation_system_status
+from app.services.message_queue import OTP_DELIVERIES, drain_once, queue_verification_sms
+from app.services.telemetry import collect_telemetry, otp_stats
+
+MAX_ATTEMPTS = 3
+
+
+def closed_port():
+    """منفذ محلي لا يستمع عليه شيء (رفض اتصال فوري)"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class FailingProviderConfig(TestingConfig):
+    RATELIMIT_ENABLED = False
+    METRICS_ENABLED = False
+    WHATSAPP_ENABLED = True
+    WHATSAPP_ACCESS_TOKEN = 'test-token'
+    WHATSAPP_PHONE_NUMBER_ID = '1234'
+    WHATSAPP_API_URL = f'http://127.0.0.1:{closed_port()}'
+    WHATSAPP_CONNECT_TIMEOUT = 1
+    OTP_MAX_ATTEMPTS = MAX_ATTEMPTS
+    OTP_RETRY_BASE_SECONDS = 60
+
+
+def make_app(config=FailingProviderConfig):
+    app = create_app(config)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def test_provider_failure_is_retried_then_dead():
+    app = make_app()
+    OTP_DELIVERIES.reset()
+    with app.app_context():
+        message = queue_verification_sms('+967771234567', '123456')
+        message_id = message.id
+
+        message = db.session.get(OutboundMessage, message_id)
+        assert message.status == 'pending'
+        assert message.attempts == 1
+        assert message.payload == '123456'
+        assert message.next_attempt_at > datetime.utcnow()
+
+        for attempt in range(2, MAX_ATTEMPTS + 1):
+            # تقديم موعد المحاولة التالية بدلاً من انتظار التأخير الأسي
+            message.next_attempt_at = datetime.utcnow()
+            db.session.commit()
+            assert drain_once()
+            message = db.session.get(OutboundMessage, message_id)
+            assert message.attempts == attempt
+
+        assert message.status == 'dead'
+        assert message.payload is None
+        assert message.last_error
+        assert not drain_once()
+
+        stats = otp_stats()
+        assert (stats['sent'], stats['retried'], stats['dead']) == (0, MAX_ATTEMPTS - 1, 1)
+        assert stats['success_rate'] == 0
+
+
+def test_system_status_shows_failed_deliveries():
+    app = make_app()
+    OTP_DELIVERIES.reset()
+    with app.app_context():
+        queue_verification_sms('+967771234567', '123456')
+
+    with app.test_request_context('/system-status'):
+        telemetry = collect_telemetry()
+        assert telemetry['otp']['retried'] == 1
+        assert telemetry['otp']['success_rate'] == 0
+        html = render_template('main/system_status.html', status=get_validation_system_status(),
+                               telemetry=telemetry, pool_status=telemetry['pool'],
+                               hash_status=telemetry['hash'])
+    assert '<tr><th>نسبة النجاح</th><td>0.0%</td></tr>' in html
+    assert '<tr><th>إعادة محاولة / متروكة</th><td>1 / 0</td></tr>' in html
+
+
+def test_console_fallback_when_whatsapp_disabled():
+    class ConsoleConfig(TestingConfig):
+        RATELIMIT_ENABLED = False
+        METRICS_ENABLED = False
+        WHATSAPP_ENABLED = False
+
+    app = make_app(ConsoleConfig)
+    with app.app_context():
+        message = queue_verification_sms('+967771234567', '123456')
+        message = db.session.get(OutboundMessage, message.id)
+        assert message.status == 'sent'
+        assert message.payload is None
+
+
+if __name__ == '__main__':
+    test_provider_failure_is_retried_then_dead()
+    test_system_status_shows_failed_deliveries()
+    test_console_fallback_when_whatsapp_disabled()
+    print('✅ فشل المزود يعاد ثم ينقل إلى dead')
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+ميزانية استعلامات SQL للصفحات الرئيسية
+
+يفشل إذا زاد عدد الاستعلامات في auth.login أو student.status أو student.status_images
+أو student.application أو main.signed_image
+عن الحد المسجل هنا (مثلاً بسبب نمط N+1 جديد في القوالب). عند تغيير مقصود
+في عدد الاستعلامات يحدث الحد مع شرح السبب في الـ commit.
+
+الاستخدام:
+    python -m pytest -q test_query_budgets.py
+"""
+
+import io
+import os
+import sys
+import tempfile
+from datetime import date
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from PIL import Image
+from app import create_app
+from app.config import TestingConfig
+from app.extensions import db
+from app.models import Application, ApplicationImage, User
+from app.services.query_profiler import assert_max_queries
+
+PASSWORD = 'Sample-Passw0rd'
+
+# الحدود الحالية لكل مسار
+LOGIN_BUDGET = 1
+STATUS_BUDGET = 4
+STATUS_IMAGES_BUDGET = 2
+SIGNED_IMAGE_BUDGET = 0
+APPLICATION_FORM_BUDGET = 2
+APPLICATION_SUBMIT_BUDGET = 10
+
+
+class BudgetConfig(TestingConfig):
+    RATELIMIT_ENABLED = False
+    PASSWORD_EXECUTOR = 'inline'
+    METRICS_ENABLED = False
+    UPLOAD_FOLDER = tempfile.mkdtemp()
+
+
+def make_app():
+    app = create_app(BudgetConfig)
+    with app.app_context():
+        db.create_all()
+        user = User(phone='+967771234567', is_phone_verified=True)
+        user.set_password(PASSWORD)
+        db.session.add(user)
+        db.session.flush()
+        # طلبان سابقان بصورهما حتى تظهر أنماط N+1 في صفحة الحالة
+        for number in (1, 2):
+            application = Application(
+                user_id=user.id, application_number=number, full_name='طالب تجريبي للاختبار',
+                birth_date=date(2005, 5, 15), gender='male', nationality='يمني',
+                birthplace='صنعاء', phone='+967771234567', term_name='الفصل الأول',
+                school_name='ثانوية الثورة', guardian_name='ولي الأمر',
+                guardian_phone='+967771234568')
+            application.images = [ApplicationImage(position=i, file_path=f'applications/{user.id}/{number}-{i}.jpg')
+                                  for i in range(1, 6)]
+            db.session.add(application)
+        db.session.commit()
+    return app
+
+
+def login(client):
+    return client.post('/auth/login', data={'phone': '771234567', 'password': PASSWORD})
+
+
+def photo(seed):
+    """صورة ضجيج فريدة بإضاءة وتباين مقبولين لفاحص الجودة"""
+    image = Image.effect_noise((400, 500), 40 + seed).convert('RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=90)
+    buffer.seek(0)
+    return buffer, f'photo{seed}.jpg'
+
+
+def test_login_query_budget():
+    app = make_app()
+    client = app.test_client()
+    with app.app_context(), assert_max_queries(LOGIN_BUDGET):
+        response = login(client)
+    assert response.status_code == 302
+
+
+def test_status_query_budget():
+    app = make_app()
+    client = app.test_client()
+    login(client)
+    with app.app_context(), assert_max_queries(STATUS_BUDGET):
+        response = client.get('/student/status')
+    assert response.status_code == 200
+
+
+def test_status_images_query_budget():
+    app = make_app()
+    client = app.test_client()
+    login(client)
+    with app.app_context(), assert_max_queries(STATUS_IMAGES_BUDGET):
+        response = client.get('/student/status/images?applications=1,2')
+    assert response.status_code == 200
+    images = response.get_json()
+    assert [len(images[key]) for key in ('1', '2')] == [5, 5]
+    assert client.get('/student/status/images?applications=²,1').get_json().keys() == {'1'}
+
+    # الصورة نفسها برابط موقع: بدون جلسة ولا استعلامات
+    file_path = 'applications/1/1-1.jpg'
+    os.makedirs(os.path.join(BudgetConfig.UPLOAD_FOLDER, 'applications', '1'), exist_ok=True)
+    Image.new('RGB', (600, 750), 'white').save(os.path.join(BudgetConfig.UPLOAD_FOLDER, file_path))
+    thumb = images['1'][0]['thumb']
+    anonymous = app.test_client()
+    with app.app_context(), assert_max_queries(SIGNED_IMAGE_BUDGET):
+        response = anonymous.get(thumb)
+    assert response.status_code == 200
+    assert Image.open(io.BytesIO(response.data)).width == 160
+    # النسخ المصغرة لا تكتب داخل مجلد الرفع (يقدمه /files_or_static/ بصلاحيات حسب المسار)
+    assert os.listdir(BudgetConfig.UPLOAD_FOLDER) == ['applications']
+    assert anonymous.get(thumb[:-1] + ('0' if thumb[-1] != '0' else '1')).status_code == 403
+
+
+def test_application_query_budget():
+    app = make_app()
+    client = app.test_client()
+    login(client)
+    with app.app_context(), assert_max_queries(APPLICATION_FORM_BUDGET):
+        response = client.get('/student/application')
+    assert response.status_code == 200
+
+    data = {
+        'full_name': 'طالب تجريبي ثالث للاختبار', 'birth_date': '2005-05-15', 'gender': 'male',
+        'nationality': 'يمني', 'birthplace': 'صنعاء', 'phone': '771234567',
+        'term_name': 'الفصل الأول', 'school_name': 'ثانوية الثورة',
+        'guardian_name': 'ولي الأمر', 'guardian_phone': '771234568', 'privacy_agreement': 'y',
+    }
+    data.update({f'image{i}': photo(i) for i in range(1, 6)})
+    with app.app_context(), assert_max_queries(APPLICATION_SUBMIT_BUDGET):
+        response = client.post('/student/application', data=data, content_type='multipart/form-data')
+    assert response.status_code == 302
+    with app.app_context():
+        assert Application.query.count() == 3
+
+
+if __name__ == '__main__':
+    test_login_query_budget()
+    test_status_query_budget()
+    test_status_images_query_budget()
+    test_application_query_budget()
+    print('✅ جميع الصفحات ضمن ميزانية الاستعلامات')
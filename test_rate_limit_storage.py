@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+تخزين حدود الطلبات في قاعدة البيانات (sqldb://)
+
+fixed-window هي الاستراتيجية الوحيدة التي ينفذها التخزين، وأي استراتيجية أخرى
+معه ترفض عند إنشاء التطبيق برسالة تذكر الإعداد.
+
+الاستخدام:
+    python -m pytest -q test_rate_limit_storage.py
+"""
+
+import os
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from app.config import TestingConfig
+
+
+def sqldb_config(strategy):
+    url = f'sqlite:///{os.path.join(tempfile.mkdtemp(), "limits.db")}'
+
+    class SQLLimitConfig(TestingConfig):
+        METRICS_ENABLED = False
+        RATELIMIT_ENABLED = True
+        RATELIMIT_STORAGE_URI = 'sqldb://'
+        RATELIMIT_STORAGE_OPTIONS = {'url': url}
+        RATELIMIT_STRATEGY = strategy
+
+    return SQLLimitConfig
+
+
+def test_fixed_window_is_accepted():
+    app = create_app(sqldb_config('fixed-window'))
+    assert app.config['RATELIMIT_STRATEGY'] == 'fixed-window'
+
+
+def test_unsupported_strategy_is_rejected():
+    for strategy in ('moving-window', 'sliding-window-counter'):
+        try:
+            create_app(sqldb_config(strategy))
+        except ValueError as e:
+            assert 'RATELIMIT_STRATEGY' in str(e)
+        else:
+            raise AssertionError(f'{strategy} يجب أن يرفض مع sqldb://')
+
+
+if __name__ == '__main__':
+    test_fixed_window_is_accepted()
+    test_unsupported_strategy_is_rejected()
+    print('✅ sqldb:// يقبل fixed-window فقط')
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+توجيه القراءات إلى نسخة القراءة (read replica)
+
+قاعدتا SQLite منفصلتان: الرئيسية ونسخة القراءة (bind باسم replica) ببيانات
+مختلفة عمداً، فيظهر من نتيجة الاستعلام أي قاعدة نفذته.
+
+الاستخدام:
+    python -m pytest -q test_replica_routing.py
+"""
+
+import os
+import sys
+import tempfile
+from datetime import date
+from flask import g
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from app.config import TestingConfig
+from app.extensions import db
+from app.models import Application, User
+from app.services.db_routing import REPLICA_BIND_KEY
+
+PASSWORD = 'Sample-Passw0rd'
+REPLICA_ONLY_NAME = 'طالب موجود في نسخة القراءة فقط'
+
+
+def make_app():
+    folder = tempfile.mkdtemp()
+
+    class ReplicaConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{os.path.join(folder, "primary.db")}'
+        SQLALCHEMY_ENGINE_OPTIONS = {}
+        SQLALCHEMY_BINDS = {REPLICA_BIND_KEY: f'sqlite:///{os.path.join(folder, "replica.db")}'}
+        REPLICA_STICKY_SECONDS = 0
+        RATELIMIT_ENABLED = False
+        PASSWORD_EXECUTOR = 'inline'
+        METRICS_ENABLED = False
+
+    app = create_app(ReplicaConfig)
+    with app.app_context():
+        # نفس الجداول في القاعدتين (النماذج بلا bind فتنشأ في الرئيسية فقط)
+        db.create_all()
+        db.metadatas[None].create_all(db.engines[REPLICA_BIND_KEY])
+
+        user = User(phone='+967771234567', is_phone_verified=True)
+        user.set_password(PASSWORD)
+        db.session.add(user)
+        db.session.commit()
+
+        # نسخ المستخدم إلى نسخة القراءة مع طلب غير موجود في الرئيسية
+        with db.engines[REPLICA_BIND_KEY].begin() as connection:
+            connection.execute(User.__table__.insert(), [{
+                column.name: getattr(user, column.key) for column in User.__table__.columns
+            }])
+            connection.execute(Application.__table__.insert(), [{
+                'user_id': user.id, 'application_number': 1, 'full_name': REPLICA_ONLY_NAME,
+                'birth_date': date(2005, 5, 15), 'gender': 'male', 'nationality': 'يمني',
+                'birthplace': 'صنعاء', 'phone': '+967771234567', 'term_name': 'الفصل الأول',
+                'school_name': 'ثانوية الثورة', 'guardian_name': 'ولي الأمر',
+                'guardian_phone': '+967771234568',
+            }])
+    return app
+
+
+def test_replica_reads_route_uses_replica():
+    app = make_app()
+    client = app.test_client()
+    assert client.post('/auth/login', data={'phone': '771234567', 'password': PASSWORD}).status_code == 302
+
+    # student.status معلم بـ replica_reads
+    response = client.get('/student/status')
+    assert response.status_code == 200
+    assert REPLICA_ONLY_NAME in response.get_data(as_text=True)
+
+
+def test_login_reads_primary():
+    app = make_app()
+    # نسخة القراءة متأخرة: كلمة مرور قديمة للمستخدم
+    with app.app_context():
+        stale = User(phone='+967771234567')
+        stale.set_password('Old-Passw0rd-123')
+        with db.engines[REPLICA_BIND_KEY].begin() as connection:
+            connection.execute(User.__table__.update().values(password_hash=stale.password_hash))
+
+    client = app.test_client()
+    response = client.post('/auth/login', data={'phone': '771234567', 'password': PASSWORD})
+    assert response.status_code == 302
+    assert '/auth/login' not in response.headers['Location']
+
+
+def test_reads_return_to_primary_after_write():
+    app = make_app()
+    with app.test_request_context('/'):
+        g.db_replica_reads = True
+        assert Application.query.count() == 1
+
+        user = db.session.execute(db.select(User)).scalar_one()
+        user.is_phone_verified = False
+        db.session.flush()
+
+        assert g.db_wrote
+        assert Application.query.count() == 0
+        db.session.rollback()
+
+
+def test_reads_use_primary_without_decorator():
+    app = make_app()
+    with app.test_request_context('/'):
+        assert Application.query.count() == 0
+
+
+if __name__ == '__main__':
+    test_replica_reads_route_uses_replica()
+    test_login_reads_primary()
+    test_reads_return_to_primary_after_write()
+    test_reads_use_primary_without_decorator()
+    print('✅ توجيه القراءات إلى نسخة القراءة يعمل')
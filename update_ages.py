@@ -7,128 +7,167 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from sqlalchemy import case, func, literal_column
 from app import create_app
 from app.models import Application
 from app.extensions import db
 
-def update_existing_ages():
-    """تحديث العمر للطلبات الموجودة"""
+# عدد الطلبات في كل دفعة تحديث
+DEFAULT_CHUNK_SIZE = 5000
+
+# فئات توزيع الأعمار: (الحد الأعلى للفئة، التسمية)
+AGE_BUCKETS = [
+    (15, "أقل من 16 سنة"),
+    (20, "16-20 سنة"),
+    (25, "21-25 سنة"),
+    (30, "26-30 سنة"),
+    (40, "31-40 سنة"),
+]
+AGE_BUCKET_OVERFLOW = "أكثر من 40 سنة"
+
+
+def age_sql_expression(dialect_name):
+    """تعبير SQL لحساب العمر من تاريخ الميلاد داخل قاعدة البيانات"""
+    if dialect_name == 'mysql':
+        return literal_column("TIMESTAMPDIFF(YEAR, birth_date, CURDATE())")
+    if dialect_name == 'sqlite':
+        return literal_column(
+            "(CAST(strftime('%Y', 'now') AS INTEGER) - CAST(strftime('%Y', birth_date) AS INTEGER)"
+            " - (strftime('%m-%d', 'now') < strftime('%m-%d', birth_date)))"
+        )
+    if dialect_name == 'postgresql':
+        return literal_column("CAST(date_part('year', age(current_date, birth_date)) AS INTEGER)")
+    raise ValueError(f'قاعدة البيانات غير مدعومة لحساب العمر: {dialect_name}')
+
+
+def update_existing_ages(chunk_size=DEFAULT_CHUNK_SIZE, start_id=0):
+    """تحديث العمر للطلبات الموجودة على دفعات
+
+    كل دفعة هي نطاق من المعرفات يتم تحديثه باستعلام UPDATE واحد ثم حفظه،
+    لذلك يمكن إيقاف السكريبت وإعادة تشغيله في أي وقت: الطلبات المحدثة
+    لم تعد age IS NULL ويمكن تمرير --start-id لتجاوز ما سبق فحصه.
+    """
     app = create_app()
-    
+
     with app.app_context():
         print("🔄 بدء تحديث العمر للطلبات الموجودة...")
         print("="*60)
-        
-        # البحث عن جميع الطلبات التي لا تحتوي على عمر
-        applications = Application.query.filter(Application.age.is_(None)).all()
-        
-        if not applications:
+
+        pending = db.session.query(func.count(Application.id)).filter(
+            Application.age.is_(None),
+            Application.id > start_id
+        ).scalar()
+
+        if not pending:
             print("✅ جميع الطلبات تحتوي على العمر بالفعل")
             return
-        
-        print(f"📋 عدد الطلبات التي تحتاج تحديث: {len(applications)}")
+
+        print(f"📋 عدد الطلبات التي تحتاج تحديث: {pending}")
         print("-"*60)
-        
+
+        age_expr = age_sql_expression(db.engine.dialect.name)
         updated_count = 0
-        error_count = 0
-        
-        for i, application in enumerate(applications, 1):
+        last_id = start_id
+
+        while True:
+            # تحديد نهاية الدفعة بقراءة المعرفات فقط (بدون تحميل الكائنات)
+            chunk_ids = db.session.query(Application.id).filter(
+                Application.age.is_(None),
+                Application.id > last_id
+            ).order_by(Application.id).limit(chunk_size).all()
+
+            if not chunk_ids:
+                break
+
+            chunk_end = chunk_ids[-1].id
             try:
-                # حساب وحفظ العمر
-                calculated_age = application.calculate_and_save_age()
-                
-                if calculated_age is not None:
-                    print(f"{i:3d}. ✅ {application.full_name} - العمر: {calculated_age} سنة")
-                    updated_count += 1
-                else:
-                    print(f"{i:3d}. ⚠️ {application.full_name} - لا يمكن حساب العمر")
-                    error_count += 1
-                    
+                result = db.session.execute(
+                    db.update(Application)
+                    .where(Application.age.is_(None),
+                           Application.id > last_id,
+                           Application.id <= chunk_end)
+                    .values(age=age_expr)
+                    .execution_options(synchronize_session=False)
+                )
+                db.session.commit()
             except Exception as e:
-                print(f"{i:3d}. ❌ {application.full_name} - خطأ: {str(e)}")
-                error_count += 1
-        
-        # حفظ التغييرات
-        try:
-            db.session.commit()
-            print(f"\n" + "="*60)
-            print(f"📊 نتائج التحديث:")
-            print(f"   ✅ تم تحديث: {updated_count} طلب")
-            print(f"   ❌ أخطاء: {error_count} طلب")
-            print(f"   📈 إجمالي: {len(applications)} طلب")
-            print(f"\n✅ تم حفظ جميع التغييرات في قاعدة البيانات")
-            
-        except Exception as e:
-            db.session.rollback()
-            print(f"\n❌ خطأ في حفظ التغييرات: {str(e)}")
-            return
-        
+                db.session.rollback()
+                print(f"\n❌ خطأ في تحديث الدفعة بعد المعرف {last_id}: {str(e)}")
+                print(f"💡 لاستكمال التحديث: --start-id {last_id}")
+                return
+
+            updated_count += result.rowcount
+            last_id = chunk_end
+            print(f"   ✅ تم تحديث {updated_count}/{pending} طلب (آخر معرف: {last_id})")
+
+        print(f"\n" + "="*60)
+        print(f"📊 نتائج التحديث:")
+        print(f"   ✅ تم تحديث: {updated_count} طلب")
+        print(f"\n✅ تم حفظ جميع التغييرات في قاعدة البيانات")
         print("="*60)
 
 def show_age_statistics():
     """عرض إحصائيات الأعمار"""
     app = create_app()
-    
+
     with app.app_context():
         print("📊 إحصائيات الأعمار...")
         print("="*60)
-        
-        # إجمالي الطلبات
-        total_applications = Application.query.count()
-        applications_with_age = Application.query.filter(Application.age.isnot(None)).count()
+
+        # الإجماليات والإحصائيات في استعلام واحد
+        totals = db.session.query(
+            func.count(Application.id).label('total'),
+            func.count(Application.age).label('with_age'),
+            func.min(Application.age).label('min_age'),
+            func.max(Application.age).label('max_age'),
+            func.avg(Application.age).label('avg_age')
+        ).one()
+
+        total_applications = totals.total
+        applications_with_age = totals.with_age
         applications_without_age = total_applications - applications_with_age
-        
+
         print(f"📋 إجمالي الطلبات: {total_applications}")
         print(f"✅ طلبات تحتوي على عمر: {applications_with_age}")
         print(f"❌ طلبات بدون عمر: {applications_without_age}")
-        
+
         if applications_with_age > 0:
-            # إحصائيات الأعمار
-            from sqlalchemy import func
-            
-            age_stats = db.session.query(
-                func.min(Application.age).label('min_age'),
-                func.max(Application.age).label('max_age'),
-                func.avg(Application.age).label('avg_age')
-            ).filter(Application.age.isnot(None)).first()
-            
             print(f"\n📈 إحصائيات الأعمار:")
-            print(f"   🔽 أصغر عمر: {age_stats.min_age} سنة")
-            print(f"   🔼 أكبر عمر: {age_stats.max_age} سنة")
-            print(f"   📊 متوسط العمر: {age_stats.avg_age:.1f} سنة")
-            
-            # توزيع الأعمار
-            age_ranges = [
-                (0, 15, "أقل من 16 سنة"),
-                (16, 20, "16-20 سنة"),
-                (21, 25, "21-25 سنة"),
-                (26, 30, "26-30 سنة"),
-                (31, 40, "31-40 سنة"),
-                (41, 100, "أكثر من 40 سنة")
-            ]
-            
+            print(f"   🔽 أصغر عمر: {totals.min_age} سنة")
+            print(f"   🔼 أكبر عمر: {totals.max_age} سنة")
+            print(f"   📊 متوسط العمر: {float(totals.avg_age):.1f} سنة")
+
+            # توزيع الأعمار باستعلام GROUP BY واحد
+            bucket = case(
+                *[(Application.age <= upper, index) for index, (upper, _) in enumerate(AGE_BUCKETS)],
+                else_=len(AGE_BUCKETS)
+            ).label('bucket')
+            rows = db.session.query(bucket, func.count(Application.id)).filter(
+                Application.age.isnot(None)
+            ).group_by(bucket).order_by(bucket).all()
+
+            labels = [label for _, label in AGE_BUCKETS] + [AGE_BUCKET_OVERFLOW]
             print(f"\n📊 توزيع الأعمار:")
-            for min_age, max_age, label in age_ranges:
-                count = Application.query.filter(
-                    Application.age >= min_age,
-                    Application.age <= max_age
-                ).count()
-                if count > 0:
-                    percentage = (count / applications_with_age) * 100
-                    print(f"   {label}: {count} طلب ({percentage:.1f}%)")
-        
+            for index, count in rows:
+                percentage = (count / applications_with_age) * 100
+                print(f"   {labels[index]}: {count} طلب ({percentage:.1f}%)")
+
         print("="*60)
 
 if __name__ == "__main__":
     import argparse
-    
+
     parser = argparse.ArgumentParser(description='أداة تحديث وإحصائيات الأعمار')
     parser.add_argument('--action', choices=['update', 'stats'], default='update',
                        help='الإجراء المطلوب: update (تحديث) أو stats (إحصائيات)')
-    
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                       help='عدد الطلبات في كل دفعة تحديث')
+    parser.add_argument('--start-id', type=int, default=0,
+                       help='استكمال التحديث بعد هذا المعرف')
+
     args = parser.parse_args()
-    
+
     if args.action == 'update':
-        update_existing_ages()
+        update_existing_ages(chunk_size=args.chunk_size, start_id=args.start_id)
     elif args.action == 'stats':
-        show_age_statistics()
\ No newline at end of file
+        show_age_statistics()